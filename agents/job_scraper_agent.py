@@ -10,23 +10,74 @@ The agent:
 """
 
 from uagents import Agent, Context
-from models.messages import JobScraperMessage, AgentResponse
-from models.job import JobListing
+from models.messages import JobChunk, JobChunkAck, JobScraperMessage
+from models.job import JobListing, job_url
+from services import metrics, tracing
+from services.logging_config import RateLimitedLog, configure_logging
+from services.result_stream import (
+    DEFAULT_WINDOW,
+    ENCODINGS,
+    JSON_ENCODING,
+    CreditWindow,
+    StreamCancelled,
+    chunk_jobs,
+    chunk_payload,
+)
 import logging
 import asyncio
 import aiohttp
+import os
 from bs4 import BeautifulSoup
 import time
 import ssl
+import codecs
+import re
+import uuid
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Set, Tuple
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# Upstream and parse errors can repeat for every request and card
+error_log = RateLimitedLog(logger)
 
 # Create a custom SSL context that doesn't verify certificates
 ssl_context = ssl.create_default_context()
 ssl_context.check_hostname = False
 ssl_context.verify_mode = ssl.CERT_NONE
 
+# Scheme and host of the guest job search API; LUME_LINKEDIN_BASE_URL points it at a stand-in server
+LINKEDIN_BASE_URL = os.getenv("LUME_LINKEDIN_BASE_URL", "https://www.linkedin.com")
+
+FETCH_SECONDS = metrics.histogram(
+    "lume_linkedin_fetch_seconds", "Time from sending a LinkedIn search request to its response headers")
+PARSE_SECONDS = metrics.histogram(
+    "lume_linkedin_parse_seconds", "Time to parse one LinkedIn result card",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05))
+SEARCH_SECONDS = metrics.histogram(
+    "lume_linkedin_search_seconds", "End-to-end duration of a LinkedIn search, fetch and parse")
+UPSTREAM_RESPONSES = metrics.counter(
+    "lume_linkedin_responses", "LinkedIn search responses by HTTP status; 'error' for failed connections", ["status"])
+CARDS_PARSED = metrics.counter("lume_linkedin_cards_parsed", "Result cards parsed into job listings")
+CARDS_DROPPED = metrics.counter(
+    "lume_linkedin_cards_dropped", "Result cards that could not be parsed, by reason", ["reason"])
+NO_BASE_CARD = CARDS_DROPPED.labels("no_base_card")
+NO_JOB_ID = CARDS_DROPPED.labels("no_job_id")
+MISSING_ELEMENTS = CARDS_DROPPED.labels("missing_elements")
+PARSE_ERROR = CARDS_DROPPED.labels("error")
+RATE_LIMIT_WAIT_SECONDS = metrics.histogram(
+    "lume_scraper_rate_limit_wait_seconds", "Time scrape requests waited for the scraper's rate limit")
+
+# Records DNS and connection (TCP and TLS) setup as spans of the current trace
+TRACE_CONFIG = tracing.aiohttp_trace_config()
+
+# Opening or closing <li> tag in a streamed search results page
+LIST_ITEM_TAG = re.compile(r"<(/?)li[\s>]", re.IGNORECASE)
+LIST_ITEM_TAG_MAX_LENGTH = len("</li>")
+
+# Result cards considered per streamed agent request
+MAX_STREAM_RESULTS = 100
+# Result cards on a full LinkedIn search page; a shorter page is the last one
+LINKEDIN_PAGE_SIZE = 10
+
 class JobScraperAgent:
     """
     Job Scraper Agent class that handles job listing retrieval
@@ -52,6 +103,11 @@ class JobScraperAgent:
         # Initialize scraping settings
         self.rate_limit = 1  # seconds between requests
         self.last_request_time = 0
+        self.base_url = LINKEDIN_BASE_URL
+        
+        # Flow control of the result streams being sent, by (receiver, request ID)
+        self.streams: Dict[Tuple[str, str], CreditWindow] = {}
+        self._stream_tasks: Set[asyncio.Task] = set()
     
     def setup_handlers(self):
         """
@@ -60,6 +116,7 @@ class JobScraperAgent:
         Handlers:
         1. Startup handler - Initializes the agent
         2. Job scraper message handler - Processes scraping requests
+        3. Chunk ack handler - Lets result streams continue
         """
         @self.agent.on_event("startup")
         async def initialize(ctx: Context):
@@ -71,37 +128,111 @@ class JobScraperAgent:
             """
             Handle job scraping requests
             
-            Processes:
-            - Job search requests
-            - Scraping from specified sources (currently only LinkedIn)
-            - Response formatting
+            Results go back as a stream of JobChunk messages. The agent
+            handles one message at a time, so the stream runs in its own task
+            and this handler returns at once, leaving the agent free to
+            receive the acks the stream waits for.
             """
+            logger.info(f"Received job scraping request from {sender}")
+            task = asyncio.create_task(
+                self.stream_jobs(msg, lambda message: ctx.send(sender, message), sender)
+            )
+            self._stream_tasks.add(task)
+            task.add_done_callback(self._stream_tasks.discard)
+        
+        @self.agent.on_message(model=JobChunkAck)
+        async def handle_chunk_ack(ctx: Context, sender: str, msg: JobChunkAck):
+            """Let a result stream send further chunks, or stop it"""
+            window = self.streams.get((sender, msg.request_id))
+            if window is not None:
+                window.ack(msg.sequence, msg.cancel)
+    
+    async def stream_jobs(self, msg: JobScraperMessage, send: Callable[[JobChunk], Awaitable],
+                          receiver: str = "") -> int:
+        """
+        Answer a scraping request with a stream of JobChunk messages
+        
+        Chunks are bounded in size and sent no further ahead of the
+        receiver's acks than the request's window allows. The final chunk
+        is always sent unless the receiver cancels or stops acknowledging.
+        A repeat of a request whose stream is still being sent is ignored,
+        since its chunks and acks could not be told apart from the first's.
+        
+        Args:
+            msg: The scraping request
+            send: Sends one message to the requester
+            receiver: Requester address; acks are matched on it and the request ID
+            
+        Returns:
+            Number of jobs sent
+        """
+        request_id = msg.request_id or uuid.uuid4().hex
+        max_results = max(1, min(msg.max_results or MAX_STREAM_RESULTS, MAX_STREAM_RESULTS))
+        start = msg.cursor if msg.cursor is not None else max((msg.page or 1) - 1, 0) * max_results
+        key = (receiver, request_id)
+        if key in self.streams:
+            logger.warning("Ignoring a repeat of request %s from %s while its results are streaming",
+                           request_id, receiver)
+            return 0
+        window = CreditWindow(msg.window or DEFAULT_WINDOW)
+        self.streams[key] = window
+        sequence = total = 0
+        status, message, next_cursor = "success", None, None
+        try:
             try:
-                logger.info(f"Received job scraping request from {sender}")
-                
-                jobs = await self.scrape_jobs(
-                    source=msg.source,
-                    search_terms=msg.search_terms,
-                    location=msg.location,
-                    remote_only=msg.remote_only,
-                    max_results=msg.max_results
-                )
-                
-                response = AgentResponse(
-                    status="success",
-                    message=f"Found {len(jobs)} jobs",
-                    jobs=jobs
-                )
-                await ctx.send(sender, response)
-                
+                if msg.source.lower() != "linkedin":
+                    raise ValueError(f"Unsupported source: {msg.source}")
+                encoding = msg.encoding or JSON_ENCODING
+                if encoding not in ENCODINGS:
+                    raise ValueError(f"Unsupported encoding: {encoding}")
+                stats = {}
+                jobs = self.iter_linkedin_pages(msg.search_terms, msg.location or "", msg.remote_only,
+                                                max_results, start=start, stats=stats)
+                chunks = chunk_jobs(jobs)
+                try:
+                    async for chunk in chunks:
+                        await window.wait_to_send(sequence)
+                        await send(JobChunk(request_id=request_id, sequence=sequence, **chunk_payload(chunk, encoding)))
+                        sequence += 1
+                        total += len(chunk)
+                finally:
+                    # Closes the LinkedIn request if the stream stopped early
+                    await chunks.aclose()
+                    await jobs.aclose()
+                next_cursor = stats.get("next_cursor")
+            except StreamCancelled:
+                raise
             except Exception as e:
-                logger.error(f"Error handling job scraping request: {e}")
-                await ctx.send(sender, AgentResponse(
-                    status="error",
-                    message=str(e)
-                ))
+                error_log.log(logging.ERROR, type(e), "Error streaming job scraping results: %r", e)
+                status, message = "error", str(e)
+            
+            await window.wait_to_send(sequence)
+            await send(JobChunk(
+                request_id=request_id,
+                sequence=sequence,
+                final=True,
+                status=status,
+                message=message or f"Found {total} jobs",
+                next_cursor=next_cursor,
+                total=total
+            ))
+        except StreamCancelled as e:
+            logger.info("Stopped streaming results of %s to %s: %s", request_id, receiver, e)
+        finally:
+            if self.streams.get(key) is window:
+                del self.streams[key]
+        return total
     
-    async def scrape_jobs(self, source: str, search_terms: list, location: str,
+    async def _wait_for_rate_limit(self):
+        """Wait until the next upstream request is allowed"""
+        current_time = time.time()
+        if current_time - self.last_request_time < self.rate_limit:
+            with tracing.span("rate_limit"):
+                await asyncio.sleep(self.rate_limit)
+        self.last_request_time = time.time()
+        RATE_LIMIT_WAIT_SECONDS.observe(self.last_request_time - current_time)
+    
+    async def scrape_jobs(self, source: str, search_terms: list, location: Optional[str],
                          remote_only: bool, max_results: int) -> list:
         """
         Scrape jobs from the specified source
@@ -109,7 +240,7 @@ class JobScraperAgent:
         Args:
             source: Job board source (Linkedin)
             search_terms: List of search terms
-            location: Location to search in
+            location: Location to search in; None searches everywhere
             remote_only: Whether to only return remote jobs
             max_results: Maximum number of results to return
             
@@ -118,10 +249,7 @@ class JobScraperAgent:
         """
         try:
             # Enforce rate limiting
-            current_time = time.time()
-            if current_time - self.last_request_time < self.rate_limit:
-                await asyncio.sleep(self.rate_limit)
-            self.last_request_time = time.time()
+            await self._wait_for_rate_limit()
             
             # Scrape based on source
             if source.lower() == "linkedin":
@@ -135,17 +263,17 @@ class JobScraperAgent:
                 raise ValueError(f"Unsupported source: {source}")
                 
         except Exception as e:
-            logger.error(f"Error scraping jobs: {e}")
+            error_log.log(logging.ERROR, type(e), "Error scraping jobs: %r", e)
             return []
     
-    async def scrape_linkedin(self, search_terms: list, location: str,
+    async def scrape_linkedin(self, search_terms: list, location: Optional[str],
                             remote_only: bool, max_results: int) -> list:
         """
         Scrape jobs from LinkedIn
         
         Args:
             search_terms: List of search terms
-            location: Location to search in
+            location: Location to search in; None searches everywhere
             remote_only: Whether to only return remote jobs
             max_results: Maximum number of results to return
             
@@ -153,96 +281,201 @@ class JobScraperAgent:
             List of JobListing objects
         """
         try:
-            jobs = []
+            jobs = [job async for job in self.iter_linkedin(
+                search_terms,
+                location,
+                remote_only,
+                max_results
+            )]
+            return jobs
+            
+        except Exception as e:
+            error_log.log(logging.ERROR, type(e), "Error scraping LinkedIn: %r", e)
+            return []
+    
+    async def iter_linkedin_pages(self, search_terms: list, location: Optional[str], remote_only: bool,
+                                  max_results: int, start: int = 0,
+                                  stats: Optional[Dict] = None) -> AsyncIterator[JobListing]:
+        """
+        Scrape as many LinkedIn search pages as it takes to consider max_results cards
+        
+        Pages are fetched one after another, each after the scraper's rate
+        limit, until max_results cards were seen or a page comes back short.
+        
+        Args:
+            search_terms, location, remote_only: As for iter_linkedin()
+            max_results: Maximum number of result cards to consider
+            start: Offset of the first result
+            stats: If given, receives the cards seen and the offset the next
+                results start at (next_cursor), None when the last page was short
+            
+        Yields:
+            JobListing objects
+        """
+        offset = start
+        next_cursor = None
+        try:
+            while offset - start < max_results:
+                await self._wait_for_rate_limit()
+                wanted = min(LINKEDIN_PAGE_SIZE, max_results - (offset - start))
+                page_stats = {}
+                page = self.iter_linkedin(search_terms, location, remote_only, wanted, start=offset, stats=page_stats)
+                try:
+                    async for job in page:
+                        yield job
+                finally:
+                    await page.aclose()
+                cards = page_stats.get("cards", 0)
+                offset += cards
+                if cards < wanted:
+                    break
+            else:
+                # The last page was full, so more results may follow
+                next_cursor = offset
+        finally:
+            if stats is not None:
+                stats.update(cards=offset - start, next_cursor=next_cursor)
+    
+    async def iter_linkedin(self, search_terms: list, location: Optional[str], remote_only: bool, max_results: int,
+                            start: int = 0, stats: Optional[Dict] = None) -> AsyncIterator[JobListing]:
+        """
+        Scrape jobs from LinkedIn, yielding each one as soon as its card is parsed
+        
+        The response body is read in chunks and every complete <li> card is
+        parsed on arrival, so the first job is available after the first
+        chunk rather than after the whole page. Closing the iterator early
+        (e.g. when a streaming client disconnects) closes the upstream request.
+        
+        Args:
+            search_terms: List of search terms
+            location: Location to search in; None searches everywhere
+            remote_only: Whether to only return remote jobs
+            max_results: Maximum number of result cards to consider
+            start: Offset of the first result
+            stats: If given, receives the response status and the cards seen and parsed once the search ends
+            
+        Yields:
+            JobListing objects
+        """
+        started = time.perf_counter()
+        status = None
+        seen = parsed = 0
+        # A generator cannot make its spans current (it runs in its consumer's
+        # context), so its stages hang off the consumer's span
+        search_span = tracing.start_span("linkedin_search")
+        try:
             connector = aiohttp.TCPConnector(ssl=ssl_context)
-            async with aiohttp.ClientSession(connector=connector) as session:
+            async with aiohttp.ClientSession(connector=connector, trace_configs=[TRACE_CONFIG]) as session:
                 search_url = self._construct_linkedin_url(
                     search_terms,
                     location,
-                    remote_only
+                    remote_only,
+                    start
                 )
                 
-                logger.info(f"Making request to URL: {search_url}")
+                fetch_span = tracing.start_span("linkedin_fetch")
+                try:
+                    response = await session.get(search_url)
+                except aiohttp.ClientError:
+                    UPSTREAM_RESPONSES.labels("error").inc()
+                    raise
+                finally:
+                    if fetch_span is not None:
+                        fetch_span.end()
+                FETCH_SECONDS.observe(time.perf_counter() - started)
+                status = response.status
+                UPSTREAM_RESPONSES.labels(status).inc()
+                if search_span is not None:
+                    search_span.set("http.status_code", response.status)
                 
-                async with session.get(search_url) as response:
-                    logger.info(f"Response status: {response.status}")
+                async with response:
+                    if status != 200:
+                        error_log.log(logging.ERROR, status, "LinkedIn returned status code: %s", status)
+                        return
                     
-                    if response.status == 200:
-                        html = await response.text()
-                        
-                        soup = BeautifulSoup(html, 'html.parser')
-                        
-                        job_elements = soup.find_all('li')
-                        
-                        # Process each job element
-                        for job in job_elements[:max_results]:
-                            try:
-                                base_card = job.find('div', {'class': 'base-card'})
-                                if not base_card:
-                                    logger.debug("No base-card found in li element")
-                                    continue
-                                
-                                job_id = base_card.get('data-entity-urn', '').split(':')[-1]
-                                if not job_id:
-                                    logger.debug("No job ID found")
-                                    continue
-                                
-                                # Extract job details
-                                title_elem = base_card.find('h3', {'class': 'base-search-card__title'})
-                                company_elem = base_card.find('h4', {'class': 'base-search-card__subtitle'})
-                                location_elem = base_card.find('span', {'class': 'job-search-card__location'})
-                                
-                                if not all([title_elem, company_elem, location_elem]):
-                                    logger.debug("Missing required job elements")
-                                    continue
-                                
-                                # Create job listing with only required fields
-                                job = JobListing(
-                                    title=title_elem.text.strip(),
-                                    company=company_elem.text.strip(),
-                                    location=location_elem.text.strip(),
-                                    url=f"https://www.linkedin.com/jobs/view/{job_id}",
-                                    source="linkedin",
-                                    job_id=job_id
-                                )
-                                
-                                jobs.append(job)
-                                logger.info(f"Successfully parsed job: {job.title} at {job.company}")
-                                
-                            except Exception as e:
-                                logger.warning(f"Failed to parse job element: {e}")
-                                continue
-                    else:
-                        logger.error(f"LinkedIn returned status code: {response.status}")
-                        return []
-            
-            logger.info(f"Total jobs found and parsed: {len(jobs)}")
-            return jobs
+                    async for fragment in self._iter_list_items(response):
+                        if seen >= max_results:
+                            break
+                        seen += 1
+                        parse_started = time.perf_counter()
+                        parse_span = tracing.start_span("parse")
+                        job = self._parse_linkedin_job(BeautifulSoup(fragment, 'html.parser'))
+                        if parse_span is not None:
+                            parse_span.end()
+                        PARSE_SECONDS.observe(time.perf_counter() - parse_started)
+                        if job is not None:
+                            parsed += 1
+                            CARDS_PARSED.inc()
+                            yield job
+        finally:
+            duration = time.perf_counter() - started
+            SEARCH_SECONDS.observe(duration)
+            if stats is not None:
+                stats.update(status=status, cards=seen, parsed=parsed)
+            # One summary per page instead of a record per card
+            logger.info(
+                "Scraped LinkedIn page: %d of %d cards parsed in %.0f ms", parsed, seen, duration * 1000,
+                extra={"status": status, "cards": seen, "parsed": parsed, "duration_ms": round(duration * 1000, 1)}
+            )
+            if search_span is not None:
+                search_span.end()
+    
+    async def _iter_list_items(self, response: aiohttp.ClientResponse) -> AsyncIterator[str]:
+        """
+        Split a streamed HTML response into top-level <li> fragments
+        
+        Args:
+            response: Open response whose body has not been read yet
             
-        except Exception as e:
-            logger.error(f"Error scraping LinkedIn: {e}")
-            logger.error(f"Exception details: {str(e)}")
-            return []
+        Yields:
+            HTML of each complete top-level <li> element
+        """
+        decoder = codecs.getincrementaldecoder(response.charset or "utf-8")(errors="replace")
+        buffer = ""
+        scan = 0  # Where the next tag search starts
+        depth = 0
+        item_start = 0
+        async for chunk in response.content.iter_any():
+            buffer += decoder.decode(chunk)
+            for tag in LIST_ITEM_TAG.finditer(buffer, scan):
+                scan = tag.end()
+                if tag.group(1):
+                    depth = max(depth - 1, 0)
+                    if depth == 0:
+                        yield buffer[item_start:tag.end()]
+                elif depth == 0:
+                    item_start = tag.start()
+                    depth = 1
+                else:
+                    depth += 1
+            # A tag may be split across chunks, so rescan the last few characters
+            scan = max(scan, len(buffer) - LIST_ITEM_TAG_MAX_LENGTH + 1)
+            # Drop everything before the unfinished item
+            cut = item_start if depth else scan
+            buffer = buffer[cut:]
+            scan -= cut
+            item_start = max(item_start - cut, 0)
     
-    def _construct_linkedin_url(self, search_terms: list, location: str,
-                              remote_only: bool) -> str:
+    def _construct_linkedin_url(self, search_terms: list, location: Optional[str],
+                              remote_only: bool, start: int = 0) -> str:
         """
         Construct LinkedIn search URL.
         
         Args:
             search_terms: List of search terms
-            location: Location to search in
+            location: Location to search in; None leaves the location out
             remote_only: Whether to only return remote jobs
+            start: Offset of the first result
             
         Returns:
             Constructed URL string
         """
         # Join search terms 
         keywords = " ".join(search_terms).replace(" ", "+")
-        location = location.replace(" ", "+")
+        location = f"&location={location.replace(' ', '+')}" if location is not None else ""
         
-        url = f"https://www.linkedin.com/jobs-guest/jobs/api/seeMoreJobPostings/search?keywords={keywords}&location={location}&start=0"
-        logger.info(f"Constructed URL: {url}")
+        url = f"{self.base_url}/jobs-guest/jobs/api/seeMoreJobPostings/search?keywords={keywords}{location}&start={start}"
+        logger.debug("Constructed URL: %s", url)
         return url
     
     def _parse_linkedin_job(self, element) -> JobListing:
@@ -258,13 +491,15 @@ class JobScraperAgent:
         try:
             base_card = element.find('div', {'class': 'base-card'})
             if not base_card:
-                logger.warning("No base-card div found in element")
+                logger.debug("No base-card div found in element")
+                NO_BASE_CARD.inc()
                 return None
                 
             # Extract job ID from data-entity-urn
             job_id = base_card.get('data-entity-urn', '').split(':')[-1]
             if not job_id:
-                logger.warning("No job ID found in data-entity-urn")
+                logger.debug("No job ID found in data-entity-urn")
+                NO_JOB_ID.inc()
                 return None
                 
             # Extract job details with fallbacks
@@ -273,35 +508,41 @@ class JobScraperAgent:
             location_elem = base_card.find('span', {'class': 'job-search-card__location'})
             
             if not title_elem:
-                logger.warning("No title element found")
+                logger.debug("No title element found")
+                MISSING_ELEMENTS.inc()
                 return None
             if not company_elem:
-                logger.warning("No company element found")
+                logger.debug("No company element found")
+                MISSING_ELEMENTS.inc()
                 return None
             if not location_elem:
-                logger.warning("No location element found")
+                logger.debug("No location element found")
+                MISSING_ELEMENTS.inc()
                 return None
                 
             title = title_elem.text.strip()
             company = company_elem.text.strip()
             location = location_elem.text.strip()
-            url = f"https://www.linkedin.com/jobs/view/{job_id}"
+            url = job_url("linkedin", job_id)
             
-            logger.info(f"Successfully parsed job: {title} at {company}")
+            logger.debug("Parsed job %s: %s at %s", job_id, title, company)
             
             return JobListing(
                 title=title,
                 company=company,
                 location=location,
                 url=url,
-                source="linkedin"
+                source="linkedin",
+                job_id=job_id
             )
         except Exception as e:
-            logger.error(f"Error parsing LinkedIn job: {e}")
+            error_log.log(logging.ERROR, type(e), "Error parsing LinkedIn job: %r", e)
+            PARSE_ERROR.inc()
             return None
     
     def run(self):
         """Run the job scraper agent."""
+        configure_logging()
         try:
             logger.info("Starting job scraper agent...")
             self.agent.run()
@@ -10,15 +10,39 @@ This agent handles all user profile-related operations including:
 from uagents import Agent, Context
 from models.messages import ProfileMessage, AgentResponse
 from models.user_profile import UserProfile
+from models.compact_profile import CompactProfile
+from services.shared_state import FileLock, JournalFollower
+from services import metrics, tracing
+from services.logging_config import configure_logging
+from typing import Callable, Iterable, List, Optional, Tuple
 import logging
 import json
 import os
+import time
 from pydantic import ValidationError
+from pydantic.error_wrappers import ErrorWrapper
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+PROFILES_FILE = "profiles.json"
+# Patches are appended here as diffs; the journal is folded back into
+# PROFILES_FILE once it reaches JOURNAL_COMPACTION_THRESHOLD entries
+PROFILES_JOURNAL_FILE = "profiles.journal"
+JOURNAL_COMPACTION_THRESHOLD = 200
+# Serializes writers when several API workers share the profile files
+PROFILES_LOCK_FILE = "profiles.lock"
+
+STORE_SECONDS = metrics.histogram(
+    "lume_profile_store_seconds", "Profile store read and write latency, by operation", ["operation"])
+READ_SECONDS = STORE_SECONDS.labels("read")
+JOURNAL_WRITE_SECONDS = STORE_SECONDS.labels("journal_write")
+SNAPSHOT_WRITE_SECONDS = STORE_SECONDS.labels("snapshot_write")
+
+PROFILE_NOT_FOUND = "Profile not found"
+VERSION_MISMATCH = "Profile version mismatch"
+
+
 class ProfileAgent:
     """
     Profile Agent class that manages user profiles.
@@ -40,7 +64,14 @@ class ProfileAgent:
         )
         
         self.setup_handlers()
-        self.profiles = {}
+        self.profiles = {}  # user_id -> CompactProfile
+        self.versions = {}  # Monotonic per-profile version, bumped on every change
+        self.modified = {}  # Unix time of each profile's last change
+        self.journal_entries = 0
+        self.lock = FileLock(PROFILES_LOCK_FILE)
+        self.journal = JournalFollower(PROFILES_JOURNAL_FILE)
+        self.snapshot_identity = None  # Identifies the snapshot file last loaded or written
+        self.listeners: List[Callable[[str, Optional[Iterable[str]]], None]] = []
         self.load_profiles()
 
     def setup_handlers(self):
@@ -59,6 +90,14 @@ class ProfileAgent:
                     response = await self.create_profile(msg.profile)
                 elif msg.action == "update":
                     response = await self.update_profile(msg.profile)
+                elif msg.action == "patch":
+                    changes = dict(msg.profile)
+                    user_id = changes.pop("user_id", None)
+                    response = await self.patch_profile(
+                        user_id,
+                        changes,
+                        expected_version=msg.expected_version
+                    )
                 elif msg.action == "get":
                     response = await self.get_profile(msg.profile["user_id"])
                 else:
@@ -76,20 +115,36 @@ class ProfileAgent:
                     message=str(e)
                 ))
     
+    # Mutations run under the profile file lock, on top of the latest shared
+    # state. The lock is waited for off the event loop but held by the loop
+    # thread, so the mutation itself must not await.
+    
     async def create_profile(self, profile_data: dict) -> AgentResponse:
         """Create a new user profile."""
+        async with self.lock:
+            self.refresh()
+            return self._create_profile(profile_data)
+    
+    def _create_profile(self, profile_data: dict) -> AgentResponse:
         try:
             # Create and validate profile using Pydantic
-            profile = UserProfile(**profile_data)
+            with tracing.span("validate"):
+                profile = UserProfile(**profile_data)
             
             # Store profile
-            self.profiles[profile.user_id] = profile
+            replaced = self.profiles.get(profile.user_id)
+            self.profiles[profile.user_id] = CompactProfile.from_profile(profile)
+            if replaced is not None:
+                replaced.release()
+            version = self._bump_version(profile.user_id)
             self.save_profiles()
+            self._notify(profile.user_id, None)
             
             return AgentResponse(
                 status="success",
                 message="Profile created successfully",
-                profile=profile.dict()
+                profile=profile.dict(),
+                version=version
             )
             
         except ValidationError as e:
@@ -107,25 +162,40 @@ class ProfileAgent:
     
     async def update_profile(self, profile_data: dict) -> AgentResponse:
         """Update an existing user profile."""
+        async with self.lock:
+            self.refresh()
+            return self._update_profile(profile_data)
+    
+    def _update_profile(self, profile_data: dict) -> AgentResponse:
         try:
             user_id = profile_data.get("user_id")
             if not user_id or user_id not in self.profiles:
                 return AgentResponse(
                     status="error",
-                    message="Profile not found"
+                    message=PROFILE_NOT_FOUND
                 )
             
             # Validate updated data
-            updated_profile = UserProfile(**profile_data)
+            with tracing.span("validate"):
+                updated_profile = UserProfile(**profile_data)
             
             # Update profile
-            self.profiles[user_id] = updated_profile
+            replaced = self.profiles[user_id]
+            previous = replaced.to_dict()
+            self.profiles[user_id] = CompactProfile.from_profile(updated_profile)
+            replaced.release()
+            version = self._bump_version(user_id)
             self.save_profiles()
+            self._notify(user_id, [
+                field for field, value in updated_profile.dict().items()
+                if previous.get(field) != value
+            ])
             
             return AgentResponse(
                 status="success",
                 message="Profile updated successfully",
-                profile=updated_profile.dict()
+                profile=updated_profile.dict(),
+                version=version
             )
             
         except ValidationError as e:
@@ -141,19 +211,94 @@ class ProfileAgent:
                 message=str(e)
             )
     
+    async def patch_profile(self, user_id: str, changes: dict,
+                            expected_version: Optional[int] = None) -> AgentResponse:
+        """
+        Apply a partial update to an existing user profile.
+        
+        Only the changed fields are validated, and only the fields whose
+        value actually changed are written to the profile journal.
+        
+        Args:
+            user_id: ID of the profile to update
+            changes: Mapping of field name to new value
+            expected_version: If set, the update is rejected unless it matches
+                the current profile version (optimistic concurrency)
+            
+        Returns:
+            AgentResponse with the updated profile and its new version
+        """
+        async with self.lock:
+            self.refresh()
+            return self._patch_profile(user_id, changes, expected_version)
+    
+    def _patch_profile(self, user_id: str, changes: dict, expected_version: Optional[int]) -> AgentResponse:
+        try:
+            profile = self.profiles.get(user_id)
+            if profile is None:
+                return AgentResponse(
+                    status="error",
+                    message=PROFILE_NOT_FOUND
+                )
+            
+            version = self.versions.get(user_id, 1)
+            if expected_version is not None and expected_version != version:
+                return AgentResponse(
+                    status="error",
+                    message=VERSION_MISMATCH,
+                    version=version
+                )
+            
+            validated = self._validate_fields(changes)
+            diff = {
+                field: value for field, value in validated.items()
+                if profile.get_field(field) != value
+            }
+            
+            if diff:
+                for field, value in diff.items():
+                    profile.set_field(field, value)
+                version = self._bump_version(user_id)
+                self._append_journal(user_id, version, diff)
+                self._notify(user_id, list(diff))
+            
+            return AgentResponse(
+                status="success",
+                message="Profile updated successfully",
+                profile=profile.to_dict(),
+                version=version
+            )
+            
+        except ValidationError as e:
+            logger.error(f"Profile validation error: {e}")
+            return AgentResponse(
+                status="error",
+                message="Invalid profile data"
+            )
+        except Exception as e:
+            logger.error(f"Error patching profile: {e}")
+            return AgentResponse(
+                status="error",
+                message=str(e)
+            )
+    
+    @metrics.timed(READ_SECONDS)
+    @tracing.traced("profile_read")
     async def get_profile(self, user_id: str) -> AgentResponse:
         """Retrieve a user profile."""
         try:
+            self.refresh()
             if user_id not in self.profiles:
                 return AgentResponse(
                     status="error",
-                    message="Profile not found"
+                    message=PROFILE_NOT_FOUND
                 )
             
             return AgentResponse(
                 status="success",
                 message="Profile retrieved successfully",
-                profile=self.profiles[user_id].dict()
+                profile=self.profiles[user_id].to_dict(),
+                version=self.versions.get(user_id, 1)
             )
             
         except Exception as e:
@@ -163,32 +308,197 @@ class ProfileAgent:
                 message=str(e)
             )
     
+    def add_listener(self, listener: Callable[[str, Optional[Iterable[str]]], None]):
+        """
+        Register a callback for profile changes
+        
+        Args:
+            listener: Called with the user ID and the changed field names
+                (None when the whole profile was created or replaced)
+        """
+        self.listeners.append(listener)
+    
+    def _notify(self, user_id: str, changed_fields: Optional[Iterable[str]]):
+        """Tell listeners that a profile changed."""
+        for listener in self.listeners:
+            try:
+                listener(user_id, changed_fields)
+            except Exception as e:
+                logger.error(f"Error notifying profile listener: {e}")
+    
+    @tracing.traced("validate")
+    def _validate_fields(self, changes: dict) -> dict:
+        """Validate the given fields against the UserProfile schema without building a full model."""
+        validated = {}
+        errors = []
+        for name, value in changes.items():
+            field = UserProfile.__fields__.get(name)
+            if field is None or name == "user_id":
+                errors.append(ErrorWrapper(ValueError("field cannot be updated"), loc=name))
+                continue
+            
+            value, error = field.validate(value, validated, loc=name, cls=UserProfile)
+            if error:
+                errors.append(error)
+            else:
+                validated[name] = value
+        
+        if errors:
+            raise ValidationError(errors, UserProfile)
+        return validated
+    
+    def _bump_version(self, user_id: str) -> int:
+        """Increment and return the version of a profile."""
+        version = self.versions.get(user_id, 0) + 1
+        self.versions[user_id] = version
+        self.modified[user_id] = time.time()
+        return version
+    
+    def get_version(self, user_id: str) -> Optional[Tuple[int, float]]:
+        """
+        Return a profile's version and last modification time without copying it
+        
+        Args:
+            user_id: ID of the profile
+            
+        Returns:
+            (version, modified unix time), or None if the profile does not exist
+        """
+        self.refresh()
+        if user_id not in self.profiles:
+            return None
+        return self.versions.get(user_id, 1), self.modified.get(user_id, 0.0)
+    
+    @metrics.timed(JOURNAL_WRITE_SECONDS)
+    @tracing.traced("journal_write")
+    def _append_journal(self, user_id: str, version: int, changes: dict):
+        """Persist a profile diff, compacting the journal into a snapshot when it grows too large."""
+        try:
+            with self.lock, open(PROFILES_JOURNAL_FILE, "a") as f:
+                f.write(json.dumps({
+                    "user_id": user_id,
+                    "version": version,
+                    "modified": self.modified.get(user_id),
+                    "changes": changes
+                }) + "\n")
+            # Move past our own entry (already applied in memory) so it is only counted
+            self._replay(self.journal.read_new())
+        except Exception as e:
+            logger.error(f"Error writing profile journal: {e}")
+            # Fall back to a full snapshot so the change is not lost
+            self.save_profiles()
+            return
+        
+        if self.journal_entries >= JOURNAL_COMPACTION_THRESHOLD:
+            self.save_profiles()
+    
+    @metrics.timed(SNAPSHOT_WRITE_SECONDS)
+    @tracing.traced("save_profiles")
     def save_profiles(self):
-        """Save profiles to persistent storage."""
+        """Save a full snapshot of all profiles and truncate the journal."""
         try:
-            with open("profiles.json", "w") as f:
-                json.dump(
-                    {k: v.dict() for k, v in self.profiles.items()},
-                    f,
-                    indent=2
-                )
+            # Written to a temporary file and renamed, so readers never see a partial snapshot
+            temp_file = f"{PROFILES_FILE}.{os.getpid()}.tmp"
+            with self.lock:
+                with open(temp_file, "w") as f:
+                    json.dump(
+                        {
+                            k: {
+                                **v.to_dict(),
+                                "version": self.versions.get(k, 1),
+                                "modified": self.modified.get(k)
+                            }
+                            for k, v in self.profiles.items()
+                        },
+                        f,
+                        indent=2
+                    )
+                os.replace(temp_file, PROFILES_FILE)
+                self.snapshot_identity = self._snapshot_identity()
+                if os.path.exists(PROFILES_JOURNAL_FILE):
+                    os.remove(PROFILES_JOURNAL_FILE)
+                self.journal = JournalFollower(PROFILES_JOURNAL_FILE)
+                self.journal_entries = 0
         except Exception as e:
             logger.error(f"Error saving profiles: {e}")
     
     def load_profiles(self):
-        """Load profiles from persistent storage."""
+        """Load the profile snapshot and replay any journaled patches on top of it."""
+        profiles, versions, modified = {}, {}, {}
+        snapshot_identity = self._snapshot_identity()
         try:
-            if os.path.exists("profiles.json"):
-                with open("profiles.json", "r") as f:
+            if snapshot_identity is not None:
+                # Snapshots written before modification times were tracked fall back to the file time
+                snapshot_time = os.path.getmtime(PROFILES_FILE)
+                with open(PROFILES_FILE, "r") as f:
                     data = json.load(f)
-                    self.profiles = {
-                        k: UserProfile(**v) for k, v in data.items()
-                    }
+                    for k, v in data.items():
+                        versions[k] = v.pop("version", 1)
+                        modified[k] = v.pop("modified", None) or snapshot_time
+                        profiles[k] = CompactProfile.from_profile(UserProfile(**v))
         except Exception as e:
             logger.error(f"Error loading profiles: {e}")
+        
+        replaced = self.profiles.values()
+        self.profiles, self.versions, self.modified = profiles, versions, modified
+        for profile in replaced:
+            profile.release()
+        self.snapshot_identity = snapshot_identity
+        self.journal = JournalFollower(PROFILES_JOURNAL_FILE)
+        self.journal_entries = 0
+        try:
+            self._replay(self.journal.read_new())
+        except Exception as e:
+            logger.error(f"Error replaying profile journal: {e}")
+    
+    def refresh(self):
+        """
+        Pick up changes other processes made to the shared profile files
+        
+        New journal entries are applied in place; a new snapshot (written on
+        creation, full update or compaction) triggers a full reload. Listeners
+        are notified of every profile that changed.
+        """
+        try:
+            if self._snapshot_identity() == self.snapshot_identity:
+                self._replay(self.journal.read_new(), notify=True)
+                return
+            
+            previous = self.versions
+            self.load_profiles()
+            for user_id, version in self.versions.items():
+                if previous.get(user_id) != version:
+                    self._notify(user_id, None)
+        except Exception as e:
+            logger.error(f"Error refreshing profiles: {e}")
+    
+    def _replay(self, entries: List[dict], notify: bool = False):
+        """Apply journal entries newer than the in-memory profiles."""
+        for entry in entries:
+            user_id = entry["user_id"]
+            profile = self.profiles.get(user_id)
+            self.journal_entries += 1
+            # Entries already folded into the snapshot, or written by this process, are skipped
+            if profile is None or entry["version"] <= self.versions.get(user_id, 1):
+                continue
+            for field, value in entry["changes"].items():
+                profile.set_field(field, value)
+            self.versions[user_id] = entry["version"]
+            self.modified[user_id] = entry.get("modified") or self.modified.get(user_id, 0.0)
+            if notify:
+                self._notify(user_id, list(entry["changes"]))
+    
+    def _snapshot_identity(self) -> Optional[Tuple[int, int, int]]:
+        """Return (inode, mtime, size) of the snapshot file, or None if there is none."""
+        try:
+            stat = os.stat(PROFILES_FILE)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
     
     def run(self):
         """Run the profile agent."""
+        configure_logging()
         try:
             logger.info("Starting profile agent...")
             self.agent.run()
@@ -0,0 +1,259 @@
+"""
+Recommendation Agent for the Lume application.
+This agent ranks known job listings against user profiles
+
+The agent:
+1. Receives recommendation requests
+2. Looks up the user's profile
+3. Scores the cached job corpus against the profile
+4. Returns the top matches with their scores
+"""
+
+from uagents import Agent, Context
+from models.messages import RecommendationMessage, AgentResponse
+from models.job import JobListing
+from agents.profile_agent import ProfileAgent
+from services.recommender import JobRecommender, job_key, profile_features, BATCH_BLOCK_SIZE
+from services.job_index import JobIndex
+from services.dedup import NearDuplicateDetector
+from services.gazetteer import GeoIndex, resolve
+from services.logging_config import configure_logging
+import asyncio
+import functools
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Above this corpus size, candidates are pre-selected from the inverted
+# index and only CANDIDATE_POOL_SIZE jobs are fully scored
+CANDIDATE_POOL_SIZE = 2000
+
+class RecommendationAgent:
+    """
+    Recommendation Agent class that matches jobs to users
+
+    Responsibilities:
+    1. Maintains the corpus of known job listings
+    2. Scores jobs against user profiles
+    3. Returns ranked recommendations
+    """
+
+    def __init__(self, profile_agent: Optional[ProfileAgent] = None):
+        """Initialize the recommendation agent"""
+        self.agent = Agent(
+            name="recommendation_agent",
+            port=8002,
+            endpoint=["http://0.0.0.0:8002/submit"],
+            seed="recommendation_agent_58210934"
+        )
+
+        self.profile_agent = profile_agent or ProfileAgent()
+        self.recommender = JobRecommender()
+        self.index = JobIndex()
+        self.duplicates = NearDuplicateDetector()
+        self.geo = GeoIndex()
+        self.listeners: List[Callable[[List[JobListing]], None]] = []
+
+        self.setup_handlers()
+
+    def setup_handlers(self):
+        """Set up message handlers for recommendation operations."""
+        @self.agent.on_event("startup")
+        async def initialize(ctx: Context):
+            """Initialize the recommendation agent on startup."""
+            logger.info("Recommendation Agent initialized")
+
+        @self.agent.on_message(model=RecommendationMessage)
+        async def handle_recommendation_message(ctx: Context, sender: str, msg: RecommendationMessage):
+            try:
+                logger.info(f"Received recommendation request from {sender}")
+
+                response = await self.recommend(msg.user_id, msg.num_recommendations)
+                await ctx.send(sender, response)
+
+            except Exception as e:
+                logger.error(f"Error handling recommendation request: {e}")
+                await ctx.send(sender, AgentResponse(
+                    status="error",
+                    message=str(e)
+                ))
+
+    def add_jobs(self, jobs: List[JobListing]) -> int:
+        """
+        Add job listings to the recommendation corpus
+
+        Args:
+            jobs: List of JobListing objects
+
+        Returns:
+            Number of jobs that were not already known
+        """
+        # Near-duplicates of a known posting are collapsed onto it
+        fresh = []
+        for job in jobs:
+            key = job_key(job)
+            if key not in self.recommender.job_rows and self.duplicates.canonical_key(job) == key:
+                fresh.append(job)
+
+        start = len(self.recommender)
+        added = self.recommender.add_jobs(fresh)
+        for row in range(start, len(self.recommender)):
+            self.index.add(row, self.recommender.jobs[row])
+        # Every copy's location is indexed under its canonical row, so radius
+        # filters find a role through its local copy
+        for job in jobs:
+            row = self.recommender.job_rows.get(self.duplicates.canonical_key(job))
+            if row is not None:
+                self.geo.add(row, resolve(job.location))
+        if added:
+            logger.debug("Added %d jobs to recommendation corpus (%d total)", added, len(self.recommender))
+            new_jobs = self.recommender.jobs[start:]
+            for listener in self.listeners:
+                try:
+                    listener(new_jobs)
+                except Exception as e:
+                    logger.error(f"Error notifying job listener: {e}")
+        return added
+
+    def collapse_duplicates(self, jobs: List[JobListing]) -> List[JobListing]:
+        """
+        Drop postings that are near-duplicates of an earlier posting in the list
+
+        Args:
+            jobs: List of JobListing objects
+
+        Returns:
+            The jobs in their original order, keeping the first posting of each canonical job
+        """
+        seen = set()
+        unique = []
+        for job in jobs:
+            canonical = self.duplicates.canonical_key(job)
+            if canonical not in seen:
+                seen.add(canonical)
+                unique.append(job)
+        if len(unique) < len(jobs):
+            logger.debug("Collapsed %d duplicate job postings", len(jobs) - len(unique))
+        return unique
+
+    def add_listener(self, listener: Callable[[List[JobListing]], None]):
+        """
+        Register a callback for new jobs
+
+        Args:
+            listener: Called with the jobs that were newly added to the corpus
+        """
+        self.listeners.append(listener)
+
+    def jobs_near(self, locations: List[str], radius_km: float) -> np.ndarray:
+        """
+        Find corpus jobs within a distance of any of the given locations
+
+        Args:
+            locations: Free-text locations; "Remote" matches remote jobs
+            radius_km: Maximum distance in kilometres
+
+        Returns:
+            Sorted array of corpus rows
+        """
+        places = [place for place in map(resolve, locations) if place is not None]
+        return np.asarray(sorted(self.geo.near_any(places, radius_km)), dtype=np.int64)
+
+    def rank_profile(self, profile: dict, num_recommendations: int,
+                     radius_km: Optional[float] = None) -> List[Tuple[JobListing, float]]:
+        """
+        Rank the job corpus for a profile
+
+        Args:
+            profile: Profile dict to score
+            num_recommendations: Maximum number of jobs to return
+            radius_km: If set, only jobs within this distance of a preferred location are ranked
+
+        Returns:
+            List of (job, score) pairs, best first
+        """
+        candidates = None
+        if radius_km is not None:
+            candidates = self.jobs_near(profile.get("preferred_locations", []), radius_km)
+        if len(self.recommender) > CANDIDATE_POOL_SIZE:
+            retrieved = self.index.search(profile_features(profile), CANDIDATE_POOL_SIZE)
+            candidates = retrieved if candidates is None else np.intersect1d(retrieved, candidates)
+        return self.recommender.recommend(profile, num_recommendations, rows=candidates)
+
+    async def recommend(self, user_id: str, num_recommendations: int = 5) -> AgentResponse:
+        """
+        Recommend jobs for a user
+
+        Args:
+            user_id: ID of the user to recommend jobs for
+            num_recommendations: Maximum number of jobs to return
+
+        Returns:
+            AgentResponse with recommendations and their match scores
+        """
+        try:
+            profile_response = await self.profile_agent.get_profile(user_id)
+            if profile_response.status == "error":
+                return profile_response
+
+            ranked = self.rank_profile(profile_response.profile, num_recommendations)
+
+            return AgentResponse(
+                status="success",
+                message=f"Found {len(ranked)} recommendations",
+                recommendations=[job for job, _ in ranked],
+                match_scores=[score for _, score in ranked]
+            )
+
+        except Exception as e:
+            logger.error(f"Error recommending jobs for user {user_id}: {e}")
+            return AgentResponse(
+                status="error",
+                message=str(e)
+            )
+
+    async def recommend_all(self, num_recommendations: int = 5, block_size: int = BATCH_BLOCK_SIZE,
+                            workers: int = 1) -> Dict[str, Tuple[dict, List[Tuple[JobListing, float]]]]:
+        """
+        Recompute recommendations for every known user in one batch
+
+        The corpus and the profiles are captured on the event loop, which is
+        the only place they change; the scoring runs in the default executor.
+        Users whose profile changed meanwhile are left out, so their newer
+        profile is ranked on its own.
+
+        Args:
+            num_recommendations: Maximum number of jobs per user
+            block_size: Number of users scored per sparse matrix product
+            workers: Number of processes to score blocks in
+
+        Returns:
+            Mapping of user ID to the profile dict that was scored and its ranked (job, score) pairs
+        """
+        corpus = self.recommender.snapshot()
+        profiles = self.profile_agent.profiles
+        versions = self.profile_agent.versions
+        user_ids = list(profiles)
+        scored = [profiles[user_id].to_dict() for user_id in user_ids]
+        scored_versions = [versions.get(user_id) for user_id in user_ids]
+        ranked = await asyncio.get_running_loop().run_in_executor(None, functools.partial(
+            corpus.recommend_batch, scored, num_recommendations, block_size=block_size, workers=workers
+        ))
+        logger.info(f"Recomputed recommendations for {len(user_ids)} users")
+        return {
+            user_id: (profile, recommendations)
+            for user_id, profile, version, recommendations in zip(user_ids, scored, scored_versions, ranked)
+            if user_id in profiles and versions.get(user_id) == version
+        }
+
+    def run(self):
+        """Run the recommendation agent."""
+        configure_logging()
+        try:
+            logger.info("Starting recommendation agent...")
+            self.agent.run()
+        except Exception as e:
+            logger.error(f"Error running recommendation agent: {e}")
+            raise
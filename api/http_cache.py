@@ -0,0 +1,298 @@
+"""
+HTTP caching helpers for the Lume API
+Conditional GET handling (ETag / Last-Modified / 304) and response compression
+
+Validators are computed from data the agents already track (profile versions,
+job history timestamps), so a poll that hits a matching validator is answered
+with an empty 304 before anything is loaded or serialized. Bodies that are
+sent in full are encoded once per validator and kept, plain and gzipped, in
+a small LRU.
+
+A gzipped body is a different representation from the plain one, so its
+strong ETag carries a "-gzip" suffix. Conditional requests match either
+variant, and a 304 repeats the variant the client holds.
+"""
+
+import gzip
+import hashlib
+import inspect
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from fastapi import Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from services import tracing
+from services.serialization import dumps
+
+# Clients may keep a copy but must revalidate it on every use
+CACHE_CONTROL = "private, no-cache"
+
+# Media types that are flushed frame by frame and must not be buffered by gzip
+STREAMING_MEDIA_TYPES = frozenset({"application/x-ndjson", "text/event-stream"})
+
+# Responses smaller than this are not worth compressing
+GZIP_MINIMUM_SIZE = 1000
+GZIP_COMPRESSLEVEL = 6
+
+# Number of encoded bodies kept by EncodedBodyCache
+ENCODED_BODY_CACHE_SIZE = 1024
+
+
+def strong_etag(*parts) -> str:
+    """Build a strong ETag from the values that determine a response body."""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def gzip_etag(etag: str) -> str:
+    """The ETag of the gzipped variant of a body; weak ETags are shared by both variants."""
+    if etag.startswith('"') and not etag.endswith('-gzip"'):
+        return etag[:-1] + '-gzip"'
+    return etag
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an Accept-Encoding header allows gzip: listed, or covered by "*", with a q-value above 0."""
+    qualities = {}
+    for item in (accept_encoding or "").split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+def http_date(timestamp: float) -> str:
+    """Format a unix time as an HTTP date, truncated to whole seconds."""
+    return format_datetime(datetime.fromtimestamp(int(timestamp), tz=timezone.utc), usegmt=True)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag or tag == gzip_etag(etag):
+            return True
+    return False
+
+
+def is_not_modified(headers: Headers, etag: str, last_modified: Optional[float] = None) -> bool:
+    """
+    Evaluate a request's conditional headers against the current validators
+
+    Args:
+        headers: Request headers
+        etag: Current ETag of the resource
+        last_modified: Unix time the resource last changed, if known
+
+    Returns:
+        True if the client's copy is current and a 304 can be sent
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return int(last_modified) <= since.timestamp()
+
+
+def cache_headers(etag: str, last_modified: Optional[float] = None) -> dict:
+    """Return the validator and Cache-Control headers for a cacheable response."""
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified_response(etag: str, last_modified: Optional[float] = None) -> Response:
+    """Build an empty 304 response carrying the current validators."""
+    return Response(status_code=304, headers=cache_headers(etag, last_modified))
+
+
+class JSONBytesResponse(Response):
+    """JSON response rendered with the fast encoder; bytes are sent as already encoded."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        with tracing.span("serialize"):
+            return dumps(content)
+
+
+class EncodedBodyCache:
+    """LRU of encoded JSON response bodies, keyed by resource and validator."""
+
+    def __init__(self, size: int = ENCODED_BODY_CACHE_SIZE):
+        """
+        Args:
+            size: Maximum number of bodies kept
+        """
+        self.size = size
+        self.entries: "OrderedDict[Hashable, List[Optional[bytes]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    async def response(self, request_headers: Headers, key: Hashable, build: Callable[[], Any],
+                       headers: Optional[Dict[str, str]] = None) -> Response:
+        """
+        Return a response for a cacheable body, encoding it only on a miss
+
+        Args:
+            request_headers: Request headers, checked for gzip support
+            key: Identifies the body; must change whenever the body would
+            build: Returns the payload (or an awaitable of it) to encode on a miss
+            headers: Extra response headers
+
+        Returns:
+            Response with the plain or pre-compressed body
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            payload = build()
+            if inspect.isawaitable(payload):
+                payload = await payload
+            with tracing.span("serialize"):
+                entry = self.entries[key] = [dumps(payload), None]
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+
+        body = entry[0]
+        headers = dict(headers or {})
+        if len(body) >= GZIP_MINIMUM_SIZE and accepts_gzip(request_headers.get("accept-encoding")):
+            if entry[1] is None:
+                entry[1] = gzip.compress(body, compresslevel=GZIP_COMPRESSLEVEL, mtime=0)
+            body = entry[1]
+            # Already encoded, so the compression middleware passes it through
+            headers["Content-Encoding"] = "gzip"
+            headers["Vary"] = "Accept-Encoding"
+            if "ETag" in headers:
+                headers["ETag"] = gzip_etag(headers["ETag"])
+        return JSONBytesResponse(body, headers=headers)
+
+
+class _GzipSender:
+    """Wraps one response's send callable, compressing its body if that is worthwhile."""
+
+    def __init__(self, send: Send, request_headers: Headers, minimum_size: int, compresslevel: int):
+        self.send = send
+        self.request_headers = request_headers
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+        self.start: Optional[Message] = None  # Held until the first body message decides the encoding
+        self.passthrough = False
+        self.compressor = None  # Set while a streamed body is being compressed
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "").split(";")[0].strip()
+            if message["status"] == 304:
+                self._not_modified_etag(message)
+                self.passthrough = True
+            else:
+                # Already encoded bodies are forwarded as-is, and streams must not be buffered
+                self.passthrough = "content-encoding" in headers or content_type in STREAMING_MEDIA_TYPES
+            if self.passthrough:
+                await self.send(message)
+            else:
+                self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = "gzip"
+            headers.add_vary_header("Accept-Encoding")
+            if "etag" in headers:
+                headers["ETag"] = gzip_etag(headers["etag"])
+            if not more_body:
+                body = gzip.compress(body, compresslevel=self.compresslevel, mtime=0)
+                headers["Content-Length"] = str(len(body))
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            del headers["Content-Length"]
+            self.compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            await self.send(start)
+
+        body = self.compressor.compress(body)
+        if not more_body:
+            body += self.compressor.flush()
+        await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+    def _not_modified_etag(self, message: Message):
+        """Answer a 304 with the ETag variant the client sent."""
+        headers = MutableHeaders(raw=message["headers"])
+        etag = headers.get("etag")
+        if etag is not None and gzip_etag(etag) in self.request_headers.get("if-none-match", ""):
+            headers["ETag"] = gzip_etag(etag)
+
+
+class CompressionMiddleware:
+    """GZip compression for regular responses; NDJSON and SSE streams and encoded bodies are left alone."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = GZIP_MINIMUM_SIZE,
+                 compresslevel: int = GZIP_COMPRESSLEVEL):
+        """
+        Args:
+            app: Application to wrap
+            minimum_size: Bodies smaller than this many bytes are sent uncompressed
+            compresslevel: zlib compression level
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            headers = Headers(scope=scope)
+            if accepts_gzip(headers.get("accept-encoding")):
+                send = _GzipSender(send, headers, self.minimum_size, self.compresslevel)
+        await self.app(scope, receive, send)
@@ -3,26 +3,59 @@ FastAPI application for the Lume backend
 This serves as the central orchestrator for all agents and provides the API endpoints
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Header, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict
+from datetime import datetime
+import asyncio
 import logging
+import os
+import secrets
+import time
 import uvicorn
 
 # Import our agents and scheduler
-from agents.profile_agent import ProfileAgent
+from agents.profile_agent import ProfileAgent, PROFILE_NOT_FOUND, VERSION_MISMATCH
 from agents.job_scraper_agent import JobScraperAgent
+from agents.recommendation_agent import RecommendationAgent
+from models.job import JobListing, JobRecommendationRequest, JobRecommendationResponse
+from services.user_jobs import DEFAULT_PAGE_SIZE, DEFAULT_SORT, MAX_PAGE_SIZE, InvalidQuery
+from services.job_archive import InvalidArchiveQuery
 from api.scheduler import JobScheduler
+from services.shared_state import LeaderLease
+from api.http_cache import (
+    GZIP_COMPRESSLEVEL,
+    GZIP_MINIMUM_SIZE,
+    CompressionMiddleware,
+    EncodedBodyCache,
+    JSONBytesResponse,
+    cache_headers,
+    is_not_modified,
+    not_modified_response,
+    strong_etag,
+)
+from services.serialization import dumps, select_fields
+from services.search_tasks import SearchTaskManager
+from services.admission import CLIENT_QUOTA, AdmissionLimiter, Overloaded
+from services.gazetteer import resolve
+from services import metrics
+from services.tracing import tracer_from_env
+from api.server_timing import TracingMiddleware
+from services.profiling import DONE, PROFILER, ProfilerBusy
+from api.request_profiling import ProfilingMiddleware
+from services.logging_config import configure_logging
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Lume API",
     description="Backend API for the Lume job application assistant",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=JSONBytesResponse
 )
 
 # Configure CORS
@@ -32,12 +65,111 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "Server-Timing"],
+)
+app.add_middleware(CompressionMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_COMPRESSLEVEL)
+app.add_middleware(ProfilingMiddleware, hooks=PROFILER)
+# Outermost, so traces cover compression and CORS too. Sampled traces go to
+# LUME_TRACE_FILE (default traces.jsonl) at LUME_TRACE_SAMPLE_RATE (default 1%)
+app.add_middleware(
+    TracingMiddleware,
+    tracer=tracer_from_env(),
+    server_timing=os.getenv("LUME_SERVER_TIMING", "1") != "0"
 )
 
+# /admin endpoints are disabled unless this is set; callers send it as X-Admin-Token
+ADMIN_TOKEN = os.getenv("LUME_ADMIN_TOKEN")
+
+# Files shared by the API workers
+SCHEDULER_LEASE_FILE = "scheduler.lease"
+JOBS_JOURNAL_FILE = "jobs.msgpack"
+JOB_ARCHIVE_DIR = os.getenv("LUME_ARCHIVE_DIR", "job_archive")
+
 # Initialize agents and scheduler
 profile_agent = ProfileAgent()
 job_scraper_agent = JobScraperAgent()
-job_scheduler = JobScheduler()
+recommendation_agent = RecommendationAgent(profile_agent)
+# Every worker process builds its own agents; state is shared through the
+# profile and job journals, and only the lease holder runs the scraping jobs
+job_scheduler = JobScheduler(
+    profile_agent,
+    recommendation_agent,
+    leader_lease=LeaderLease(SCHEDULER_LEASE_FILE),
+    jobs_journal=JOBS_JOURNAL_FILE,
+    archive_dir=JOB_ARCHIVE_DIR
+)
+
+# Encoded GET bodies, keyed by the same values as their ETags
+body_cache = EncodedBodyCache()
+
+# Background searches started through /searches
+search_tasks = SearchTaskManager()
+
+# Admission control: synchronous scrapes hold a worker slot for the whole
+# upstream round trip, and uncached recommendations are CPU bound
+search_limiter = AdmissionLimiter("job search", max_concurrent=4, max_queue=16, queue_timeout=10, per_client=2)
+recommendation_limiter = AdmissionLimiter("recommendations", max_concurrent=8, max_queue=64, queue_timeout=2, per_client=8)
+# Archive scans read whole columns, so few run at once
+analytics_limiter = AdmissionLimiter("analytics", max_concurrent=2, max_queue=8, queue_timeout=10, per_client=2)
+
+def _cache_lookups() -> Dict[str, tuple]:
+    """(hits, misses) of each cache worth watching"""
+    resolved = resolve.cache_info()
+    return {
+        "body": (body_cache.hits, body_cache.misses),
+        "recommendations": (job_scheduler.recommendations_data.hits, job_scheduler.recommendations_data.misses),
+        "gazetteer": (resolved.hits, resolved.misses),
+    }
+
+# Read when /metrics is scraped, so these cost nothing in between
+metrics.collector(
+    "lume_cache_lookups_total", "counter", "Cache lookups by cache and result",
+    lambda: (
+        ({"cache": name, "result": result}, count)
+        for name, counts in _cache_lookups().items()
+        for result, count in zip(("hit", "miss"), counts)
+    )
+)
+metrics.collector(
+    "lume_cache_hit_ratio", "gauge", "Share of cache lookups that hit since the process started",
+    lambda: metrics.hit_ratio_samples(_cache_lookups())
+)
+metrics.collector(
+    "lume_admission_in_flight", "gauge", "Operations holding or waiting for an admission slot",
+    lambda: (
+        ({"limiter": limiter.name, "state": state}, value)
+        for limiter in (search_limiter, recommendation_limiter, analytics_limiter)
+        for state, value in (("running", limiter.running), ("queued", len(limiter.waiters)))
+    )
+)
+metrics.collector(
+    "lume_admission_shed_total", "counter", "Operations rejected by admission control, by reason",
+    lambda: (
+        ({"limiter": limiter.name, "reason": reason}, count)
+        for limiter in (search_limiter, recommendation_limiter, analytics_limiter)
+        for reason, count in limiter.shed.items()
+    )
+)
+metrics.collector(
+    "lume_background_searches", "gauge", "Background searches held by this worker, by status",
+    lambda: (({"status": status}, count) for status, count in search_tasks.stats().items() if status != "rejected")
+)
+
+def _admission(limiter: AdmissionLimiter):
+    """Build a dependency that holds a limiter slot until the response has been sent."""
+    async def admit(request: Request):
+        async with limiter.admit(request.client.host if request.client else None):
+            yield
+    return admit
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    """Shed load with 503 (or 429 for a client over its quota) and a Retry-After hint"""
+    return JSONBytesResponse(
+        {"detail": str(exc), "reason": exc.reason},
+        status_code=429 if exc.reason == CLIENT_QUOTA else 503,
+        headers={"Retry-After": str(exc.retry_after)}
+    )
 
 @app.on_event("startup")
 async def startup_event():
@@ -46,6 +178,7 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     job_scheduler.stop()
+    await search_tasks.shutdown()
 
 class UserProfileCreate(BaseModel):
     user_id: str
@@ -88,54 +221,150 @@ async def create_profile(profile: UserProfileCreate):
         logger.error(f"Error creating profile: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _profile_etag(version: int) -> str:
+    """Build the ETag header value for a profile version."""
+    return f'"{version}"'
+
+def _parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Turn an If-Match header into the profile version it expects, or None for any version."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.strip()
+    if tag.startswith('"') and tag.endswith('"'):
+        tag = tag[1:-1]
+    try:
+        return int(tag)
+    except ValueError:
+        raise HTTPException(status_code=412, detail=VERSION_MISMATCH)
+
 @app.get("/profiles/{user_id}")
-async def get_profile(user_id: str):
-    """Get a user profile by ID"""
+async def get_profile(user_id: str, request: Request):
+    """Get a user profile by ID, answering 304 if the client's copy is current"""
     try:
-        response = await profile_agent.get_profile(user_id)
-        if response.status == "error":
-            raise HTTPException(status_code=404, detail=response.message)
-        return response
+        validators = profile_agent.get_version(user_id)
+        if validators is None:
+            raise HTTPException(status_code=404, detail=PROFILE_NOT_FOUND)
+        version, modified = validators
+        etag = _profile_etag(version)
+        if is_not_modified(request.headers, etag, modified):
+            return not_modified_response(etag, modified)
+        
+        return await body_cache.response(
+            request.headers,
+            ("profile", user_id, version),
+            lambda: profile_agent.get_profile(user_id),
+            headers=cache_headers(etag, modified)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting profile: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.put("/profiles/{user_id}")
-async def update_profile(user_id: str, profile_update: UserProfileUpdate):
-    """Update a user profile"""
+async def _apply_profile_update(user_id: str, profile_update: UserProfileUpdate,
+                                if_match: Optional[str]) -> JSONBytesResponse:
+    """Apply only the fields set in the request, honoring If-Match against the profile version."""
     try:
-        # Get existing profile
-        existing_profile = await profile_agent.get_profile(user_id)
-        if existing_profile.status == "error":
-            raise HTTPException(status_code=404, detail=existing_profile.message)
-        
-        # Update with new values
-        updated_profile = existing_profile.profile.copy()
-        for field, value in profile_update.dict(exclude_unset=True).items():
-            updated_profile[field] = value
-        
-        # Save updated profile
-        response = await profile_agent.update_profile(updated_profile)
-        if response.status == "error":
-            raise HTTPException(status_code=400, detail=response.message)
-        return response
+        agent_response = await profile_agent.patch_profile(
+            user_id,
+            profile_update.dict(exclude_unset=True),
+            expected_version=_parse_if_match(if_match)
+        )
+        if agent_response.status == "error":
+            if agent_response.message == PROFILE_NOT_FOUND:
+                raise HTTPException(status_code=404, detail=agent_response.message)
+            if agent_response.message == VERSION_MISMATCH:
+                raise HTTPException(
+                    status_code=412,
+                    detail=agent_response.message,
+                    headers={"ETag": _profile_etag(agent_response.version)}
+                )
+            raise HTTPException(status_code=400, detail=agent_response.message)
+        return JSONBytesResponse(agent_response, headers={"ETag": _profile_etag(agent_response.version)})
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error updating profile: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.put("/profiles/{user_id}")
+async def update_profile(user_id: str, profile_update: UserProfileUpdate,
+                         if_match: Optional[str] = Header(None)):
+    """Update a user profile"""
+    return await _apply_profile_update(user_id, profile_update, if_match)
+
+@app.patch("/profiles/{user_id}")
+async def patch_profile(user_id: str, profile_update: UserProfileUpdate,
+                        if_match: Optional[str] = Header(None)):
+    """Update only the given fields of a user profile"""
+    return await _apply_profile_update(user_id, profile_update, if_match)
+
 @app.get("/jobs/{user_id}")
-async def get_user_jobs(user_id: str):
-    """Get the latest scraped jobs for a user"""
+async def get_user_jobs(
+    user_id: str,
+    request: Request,
+    company: Optional[str] = None,
+    remote: Optional[bool] = None,
+    posted_since: Optional[datetime] = None,
+    source: Optional[str] = None,
+    sort: str = DEFAULT_SORT,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="Comma-separated JobListing fields to return")
+):
+    """Get a page of the jobs delivered to a user, answering 304 if the client's copy is current"""
     try:
-        jobs_data = job_scheduler.get_user_jobs(user_id)
-        if not jobs_data["jobs"]:
-            raise HTTPException(status_code=404, detail="No jobs found for user")
-        return jobs_data
+        include = None
+        if fields:
+            include = {field.strip() for field in fields.split(",") if field.strip()}
+            unknown = include - set(JobListing.__fields__)
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        
+        job_scheduler.sync_shared_state()
+        user_jobs = job_scheduler.job_store.get(user_id)
+        timestamp = user_jobs.timestamp if user_jobs is not None else None
+        # The page depends on the history's timestamp and every query parameter
+        etag = strong_etag(timestamp, company, remote, posted_since, source, sort, cursor, limit, include and sorted(include))
+        modified = datetime.fromisoformat(timestamp).timestamp() if timestamp else None
+        if is_not_modified(request.headers, etag, modified):
+            return not_modified_response(etag, modified)
+        
+        def build_page():
+            if user_jobs is None:
+                return {"timestamp": None, "jobs": [], "next_cursor": None, "feed_cursor": 0}
+            jobs, next_cursor = user_jobs.query(
+                company=company,
+                source=source,
+                remote=remote,
+                posted_since=posted_since,
+                sort=sort,
+                cursor=cursor,
+                limit=limit
+            )
+            return {
+                "timestamp": timestamp,
+                "jobs": jobs if include is None else [select_fields(job, include) for job in jobs],
+                "next_cursor": next_cursor,
+                # Resume point for /jobs/{user_id}/events, so no delivery falls between the two
+                "feed_cursor": user_jobs.count
+            }
+        
+        return await body_cache.response(
+            request.headers,
+            ("jobs", user_id, etag),
+            build_page,
+            headers=cache_headers(etag, modified)
+        )
+    except InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting jobs for user {user_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/jobs/search")
+@app.post("/jobs/search", dependencies=[Depends(_admission(search_limiter))])
 async def search_jobs(params: JobSearchParams):
     """Search for jobs based on parameters"""
     try:
@@ -145,10 +374,345 @@ async def search_jobs(params: JobSearchParams):
             remote_only=params.remote_only,
             max_results=params.max_results
         )
-        return response
+        recommendation_agent.add_jobs(response)
+        return JSONBytesResponse(response)
     except Exception as e:
         logger.error(f"Error searching jobs: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Streaming formats for /jobs/search/stream
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+def _stream_frame(stream_format: str, event: str, data: str) -> str:
+    """Encode one event whose data is already serialized JSON."""
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {data}\n\n"
+    return f'{{"event":"{event}","data":{data}}}\n'
+
+async def _search_stream(params: JobSearchParams, stream_format: str):
+    """
+    Yield each job as it is scraped, then a summary frame
+
+    If the client disconnects, the response task is cancelled while waiting
+    on the scraper; closing the scraper iterator closes the LinkedIn request.
+    """
+    started = time.perf_counter()
+    first_result_ms = None
+    jobs = []
+    status, message = "success", None
+    scraper = job_scraper_agent.iter_linkedin(
+        search_terms=params.search_terms,
+        location=params.location,
+        remote_only=params.remote_only,
+        max_results=params.max_results
+    )
+    try:
+        async for job in scraper:
+            if first_result_ms is None:
+                first_result_ms = round((time.perf_counter() - started) * 1000, 1)
+            jobs.append(job)
+            yield _stream_frame(stream_format, "job", dumps(job).decode())
+    except Exception as e:
+        logger.error(f"Error streaming job search: {e}")
+        status, message = "error", str(e)
+    finally:
+        await scraper.aclose()
+        if jobs:
+            recommendation_agent.add_jobs(jobs)
+
+    summary = {
+        "status": status,
+        "message": message or f"Found {len(jobs)} jobs",
+        "count": len(jobs),
+        "first_result_ms": first_result_ms,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    yield _stream_frame(stream_format, "summary", dumps(summary).decode())
+
+@app.post("/jobs/search/stream", dependencies=[Depends(_admission(search_limiter))])
+async def stream_search_jobs(
+    params: JobSearchParams,
+    format: str = Query("ndjson", regex="^(ndjson|sse)$", description="ndjson or sse")
+):
+    """Search for jobs, streaming each result as soon as it is parsed"""
+    return StreamingResponse(
+        _search_stream(params, format),
+        media_type=STREAM_MEDIA_TYPES[format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Seconds between keep-alive comments on idle job feeds
+FEED_HEARTBEAT_SECONDS = 15
+# Reconnect delay suggested to EventSource clients, in milliseconds
+FEED_RETRY_MS = 5000
+
+async def _job_feed(user_id: str, cursor: Optional[int]):
+    """
+    Yield SSE events carrying each batch of jobs delivered to a user
+
+    Event IDs are feed cursors, so a reconnecting EventSource resumes from
+    Last-Event-ID and only receives what it missed. Until the first delivery
+    the user has no history, and the feed waits for one to be created
+    rather than creating it.
+    """
+    store = job_scheduler.job_store
+    user_jobs = store.get(user_id)
+    delivered = user_jobs.count if user_jobs is not None else 0
+    sent = delivered if cursor is None else min(cursor, delivered)
+    yield f"retry: {FEED_RETRY_MS}\n\n"
+    while True:
+        if user_jobs is None:
+            changed = store.created
+            user_jobs = store.get(user_id)
+        if user_jobs is not None:
+            changed = user_jobs.changed
+            jobs = user_jobs.since(sent)
+            if jobs:
+                sent += len(jobs)
+                data = dumps({"jobs": jobs, "feed_cursor": sent}).decode()
+                yield f"id: {sent}\nevent: jobs\ndata: {data}\n\n"
+                continue
+        try:
+            await asyncio.wait_for(changed.wait(), FEED_HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            yield ": heartbeat\n\n"
+
+@app.get("/jobs/{user_id}/events")
+async def job_feed(
+    user_id: str,
+    cursor: Optional[int] = Query(None, ge=0, description="feed_cursor from /jobs/{user_id}; defaults to now"),
+    last_event_id: Optional[int] = Header(None, ge=0)
+):
+    """Push newly delivered jobs to the client as server-sent events"""
+    profile_response = await profile_agent.get_profile(user_id)
+    if profile_response.status == "error":
+        raise HTTPException(status_code=404, detail=PROFILE_NOT_FOUND)
+    return StreamingResponse(
+        _job_feed(user_id, last_event_id if last_event_id is not None else cursor),
+        media_type=STREAM_MEDIA_TYPES["sse"],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/searches", status_code=202)
+async def submit_search(params: JobSearchParams):
+    """Start a job search in the background and return its ticket right away"""
+    task = search_tasks.submit(
+        lambda: job_scraper_agent.iter_linkedin(
+            search_terms=params.search_terms,
+            location=params.location,
+            remote_only=params.remote_only,
+            max_results=params.max_results
+        ),
+        on_done=recommendation_agent.add_jobs
+    )
+    return JSONBytesResponse(
+        task.summary(),
+        status_code=202,
+        headers={"Location": f"/searches/{task.search_id}"}
+    )
+
+@app.get("/searches/{search_id}")
+async def get_search(search_id: str, offset: int = Query(0, ge=0)):
+    """Get the status of a background search and the results found so far, from offset on"""
+    task = search_tasks.get(search_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Search not found")
+    return JSONBytesResponse({**task.summary(), "jobs": task.jobs[offset:]})
+
+@app.delete("/searches/{search_id}")
+async def cancel_search(search_id: str):
+    """Cancel a background search; results found so far are kept"""
+    if not search_tasks.cancel(search_id):
+        raise HTTPException(status_code=404, detail="Search not found")
+    return {"search_id": search_id, "cancelled": True}
+
+@app.websocket("/searches/{search_id}/events")
+async def search_events(websocket: WebSocket, search_id: str):
+    """Push every result of a background search as it is found, then a summary"""
+    task = search_tasks.get(search_id)
+    if task is None:
+        await websocket.close(code=4404)
+        return
+    await websocket.accept()
+    try:
+        async for event, data in search_tasks.events(task):
+            await websocket.send_text(dumps({"event": event, "data": data}).decode())
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info(f"Client stopped following search {search_id}")
+
+@app.post("/recommendations", response_model=JobRecommendationResponse,
+          dependencies=[Depends(_admission(recommendation_limiter))])
+async def get_recommendations(request: JobRecommendationRequest):
+    """Get the best matching known jobs for a user"""
+    try:
+        recommendations = await job_scheduler.get_user_recommendations(
+            request.user_id,
+            request.num_recommendations,
+            radius_km=request.radius_km
+        )
+        if recommendations is None:
+            raise HTTPException(status_code=404, detail=PROFILE_NOT_FOUND)
+        # Encoded directly; the fields match JobRecommendationResponse
+        return JSONBytesResponse({
+            "success": True,
+            "message": f"Found {len(recommendations['recommendations'])} recommendations",
+            "recommendations": recommendations["recommendations"],
+            "match_scores": recommendations["match_scores"]
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting recommendations for user {request.user_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _archive_query(query):
+    """Run an archive scan off the event loop, mapping bad parameters to 400"""
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, query)
+    except InvalidArchiveQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error querying the job archive: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _archive_filters(company: Optional[str], title: Optional[str], location: Optional[str],
+                     source: Optional[str]) -> Dict[str, str]:
+    filters = {"company": company, "title": title, "location": location, "source": source}
+    return {name: value for name, value in filters.items() if value is not None}
+
+@app.get("/analytics/jobs/counts", dependencies=[Depends(_admission(analytics_limiter))])
+async def archive_counts(
+    group_by: str = "company",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    time_column: str = "observed",
+    company: Optional[str] = None,
+    title: Optional[str] = None,
+    location: Optional[str] = None,
+    source: Optional[str] = None,
+    remote: Optional[bool] = None,
+    limit: int = Query(20, ge=1, le=1000)
+):
+    """Archived job observations counted by company, title, location or source, largest first"""
+    if job_scheduler.archive is None:
+        raise HTTPException(status_code=404, detail="No job archive")
+    filters = _archive_filters(company, title, location, source)
+    counts = await _archive_query(lambda: job_scheduler.archive.count_by(
+        group_by, since=since, until=until, time_column=time_column, filters=filters, remote=remote, limit=limit
+    ))
+    return JSONBytesResponse({"group_by": group_by, "counts": [{"value": v, "count": c} for v, c in counts]})
+
+@app.get("/analytics/jobs/timeline", dependencies=[Depends(_admission(analytics_limiter))])
+async def archive_timeline(
+    interval: str = "day",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    time_column: str = "observed",
+    company: Optional[str] = None,
+    title: Optional[str] = None,
+    location: Optional[str] = None,
+    source: Optional[str] = None,
+    remote: Optional[bool] = None
+):
+    """Archived job observations counted per day or week"""
+    if job_scheduler.archive is None:
+        raise HTTPException(status_code=404, detail="No job archive")
+    filters = _archive_filters(company, title, location, source)
+    timeline = await _archive_query(lambda: job_scheduler.archive.timeline(
+        interval, since=since, until=until, time_column=time_column, filters=filters, remote=remote
+    ))
+    return JSONBytesResponse({"interval": interval, "timeline": [{"start": d, "count": c} for d, c in timeline]})
+
+@app.get("/stats/admission")
+async def admission_stats():
+    """Current queue depths and shed counts of the admission limiters"""
+    return JSONBytesResponse({
+        "job_search": search_limiter.stats(),
+        "recommendations": recommendation_limiter.stats(),
+        "analytics": analytics_limiter.stats(),
+        "searches": search_tasks.stats(),
+    })
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Metrics of this worker in the Prometheus text format"""
+    return Response(metrics.REGISTRY.render(), headers={"Content-Type": metrics.CONTENT_TYPE})
+
+def _require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Reject callers without the admin token"""
+    if not ADMIN_TOKEN or x_admin_token is None or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+def _start_capture(start):
+    """Arm a profiling capture, mapping a busy profiler or bad arguments to 409 and 400"""
+    try:
+        return JSONBytesResponse(start().summary(), status_code=202)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/admin/profiling", dependencies=[Depends(_require_admin)])
+async def list_captures():
+    """The profiling capture in progress, if any, and the finished ones available for download"""
+    return JSONBytesResponse({
+        "current": PROFILER.current.summary() if PROFILER.current else None,
+        "captures": [capture.summary() for capture in PROFILER.captures.values()],
+    })
+
+@app.post("/admin/profiling/requests", status_code=202, dependencies=[Depends(_require_admin)])
+async def profile_requests(count: int = Query(10, description="Number of upcoming requests to profile")):
+    """Profile the next `count` requests to this worker with the deterministic profiler"""
+    return _start_capture(lambda: PROFILER.arm_requests(count))
+
+@app.post("/admin/profiling/scheduler-run", status_code=202, dependencies=[Depends(_require_admin)])
+async def profile_scheduler_run():
+    """Profile this worker's next daily scraping run with the deterministic profiler"""
+    return _start_capture(PROFILER.arm_scheduler_run)
+
+@app.post("/admin/profiling/sampling", status_code=202, dependencies=[Depends(_require_admin)])
+async def profile_sampling(
+    seconds: float = Query(30, description="How long to sample"),
+    interval_ms: float = Query(10, gt=0, description="Milliseconds between samples")
+):
+    """Sample the stacks of every thread in this worker for a while, at low overhead"""
+    return _start_capture(lambda: PROFILER.start_sampling(seconds, interval_ms / 1000))
+
+@app.post("/admin/profiling/stop", dependencies=[Depends(_require_admin)])
+async def stop_profiling():
+    """Finish the capture in progress early"""
+    capture = PROFILER.stop()
+    if capture is None:
+        raise HTTPException(status_code=404, detail="No capture in progress")
+    return JSONBytesResponse(capture.summary())
+
+@app.get("/admin/profiling/{capture_id}/{output_format}", dependencies=[Depends(_require_admin)])
+async def download_capture(capture_id: int, output_format: str):
+    """Download a finished capture as pstats or as collapsed stacks for flame graphs"""
+    capture = PROFILER.get(capture_id)
+    if capture is None:
+        raise HTTPException(status_code=404, detail="Capture not found")
+    if output_format not in capture.summary()["formats"]:
+        raise HTTPException(status_code=404, detail=f"Capture {capture_id} has no {output_format} output")
+    if capture.status != DONE:
+        raise HTTPException(status_code=409, detail=f"Capture {capture_id} is still {capture.status}")
+    
+    if output_format == "pstats":
+        return Response(
+            capture.pstats_bytes(),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="capture-{capture_id}.pstats"'}
+        )
+    return PlainTextResponse(
+        capture.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="capture-{capture_id}.collapsed.txt"'}
+    )
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    # LUME_WORKERS > 1 runs that many worker processes sharing the state files
+    # log_config=None leaves uvicorn's loggers (including the access log) to the queued pipeline
+    uvicorn.run("api.main:app", host="0.0.0.0", port=8000, workers=int(os.getenv("LUME_WORKERS", "1")), log_config=None) 
\ No newline at end of file
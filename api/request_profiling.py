@@ -0,0 +1,31 @@
+"""
+ASGI middleware that hands requests to the runtime profiler when a request
+capture is armed. Admin requests are never profiled, so downloading a
+capture does not count towards it.
+"""
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from services.profiling import ProfilingHooks
+
+ADMIN_PREFIX = "/admin/"
+
+
+class ProfilingMiddleware:
+    """Profiles HTTP requests while a request capture is armed."""
+
+    def __init__(self, app: ASGIApp, hooks: ProfilingHooks):
+        """
+        Args:
+            app: Wrapped application
+            hooks: Profiler whose request captures are recorded here
+        """
+        self.app = app
+        self.hooks = hooks
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self.hooks.requests_armed or scope["type"] != "http" or scope["path"].startswith(ADMIN_PREFIX):
+            await self.app(scope, receive, send)
+            return
+        with self.hooks.request():
+            await self.app(scope, receive, send)
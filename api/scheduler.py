@@ -1,30 +1,90 @@
 """
 Scheduler module for daily job scraping and recommendations.
 This module handles the orchestration of daily job scraping based on user profiles.
+
+When several API workers run, each has its own scheduler, but only the one
+holding the leader lease scrapes; the others follow the shared profile and
+job journals and take over the lease if the leader goes away.
 """
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 import logging
 import math
-from typing import List, Dict
+import os
+import time
+from typing import List, Dict, Optional
 from datetime import datetime
 
 from agents.profile_agent import ProfileAgent
 from agents.job_scraper_agent import JobScraperAgent
+from agents.recommendation_agent import RecommendationAgent
+from services.recommendation_cache import RecommendationCache
+from services.gazetteer import haversine_km, resolve
+from services.user_jobs import UserJobStore
+from services.job_archive import JobArchive
+from services.shared_state import LeaderLease
+from services import metrics
+from services.profiling import PROFILER
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Number of recommendations materialized per user
+RECOMMENDATIONS_PER_USER = 20
+# How often invalidated recommendations are recomputed in the background
+RECOMMENDATION_REFRESH_SECONDS = 10
+# Daily jobs must be within this distance of one of the user's preferred locations
+DAILY_JOBS_RADIUS_KM = 50
+# How often followers pick up profile and job changes made by other workers
+SHARED_STATE_REFRESH_SECONDS = 2
+# How often standby workers try to take over the leader lease
+LEADER_RETRY_SECONDS = 15
+# Processes the daily re-ranking spreads its scoring over; every API worker
+# is already a process, so the default keeps the scoring in this one
+RERANK_WORKERS = int(os.getenv("LUME_RERANK_WORKERS", "1"))
+
+RUN_SECONDS = metrics.histogram(
+    "lume_scheduler_run_seconds", "Duration of daily scraping runs, including re-ranking", buckets=metrics.RUN_BUCKETS)
+USER_OUTCOMES = metrics.counter(
+    "lume_scheduler_users", "Users processed by daily scraping runs, by outcome", ["outcome"])
+DELIVERED = USER_OUTCOMES.labels("delivered")
+NO_JOBS = USER_OUTCOMES.labels("no_jobs")
+NO_GOAL = USER_OUTCOMES.labels("no_goal")
+NO_PROFILE = USER_OUTCOMES.labels("no_profile")
+FAILED = USER_OUTCOMES.labels("error")
+
 class JobScheduler:
     """Handles scheduling and execution of daily job scraping tasks"""
     
-    def __init__(self):
-        """Initialize the scheduler and agents."""
+    def __init__(self, profile_agent: Optional[ProfileAgent] = None,
+                 recommendation_agent: Optional[RecommendationAgent] = None,
+                 leader_lease: Optional[LeaderLease] = None,
+                 jobs_journal: Optional[str] = None,
+                 archive_dir: Optional[str] = None):
+        """
+        Initialize the scheduler and agents.
+        
+        Args:
+            profile_agent: Shared profile agent
+            recommendation_agent: Shared recommendation agent
+            leader_lease: Lease deciding which worker scrapes; None means always scrape
+            jobs_journal: File through which delivered jobs are shared with other workers
+            archive_dir: Directory of the archive every scraped job is recorded in; None keeps no archive
+        """
         self.scheduler = AsyncIOScheduler()
-        self.profile_agent = ProfileAgent()
+        self.profile_agent = profile_agent or ProfileAgent()
         self.job_scraper_agent = JobScraperAgent()
-        self.jobs_data = {}  # Store scraped jobs by user_id
+        self.recommendation_agent = recommendation_agent or RecommendationAgent(self.profile_agent)
+        self.job_store = UserJobStore(jobs_journal)  # Indexed history of every job delivered to each user
+        self.archive = JobArchive(archive_dir) if archive_dir else None  # Every observation, for analytics
+        self.leader_lease = leader_lease
+        self.is_leader = False
+        self.recommendations_data = RecommendationCache(RECOMMENDATIONS_PER_USER)  # Ranked recommendations by user_id
+        
+        # Keep materialized recommendations in step with profile and corpus changes
+        self.profile_agent.add_listener(self.recommendations_data.invalidate)
+        self.recommendation_agent.add_listener(self.recommendations_data.add_jobs)
+        self.sync_shared_state()
         
     async def _get_daily_jobs_for_user(self, user_id: str) -> List[Dict]:
         """Get daily job recommendations for a specific user"""
@@ -33,6 +93,7 @@ class JobScheduler:
             profile_response = await self.profile_agent.get_profile(user_id)
             if profile_response.status == "error":
                 logger.error(f"Failed to get profile for user {user_id}: {profile_response.message}")
+                NO_PROFILE.inc()
                 return []
             
             profile = profile_response.profile
@@ -42,50 +103,158 @@ class JobScheduler:
             daily_goal = math.ceil(weekly_goal / 7)
             
             if daily_goal <= 0:
-                logger.info(f"User {user_id} has no weekly application goal set")
+                logger.debug("User %s has no weekly application goal set", user_id)
+                NO_GOAL.inc()
                 return []
             
             # Prepare search parameters
             search_terms = profile.get("preferred_roles", []) + profile.get("skills", [])
-            location = profile.get("preferred_locations", [None])[0]
             remote_only = profile.get("remote_preference", False)
             
-            # Scrape jobs
-            jobs = await self.job_scraper_agent.scrape_linkedin(
-                search_terms=search_terms,
-                location=location,
-                remote_only=remote_only,
-                max_results=daily_goal
-            )
+            # Scrape every distinct preferred location, not just the first one
+            locations = {}
+            for location in profile.get("preferred_locations", []):
+                place = resolve(location)
+                locations.setdefault(place.place_id if place else location, location)
             
-            # Store jobs
-            self.jobs_data[user_id] = {
-                "timestamp": datetime.now().isoformat(),
-                "jobs": jobs
-            }
+            # Each search waits for the scraper's rate limit, so more locations mean a slower run, not a burst
+            jobs = []
+            for location in list(locations.values()) or [None]:
+                jobs.extend(await self.job_scraper_agent.scrape_jobs(
+                    source="linkedin",
+                    search_terms=search_terms,
+                    location=location,
+                    remote_only=remote_only,
+                    max_results=daily_goal
+                ))
+            
+            self.recommendation_agent.add_jobs(jobs)
+            self._archive(jobs)
+            
+            # Keep nearby postings, collapse reposts, then rank by match with the
+            # profile instead of LinkedIn's ordering
+            jobs = [job for job in jobs if self._is_near_preferred(job, profile)]
+            jobs = self.recommendation_agent.collapse_duplicates(jobs)
+            ranked = self.recommendation_agent.recommender.rank(profile, jobs)
+            jobs = [job for job, _ in ranked[:daily_goal]]
+            
+            self.job_store.add_jobs(user_id, jobs)
             
-            logger.info(f"Successfully scraped {len(jobs)} jobs for user {user_id}")
+            logger.debug("Delivered %d jobs to user %s", len(jobs), user_id)
+            (DELIVERED if jobs else NO_JOBS).inc()
             return jobs
             
         except Exception as e:
             logger.error(f"Error getting jobs for user {user_id}: {e}")
+            FAILED.inc()
             return []
     
-    async def _daily_job_scraping(self):
-        """Execute daily job scraping for all users"""
+    def _archive(self, jobs: List):
+        """Record scraped jobs in the archive; a failure there does not stop delivery"""
+        if self.archive is None:
+            return
         try:
-            # TODO Should get this from your database
-            # For now, use a hardcoded list of user IDs
-            user_ids = ["demo123", "test123"]  
+            self.archive.append(jobs)
+        except Exception as e:
+            logger.error(f"Error archiving {len(jobs)} jobs: {e}")
+    
+    def _is_near_preferred(self, job, profile: Dict) -> bool:
+        """Whether a job is remote or within DAILY_JOBS_RADIUS_KM of a preferred location"""
+        place = resolve(job.location)
+        if place is None:
+            return True  # Unknown location, let the ranking decide
+        preferred = [p for p in map(resolve, profile.get("preferred_locations", [])) if p is not None]
+        if not preferred:
+            return True
+        if place.is_remote:
+            return profile.get("remote_preference", False) or any(p.is_remote for p in preferred)
+        return any(
+            not p.is_remote and haversine_km(p.lat, p.lon, place.lat, place.lon) <= DAILY_JOBS_RADIUS_KM
+            for p in preferred
+        )
+    
+    @PROFILER.scheduler_run
+    async def _daily_job_scraping(self, user_ids: Optional[List[str]] = None):
+        """
+        Execute daily job scraping for all users
+        
+        Args:
+            user_ids: Users to scrape for; defaults to the demo users
+        """
+        started = time.perf_counter()
+        try:
+            if user_ids is None:
+                # TODO Should get this from your database
+                # For now, use a hardcoded list of user IDs
+                user_ids = ["demo123", "test123"]
 
+            # One summary per run instead of a record per user
+            delivered_users = delivered_jobs = 0
             for user_id in user_ids:
-                await self._get_daily_jobs_for_user(user_id)
+                jobs = await self._get_daily_jobs_for_user(user_id)
+                delivered_users += bool(jobs)
+                delivered_jobs += len(jobs)
+            logger.info(
+                "Daily scraping delivered %d jobs to %d of %d users", delivered_jobs, delivered_users, len(user_ids),
+                extra={"users": len(user_ids), "delivered_users": delivered_users, "delivered_jobs": delivered_jobs}
+            )
+            
+            await self._rerank_all_users()
                 
         except Exception as e:
             logger.error(f"Error in daily job scraping: {e}")
+        finally:
+            RUN_SECONDS.observe(time.perf_counter() - started)
     
-    def start(self):
-        """Start the scheduler"""
+    async def _rerank_all_users(self):
+        """Recompute recommendations for every user against the full job corpus"""
+        try:
+            start = datetime.now()
+            # Batch scoring is CPU bound; recommend_all keeps it off the event loop
+            ranked = await self.recommendation_agent.recommend_all(RECOMMENDATIONS_PER_USER, workers=RERANK_WORKERS)
+            for user_id, (profile, recommendations) in ranked.items():
+                self.recommendations_data.store(user_id, profile, recommendations)
+            logger.info(f"Re-ranked {len(ranked)} users in {(datetime.now() - start).total_seconds():.1f}s")
+            
+        except Exception as e:
+            logger.error(f"Error re-ranking recommendations: {e}")
+    
+    async def _refresh_recommendations(self):
+        """Recompute recommendations for users whose cached entries were invalidated"""
+        try:
+            for user_id in self.recommendations_data.pop_dirty():
+                profile = self.profile_agent.profiles.get(user_id)
+                if profile is None:
+                    continue
+                profile = profile.to_dict()
+                ranked = self.recommendation_agent.rank_profile(profile, RECOMMENDATIONS_PER_USER)
+                self.recommendations_data.store(user_id, profile, ranked)
+                
+        except Exception as e:
+            logger.error(f"Error refreshing recommendations: {e}")
+    
+    def sync_shared_state(self):
+        """Pick up profile changes and job deliveries made by other workers"""
+        try:
+            self.profile_agent.refresh()
+            new_jobs = self.job_store.refresh()
+            if new_jobs:
+                self.recommendation_agent.add_jobs(new_jobs)
+        except Exception as e:
+            logger.error(f"Error syncing shared state: {e}")
+    
+    async def _sync_shared_state_job(self):
+        """Run sync_shared_state on the event loop, where the stores and their subscribers live"""
+        self.sync_shared_state()
+    
+    def _try_lead(self):
+        """Start the scraping jobs if this worker holds, or can take, the leader lease"""
+        if self.is_leader:
+            return
+        if self.leader_lease is not None and not self.leader_lease.try_acquire():
+            return
+        self.is_leader = True
+        
         # Schedule daily job scraping at 6 AM
         self.scheduler.add_job(
             self._daily_job_scraping,
@@ -100,17 +269,93 @@ class JobScheduler:
             self._daily_job_scraping,
             'date',  # Run once immediately
             id="initial_job_scraping",
-            name="Initial job scraping task"
+            name="Initial job scraping task",
+            replace_existing=True
+        )
+        logger.info(f"Worker {os.getpid()} is the scraping leader")
+    
+    def start(self):
+        """Start the scheduler"""
+        # Recompute invalidated recommendations in the background
+        self.scheduler.add_job(
+            self._refresh_recommendations,
+            'interval',
+            seconds=RECOMMENDATION_REFRESH_SECONDS,
+            id="recommendation_refresh",
+            name="Recommendation refresh task",
+            replace_existing=True
         )
         
+        if self.leader_lease is not None:
+            # Follow the other workers, and stand by to take over scraping
+            self.scheduler.add_job(
+                self._sync_shared_state_job,
+                'interval',
+                seconds=SHARED_STATE_REFRESH_SECONDS,
+                id="shared_state_sync",
+                name="Shared state sync task",
+                replace_existing=True
+            )
+            self.scheduler.add_job(
+                self._try_lead,
+                'interval',
+                seconds=LEADER_RETRY_SECONDS,
+                id="leader_election",
+                name="Leader election task",
+                replace_existing=True
+            )
+        
+        self._try_lead()
         self.scheduler.start()
         logger.info("Job scheduler started")
     
     def stop(self):
         """Stop the scheduler"""
         self.scheduler.shutdown()
+        if self.leader_lease is not None:
+            self.leader_lease.release()
+        self.is_leader = False
         logger.info("Job scheduler stopped")
     
-    def get_user_jobs(self, user_id: str) -> Dict:
-        """Get the latest scraped jobs for a user"""
-        return self.jobs_data.get(user_id, {"timestamp": None, "jobs": []}) 
\ No newline at end of file
+    async def get_user_recommendations(self, user_id: str, num_recommendations: int,
+                                       radius_km: Optional[float] = None) -> Optional[Dict]:
+        """Get ranked recommendations for a user, served from the materialized cache when possible"""
+        if radius_km is not None:
+            # Distance-filtered rankings are not materialized
+            profile_response = await self.profile_agent.get_profile(user_id)
+            if profile_response.status == "error":
+                return None
+            ranked = self.recommendation_agent.rank_profile(
+                profile_response.profile,
+                num_recommendations,
+                radius_km=radius_km
+            )
+            return {
+                "timestamp": datetime.now().isoformat(),
+                "recommendations": [job for job, _ in ranked],
+                "match_scores": [score for _, score in ranked]
+            }
+        
+        entry = self.recommendations_data.get(user_id)
+        if entry is not None and num_recommendations <= RECOMMENDATIONS_PER_USER:
+            return {
+                "timestamp": entry.timestamp,
+                "recommendations": entry.jobs[:num_recommendations],
+                "match_scores": entry.scores[:num_recommendations]
+            }
+        
+        profile_response = await self.profile_agent.get_profile(user_id)
+        if profile_response.status == "error":
+            return None
+        
+        profile = profile_response.profile
+        ranked = self.recommendation_agent.rank_profile(
+            profile,
+            max(num_recommendations, RECOMMENDATIONS_PER_USER)
+        )
+        entry = self.recommendations_data.store(user_id, profile, ranked)
+        return {
+            "timestamp": entry.timestamp,
+            "recommendations": [job for job, _ in ranked[:num_recommendations]],
+            "match_scores": [score for _, score in ranked[:num_recommendations]]
+        } 
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""
+ASGI middleware that traces each HTTP request and reports its stages in a
+Server-Timing header.
+
+The header is added when the response starts, so it covers everything done
+before the first byte: for regular responses that is the whole request,
+for streams only the work before the first event.
+"""
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from services.tracing import Tracer, activate
+
+
+class TracingMiddleware:
+    """Runs every HTTP request in a trace and adds Server-Timing to its response."""
+
+    def __init__(self, app: ASGIApp, tracer: Tracer, server_timing: bool = True):
+        """
+        Args:
+            app: Wrapped application
+            tracer: Starts the traces and exports the sampled ones
+            server_timing: Whether responses carry the Server-Timing header
+        """
+        self.app = app
+        self.tracer = tracer
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = self.tracer.start_trace(
+            f"{scope['method']} {scope['path']}",
+            Headers(scope=scope).get("traceparent"),
+            {"http.method": scope["method"], "http.target": scope["path"]}
+        )
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                trace.root.set("http.status_code", message["status"])
+                if self.server_timing:
+                    MutableHeaders(raw=message["headers"]).append("Server-Timing", trace.server_timing())
+            await send(message)
+
+        with activate(trace.root):
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                trace.finish()
@@ -0,0 +1,147 @@
+"""
+Local stand-in for LinkedIn's guest job search API.
+
+Serves pages built from the cards of recorded seeMoreJobPostings results in
+benchmarks/fixtures, so scraping can be exercised and timed without touching
+the network. Each query gets its own repeatable page: recorded cards with
+fresh job IDs and their titles, companies and locations recombined, seeded
+by a hash of the query, so a corpus grows as it would against the real site
+instead of collapsing into a handful of duplicates. Latency, server errors
+and 429 throttling can be injected, and the body is written in chunks to
+exercise the scraper's streaming parser.
+"""
+
+import asyncio
+import glob
+import hashlib
+import os
+import random
+import re
+from typing import List, Optional
+
+from aiohttp import web
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SEARCH_PATH = "/jobs-guest/jobs/api/seeMoreJobPostings/search"
+
+CARD = re.compile(r"<li>.*?</li>\n", re.DOTALL)
+JOB_ID = re.compile(r"(?<=jobPosting:)\d+|(?<=-)\d{10}(?=\?)")
+# Text of the fields recombined between cards
+FIELDS = {
+    "title": re.compile(r'(?<=<h3 class="base-search-card__title">)\s*([^<]*?)\s*(?=</h3>)'),
+    "company": re.compile(r'(?<=-subtitle">)\s*([^<]*?)\s*(?=</a>\s*</h4>)'),
+    "location": re.compile(r'(?<=<span class="job-search-card__location">)\s*([^<]*?)\s*(?=</span>)'),
+}
+PAGE_SIZE = 10
+
+
+def load_fixture_pages(pattern: str = "see_more_job_postings_*.html") -> List[str]:
+    """Return the recorded result pages, in file name order."""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, pattern))):
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+    if not pages:
+        raise FileNotFoundError(f"No fixture pages matching {pattern} in {FIXTURES_DIR}")
+    return pages
+
+
+class FakeLinkedIn:
+    """aiohttp server answering job searches from fixture pages."""
+
+    def __init__(self, pages: Optional[List[str]] = None, latency: float = 0.0,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0,
+                 chunk_size: int = 4096, page_size: int = PAGE_SIZE, seed: int = 0):
+        """
+        Args:
+            pages: Result pages whose cards are served; defaults to the recorded fixtures
+            latency: Seconds to wait before answering each request
+            error_rate: Fraction of requests answered with a 500
+            throttle_rate: Fraction of requests answered with a 429 and Retry-After
+            chunk_size: Size of the chunks the body is written in
+            page_size: Cards per page
+            seed: Seed for the error and throttle draws, so runs are repeatable
+        """
+        self.cards = [card for page in pages or load_fixture_pages() for card in CARD.findall(page)]
+        self.values = {
+            name: sorted({match.group(1) for card in self.cards for match in pattern.finditer(card)})
+            for name, pattern in FIELDS.items()
+        }
+        self.page_size = page_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.chunk_size = chunk_size
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.cards_served = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.url: Optional[str] = None  # Base URL once started, e.g. http://127.0.0.1:PORT
+
+    async def __aenter__(self) -> "FakeLinkedIn":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        """Start serving on host:port; port 0 picks a free one."""
+        app = web.Application()
+        app.router.add_get(SEARCH_PATH, self._search)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = self._runner.addresses[0][1]
+        self.url = f"http://{host}:{bound_port}"
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def stats(self) -> dict:
+        """Return the request counters."""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "throttled": self.throttled,
+            "cards_served": self.cards_served,
+        }
+
+    def page_for(self, query: str) -> str:
+        """Return the page served for a query string; the same query always gets the same page."""
+        rng = random.Random(hashlib.blake2b(query.encode(), digest_size=8).digest())
+        cards = []
+        for _ in range(self.page_size):
+            card = JOB_ID.sub(str(rng.randrange(10**9, 10**10)), rng.choice(self.cards))
+            for name, pattern in FIELDS.items():
+                value = rng.choice(self.values[name])
+                card = pattern.sub(lambda m: m.group().replace(m.group(1), value), card)
+            cards.append(card)
+        return "\n".join(cards)
+
+    async def _search(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        draw = self.random.random()
+        if draw < self.throttle_rate:
+            self.throttled += 1
+            return web.Response(status=429, headers={"Retry-After": "1"}, text="Too Many Requests")
+        if draw < self.throttle_rate + self.error_rate:
+            self.errors += 1
+            return web.Response(status=500, text="Internal Server Error")
+
+        body = self.page_for(request.query_string).encode()
+        self.cards_served += body.count(b"<li>")
+        response = web.StreamResponse(headers={"Content-Type": "text/html; charset=utf-8"})
+        await response.prepare(request)
+        for start in range(0, len(body), self.chunk_size):
+            await response.write(body[start:start + self.chunk_size])
+        await response.write_eof()
+        return response
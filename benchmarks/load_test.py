@@ -0,0 +1,499 @@
+"""
+Open-loop load test for the API.
+
+Starts a local API instance (uvicorn, in a scratch directory) whose scraper
+talks to the LinkedIn stand-in in fake_linkedin.py, seeds it with synthetic
+users and their delivered jobs, then sends a weighted mix of requests at a
+target rate for a fixed time:
+
+    profile_create  POST  /profiles
+    profile_update  PATCH /profiles/{user_id}
+    profile_read    GET   /profiles/{user_id}
+    jobs_read       GET   /jobs/{user_id}
+    jobs_search     POST  /jobs/search
+
+Requests are sent on schedule whether or not earlier ones have finished, and
+latency is measured from the scheduled send time, so a saturated server
+shows up as growing latency instead of a quietly lower request rate. The
+report has p50/p95/p99 latency, throughput and status counts per endpoint,
+the server-side time per stage from Server-Timing, and the server process's
+CPU and memory use. Compared against a stored baseline, latency,
+throughput or error rate regressions are flagged and the exit status is 1:
+
+    python benchmarks/load_test.py --rps 50 --duration 60 --output baseline.json
+    # ...change something...
+    python benchmarks/load_test.py --rps 50 --duration 60 --baseline baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+# Add the parent directory to the Python path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from agents.job_scraper_agent import JobScraperAgent
+from benchmarks.fake_linkedin import FakeLinkedIn
+from benchmarks.run_benchmarks import compare, environment, summarize, synthetic_profiles
+from services.logging_config import TEXT, configure_logging
+from services.user_jobs import UserJobStore
+
+logger = logging.getLogger(__name__)
+
+RESULTS_FORMAT = 1
+# Relative weights of the request types
+DEFAULT_MIX = "profile_create=5,profile_update=10,profile_read=30,jobs_read=45,jobs_search=10"
+# File the API's workers share delivered jobs through (api.main.JOBS_JOURNAL_FILE)
+JOBS_JOURNAL_FILE = "jobs.msgpack"
+SERVER_START_TIMEOUT = 60
+RESOURCE_SAMPLE_INTERVAL = 0.5
+# Latency increases smaller than this are noise, whatever their relative size
+NOISE_FLOOR_MS = 2.0
+# Absolute error rate increase flagged as a regression
+ERROR_RATE_TOLERANCE = 0.01
+# Requests an endpoint needs in both runs before its latency percentiles are compared
+MIN_SAMPLES = 50
+
+
+class EndpointStats:
+    """Measurements of one request type."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.stages: Dict[str, float] = Counter()  # Server-Timing milliseconds summed per stage
+        self.timed = 0  # Responses that carried Server-Timing
+
+    def record(self, latency: float, status, server_timing: Optional[str]):
+        self.latencies.append(latency)
+        self.statuses[str(status)] += 1
+        if server_timing:
+            self.timed += 1
+            for stage, duration in parse_server_timing(server_timing).items():
+                self.stages[stage] += duration
+
+    def summary(self, seconds: float) -> Dict:
+        count = len(self.latencies)
+        if not count:
+            return {"count": 0}
+        errors = sum(n for status, n in self.statuses.items() if not status.startswith(("2", "3")))
+        return {
+            "count": count,
+            "throughput_rps": round(count / seconds, 2),
+            "error_rate": round(errors / count, 4),
+            "statuses": dict(self.statuses),
+            **summarize(self.latencies),
+            # Mean server-side milliseconds per request, by stage
+            "server_ms": {stage: round(total / self.timed, 3) for stage, total in self.stages.items()},
+        }
+
+
+class Workload:
+    """Picks the next request from the weighted mix."""
+
+    def __init__(self, mix: Dict[str, float], user_ids: List[str], seed: int = 0):
+        """
+        Args:
+            mix: Relative weight of each request type
+            user_ids: Users that exist on the server; profile_create adds to them
+            seed: Seed for the request choice and contents
+        """
+        unknown = mix.keys() - set(REQUESTS)
+        if unknown:
+            raise ValueError(f"Unknown request types: {', '.join(sorted(unknown))}")
+        self.names = list(mix)
+        self.weights = list(mix.values())
+        self.user_ids = list(user_ids)
+        self.created = 0
+        self.rng = random.Random(seed)
+
+    def next_request(self) -> Tuple[str, str, str, Optional[Dict]]:
+        """Return (request type, method, path, JSON body)."""
+        name = self.rng.choices(self.names, self.weights)[0]
+        return (name, *REQUESTS[name](self))
+
+    def _create(self):
+        self.created += 1
+        profile = synthetic_profiles(1, self.rng.randrange(2**32))[0].dict()
+        profile["user_id"] = f"load{self.created}"
+        self.user_ids.append(profile["user_id"])
+        return "POST", "/profiles", profile
+
+    def _update(self):
+        user_id = self.rng.choice(self.user_ids)
+        return "PATCH", f"/profiles/{user_id}", {"weekly_application_goal": self.rng.randint(7, 35)}
+
+    def _read_profile(self):
+        return "GET", f"/profiles/{self.rng.choice(self.user_ids)}", None
+
+    def _read_jobs(self):
+        return "GET", f"/jobs/{self.rng.choice(self.user_ids)}", None
+
+    def _search(self):
+        profile = synthetic_profiles(1, self.rng.randrange(2**32))[0]
+        return "POST", "/jobs/search", {
+            "search_terms": profile.preferred_roles,
+            "location": profile.preferred_locations[0],
+            "max_results": 25,
+        }
+
+
+REQUESTS = {
+    "profile_create": Workload._create,
+    "profile_update": Workload._update,
+    "profile_read": Workload._read_profile,
+    "jobs_read": Workload._read_jobs,
+    "jobs_search": Workload._search,
+}
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """Parse "name=weight,name=weight"."""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """Return the milliseconds of each metric in a Server-Timing header."""
+    stages = {}
+    for metric in header.split(","):
+        name, *params = metric.strip().split(";")
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "dur":
+                stages[name] = stages.get(name, 0.0) + float(value)
+    return stages
+
+
+class ResourceMonitor:
+    """Samples the CPU time and resident memory of a process and its children from /proc."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.ticks = os.sysconf("SC_CLK_TCK")
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+        self.peak_rss = 0
+        self._task: Optional[asyncio.Task] = None
+        self._start: Optional[Tuple[float, float]] = None
+
+    def _processes(self) -> List[int]:
+        """The server and its worker processes."""
+        pids = [self.pid]
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                try:
+                    with open(f"/proc/{entry}/stat") as f:
+                        # Fields after the parenthesised command: state, ppid, ...
+                        if int(f.read().rsplit(")", 1)[1].split()[1]) == self.pid:
+                            pids.append(int(entry))
+                except (OSError, IndexError, ValueError):
+                    continue
+        return pids
+
+    def _sample(self) -> float:
+        """Return the CPU seconds used so far, updating the peak RSS."""
+        cpu, rss = 0.0, 0
+        for pid in self._processes():
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+                with open(f"/proc/{pid}/statm") as f:
+                    rss += int(f.read().split()[1]) * self.page_size
+            except OSError:
+                continue  # Exited between listing and reading
+            cpu += (int(fields[11]) + int(fields[12])) / self.ticks  # utime, stime
+        self.peak_rss = max(self.peak_rss, rss)
+        return cpu
+
+    def start(self):
+        self._start = (time.perf_counter(), self._sample())
+        self._task = asyncio.create_task(self._poll())
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(RESOURCE_SAMPLE_INTERVAL)
+            self._sample()
+
+    def stop(self) -> Dict:
+        self._task.cancel()
+        cpu = self._sample()
+        elapsed = time.perf_counter() - self._start[0]
+        return {
+            "cpu_seconds": round(cpu - self._start[1], 3),
+            "cpu_percent": round((cpu - self._start[1]) / elapsed * 100, 1),
+            "peak_rss_mb": round(self.peak_rss / 2**20, 1),
+        }
+
+
+async def generate(session: aiohttp.ClientSession, base_url: str, workload: Workload, rps: float,
+                   duration: float, warmup: float, max_in_flight: int, arrival: str, seed: int) -> Dict:
+    """
+    Send requests on an open-loop schedule and collect their measurements
+
+    Returns:
+        {"endpoints": stats by request type, "generator": schedule lag and dropped sends}
+    """
+    loop = asyncio.get_running_loop()
+    rng = random.Random(seed)
+    stats: Dict[str, EndpointStats] = {name: EndpointStats() for name in workload.names}
+    in_flight = set()
+    max_lag = 0.0
+    not_sent = 0
+
+    async def send(name, method, path, body, scheduled, measured):
+        try:
+            async with session.request(method, base_url + path, json=body) as response:
+                await response.read()
+                status, server_timing = response.status, response.headers.get("Server-Timing")
+        except asyncio.TimeoutError:
+            status, server_timing = "timeout", None
+        except aiohttp.ClientError as e:
+            status, server_timing = type(e).__name__, None
+        if measured:
+            stats[name].record(loop.time() - scheduled, status, server_timing)
+
+    start = loop.time()
+    measure_from = start + warmup
+    end = measure_from + duration
+    scheduled = start
+    while scheduled < end:
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        max_lag = max(max_lag, loop.time() - scheduled)
+        measured = scheduled >= measure_from
+        if len(in_flight) >= max_in_flight:
+            not_sent += measured
+        else:
+            task = asyncio.create_task(send(*workload.next_request(), scheduled, measured))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        scheduled += rng.expovariate(rps) if arrival == "poisson" else 1 / rps
+    if in_flight:
+        await asyncio.wait(in_flight)
+
+    sent = sum(len(s.latencies) for s in stats.values())
+    return {
+        "endpoints": {name: s.summary(duration) for name, s in stats.items()},
+        "overall": {
+            "count": sent,
+            "throughput_rps": round(sent / duration, 2),
+            **(summarize([l for s in stats.values() for l in s.latencies]) if sent else {}),
+        },
+        "generator": {
+            "max_schedule_lag_ms": round(max_lag * 1000, 1),
+            # Sends skipped because max_in_flight requests were outstanding
+            "not_sent": not_sent,
+        },
+    }
+
+
+async def seed_jobs(fake: FakeLinkedIn, journal_path: str, profiles) -> int:
+    """Deliver jobs to every seeded user through the jobs journal the server loads on start."""
+    scraper = JobScraperAgent()
+    scraper.base_url = fake.url
+    store = UserJobStore(journal_path)
+    searches = {}
+    delivered = 0
+    for profile in profiles:
+        key = (profile.preferred_roles[0], profile.preferred_locations[0])
+        if key not in searches:
+            searches[key] = await scraper.scrape_linkedin([key[0]], key[1], False, 25)
+        delivered += len(store.add_jobs(profile.user_id, searches[key][:profile.weekly_application_goal]))
+    return delivered
+
+
+async def seed_profiles(session: aiohttp.ClientSession, base_url: str, profiles):
+    """Create the seeded users through the API."""
+    async def create(profile):
+        async with session.post(f"{base_url}/profiles", json=profile.dict()) as response:
+            if response.status != 200:
+                raise RuntimeError(f"Seeding {profile.user_id} failed: {response.status} {await response.text()}")
+    for start in range(0, len(profiles), 20):
+        await asyncio.gather(*(create(profile) for profile in profiles[start:start + 20]))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workdir: str, linkedin_url: str, workers: int) -> Tuple[subprocess.Popen, str]:
+    """Start the API in workdir; returns the process and its base URL."""
+    port = _free_port()
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])),
+        "LUME_LINKEDIN_BASE_URL": linkedin_url,
+        "LUME_TRACE_FILE": "",
+        "LUME_LOG_LEVEL": "WARNING",
+    }
+    log = open(os.path.join(workdir, "server.log"), "wb")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    log.close()
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_until_ready(session: aiohttp.ClientSession, base_url: str, process: subprocess.Popen, workdir: str):
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            async with session.get(f"{base_url}/metrics") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    with open(os.path.join(workdir, "server.log"), errors="replace") as f:
+        raise RuntimeError(f"API did not start:\n{f.read()[-2000:]}")
+
+
+async def run(args) -> Dict:
+    """Start the stand-ins and the API, seed it, run the load and return the results document."""
+    profiles = synthetic_profiles(args.users, args.seed)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    connector = aiohttp.TCPConnector(limit=args.max_in_flight)
+    with tempfile.TemporaryDirectory() as workdir:
+        async with FakeLinkedIn(latency=args.latency / 1000, seed=args.seed) as fake, \
+                aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            jobs = await seed_jobs(fake, os.path.join(workdir, JOBS_JOURNAL_FILE), profiles)
+            process, base_url = start_server(workdir, fake.url, args.workers)
+            try:
+                await wait_until_ready(session, base_url, process, workdir)
+                await seed_profiles(session, base_url, profiles)
+                logger.info(f"Seeded {len(profiles)} users with {jobs} jobs; running at {args.rps} rps")
+
+                monitor = ResourceMonitor(process.pid)
+                monitor.start()
+                results = await generate(
+                    session, base_url, Workload(args.mix, [p.user_id for p in profiles], args.seed),
+                    args.rps, args.duration, args.warmup, args.max_in_flight, args.arrival, args.seed
+                )
+                # Includes the warmup, so it covers every request the server handled
+                results["server"] = monitor.stop()
+            finally:
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            results["linkedin"] = fake.stats()
+
+    return {
+        "format": RESULTS_FORMAT,
+        "taken_at": datetime.now().isoformat(),
+        "environment": environment(),
+        "config": {
+            "rps": args.rps,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "arrival": args.arrival,
+            "mix": args.mix,
+            "users": args.users,
+            "workers": args.workers,
+            "latency_ms": args.latency,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def regressions(baseline: Dict, current: Dict, tolerance: float) -> List[str]:
+    """
+    Return a line for every endpoint metric that got worse than the baseline allows
+
+    Latency percentiles may grow by `tolerance` (relative, and at least
+    NOISE_FLOOR_MS; only compared with MIN_SAMPLES requests), throughput may drop by `tolerance`, and the error rate
+    may grow by ERROR_RATE_TOLERANCE.
+    """
+    flagged = []
+    old_endpoints = baseline["results"]["endpoints"]
+    for name, new in current["results"]["endpoints"].items():
+        old = old_endpoints.get(name)
+        if not old or not old["count"] or not new["count"]:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if min(old["count"], new["count"]) < MIN_SAMPLES:
+                break
+            if new[key] > old[key] * (1 + tolerance) and new[key] - old[key] > NOISE_FLOOR_MS:
+                flagged.append(f"{name}.{key}: {old[key]:g} -> {new[key]:g}")
+        if new["throughput_rps"] < old["throughput_rps"] * (1 - tolerance):
+            flagged.append(f"{name}.throughput_rps: {old['throughput_rps']:g} -> {new['throughput_rps']:g}")
+        if new["error_rate"] > old["error_rate"] + ERROR_RATE_TOLERANCE:
+            flagged.append(f"{name}.error_rate: {old['error_rate']:g} -> {new['error_rate']:g}")
+    return flagged
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=50, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of load before measuring")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="Relative weights of the request types (default: %(default)s)")
+    parser.add_argument("--arrival", choices=["poisson", "uniform"], default="poisson",
+                        help="Spacing of the scheduled sends")
+    parser.add_argument("--users", type=int, default=200, help="Users seeded before the run")
+    parser.add_argument("--workers", type=int, default=1, help="API worker processes")
+    parser.add_argument("--latency", type=float, default=0.0, help="Injected LinkedIn latency, in milliseconds")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Seconds before a request counts as timed out")
+    parser.add_argument("--max-in-flight", type=int, default=500, help="Outstanding requests before sends are skipped")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="Results JSON to compare against; regressions exit with status 1")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (default: 0.2)")
+    parser.add_argument("--verbose", action="store_true", help="Keep the application's INFO logging")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    configure_logging(logging.INFO if args.verbose else logging.WARNING, {logger.name: logging.INFO}, fmt=TEXT)
+
+    document = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+    else:
+        print(json.dumps(document, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["config"] != document["config"]:
+            print("Warning: the baseline was taken with a different configuration", file=sys.stderr)
+        print("\n".join(compare(baseline, document)), file=sys.stderr)
+        flagged = regressions(baseline, document, args.tolerance)
+        if flagged:
+            print("Regressions:\n  " + "\n  ".join(flagged), file=sys.stderr)
+            return 1
+        print("No regressions", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
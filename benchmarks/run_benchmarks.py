@@ -0,0 +1,316 @@
+"""
+Offline scraping benchmarks.
+
+Measures, against the local LinkedIn stand-in in fake_linkedin.py:
+1. Parse throughput: recorded result pages split and parsed into JobListings
+2. scrape_linkedin latency: complete searches over HTTP
+3. JobScheduler run time: a full daily scraping run for N synthetic users
+
+and, without the stand-in, the size and speed of the JSON and packed
+(services/job_codec.py) encodings of the parsed fixture jobs.
+
+Results are written as JSON (with the commit they were taken at) so runs can
+be compared between commits:
+
+    python benchmarks/run_benchmarks.py --output before.json
+    # ...change something...
+    python benchmarks/run_benchmarks.py --output after.json --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.job_scraper_agent import JobScraperAgent
+from api.scheduler import JobScheduler
+from benchmarks.fake_linkedin import FakeLinkedIn, load_fixture_pages
+from models.compact_profile import CompactProfile
+from models.job import JobListing
+from models.user_profile import UserProfile
+from services.job_codec import pack_jobs, unpack_jobs
+from services.logging_config import TEXT, configure_logging
+from services.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+RESULTS_FORMAT = 1
+DEFAULT_USER_COUNTS = "10,1000,10000"
+
+ROLES = ["Python Developer", "Data Engineer", "Software Engineer", "Machine Learning Engineer",
+         "DevOps Engineer", "Data Scientist", "Backend Developer", "Full Stack Developer"]
+SKILLS = ["Python", "SQL", "AWS", "Django", "Kubernetes", "React", "Spark", "Docker", "Go", "TypeScript"]
+LOCATIONS = ["Toronto", "Montreal", "Vancouver", "Ottawa", "Waterloo", "Calgary", "Remote"]
+INDUSTRIES = ["Technology", "Finance", "Retail", "Healthcare"]
+
+
+class _FixtureBody:
+    """The parts of an aiohttp response the scraper's parser reads, backed by a string."""
+
+    def __init__(self, page: str, chunk_size: int):
+        self.charset = "utf-8"
+        self._data = page.encode()
+        self._chunk_size = chunk_size
+        self.content = self
+
+    async def iter_any(self):
+        for start in range(0, len(self._data), self._chunk_size):
+            yield self._data[start:start + self._chunk_size]
+
+
+def synthetic_profiles(count: int, seed: int = 0) -> List[UserProfile]:
+    """Return `count` varied, repeatable user profiles."""
+    rng = random.Random(seed)
+    return [
+        UserProfile(
+            user_id=f"bench{i}",
+            name=f"Bench User {i}",
+            email=f"bench{i}@example.com",
+            skills=rng.sample(SKILLS, 3),
+            experience_years=rng.randint(0, 15),
+            preferred_roles=rng.sample(ROLES, rng.randint(1, 2)),
+            preferred_locations=rng.sample(LOCATIONS, rng.randint(1, 2)),
+            weekly_application_goal=rng.randint(7, 35),
+            preferred_industries=rng.sample(INDUSTRIES, 2),
+            remote_preference=rng.random() < 0.3
+        )
+        for i in range(count)
+    ]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Return the mean and percentiles of timings given in seconds, in milliseconds."""
+    ordered = sorted(samples)
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+    return {
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(percentile(0.50), 3),
+        "p95_ms": round(percentile(0.95), 3),
+        "p99_ms": round(percentile(0.99), 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+async def bench_parse(rounds: int, chunk_size: int) -> Dict:
+    """Time splitting and parsing the recorded pages, without any I/O."""
+    scraper = JobScraperAgent()
+    pages = load_fixture_pages()
+    cards = 0
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for page in pages:
+            async for fragment in scraper._iter_list_items(_FixtureBody(page, chunk_size)):
+                if scraper._parse_linkedin_job(BeautifulSoup(fragment, "html.parser")) is not None:
+                    cards += 1
+    elapsed = time.perf_counter() - started
+    return {
+        "cards": cards,
+        "seconds": round(elapsed, 4),
+        "cards_per_second": round(cards / elapsed, 1),
+    }
+
+
+async def bench_codec(rounds: int) -> Dict:
+    """Compare bytes per job and encode/decode time of the JSON and packed job encodings."""
+    scraper = JobScraperAgent()
+    jobs = []
+    for page in load_fixture_pages():
+        async for fragment in scraper._iter_list_items(_FixtureBody(page, len(page))):
+            job = scraper._parse_linkedin_job(BeautifulSoup(fragment, "html.parser"))
+            if job is not None:
+                jobs.append(job)
+    codecs = {
+        "json": (dumps, lambda data: [JobListing(**job) for job in loads(data)]),
+        "packed": (pack_jobs, unpack_jobs),
+    }
+    results = {}
+    for name, (encode, decode) in codecs.items():
+        data = encode(jobs)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            encode(jobs)
+        encoded = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(rounds):
+            decode(data)
+        decoded = time.perf_counter() - started
+        results[name] = {
+            "bytes_per_job": round(len(data) / len(jobs), 1),
+            "encode_us_per_job": round(encoded / rounds / len(jobs) * 1e6, 3),
+            "decode_us_per_job": round(decoded / rounds / len(jobs) * 1e6, 3),
+        }
+    return results
+
+
+async def bench_scrape(server: FakeLinkedIn, searches: int) -> Dict:
+    """Time complete scrape_linkedin calls against the stand-in."""
+    scraper = JobScraperAgent()
+    scraper.base_url = server.url
+    samples, jobs = [], 0
+    for i in range(searches):
+        started = time.perf_counter()
+        found = await scraper.scrape_linkedin([ROLES[i % len(ROLES)]], LOCATIONS[i % len(LOCATIONS)], False, 25)
+        samples.append(time.perf_counter() - started)
+        jobs += len(found)
+    return {"searches": searches, "jobs": jobs, **summarize(samples)}
+
+
+async def bench_scheduler(server: FakeLinkedIn, users: int, seed: int) -> Dict:
+    """Time a full daily scraping run for `users` synthetic users."""
+    scheduler = JobScheduler()
+    scheduler.job_scraper_agent.base_url = server.url
+    for profile in synthetic_profiles(users, seed):
+        scheduler.profile_agent.profiles[profile.user_id] = CompactProfile.from_profile(profile)
+    user_ids = list(scheduler.profile_agent.profiles)
+
+    requests_before = server.requests
+    started = time.perf_counter()
+    await scheduler._daily_job_scraping(user_ids)
+    elapsed = time.perf_counter() - started
+    delivered = sum(len(user_jobs.jobs) for user_jobs in scheduler.job_store.users.values())
+    return {
+        "users": users,
+        "seconds": round(elapsed, 3),
+        "ms_per_user": round(elapsed * 1000 / users, 3),
+        "requests": server.requests - requests_before,
+        "jobs_delivered": delivered,
+        "corpus_size": len(scheduler.recommendation_agent.index),
+    }
+
+
+def environment() -> Dict:
+    """Describe the commit and machine a run was taken on."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    """Flatten nested results into dotted metric names."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline: Dict, current: Dict) -> List[str]:
+    """Return a table of every metric present in both runs, with the relative change."""
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    lines = [f"{'metric':<42} {'baseline':>12} {'current':>12} {'change':>9}"]
+    for name in sorted(old.keys() & new.keys()):
+        change = f"{(new[name] - old[name]) / old[name] * 100:+.1f}%" if old[name] else "n/a"
+        lines.append(f"{name:<42} {old[name]:>12g} {new[name]:>12g} {change:>9}")
+    return lines
+
+
+async def run(args) -> Dict:
+    """Run every benchmark and return the results document."""
+    results = {"parse": await bench_parse(args.parse_rounds, args.chunk_size)}
+    logger.info(f"parse: {results['parse']}")
+    results["codec"] = await bench_codec(args.parse_rounds)
+    logger.info(f"codec: {results['codec']}")
+
+    async with FakeLinkedIn(latency=args.latency / 1000, error_rate=args.error_rate,
+                            throttle_rate=args.throttle_rate, chunk_size=args.chunk_size,
+                            seed=args.seed) as server:
+        results["scrape"] = await bench_scrape(server, args.searches)
+        logger.info(f"scrape: {results['scrape']}")
+
+        results["scheduler"] = {}
+        for users in args.users:
+            # Each run starts from empty profile and job stores
+            with tempfile.TemporaryDirectory() as workdir:
+                cwd = os.getcwd()
+                os.chdir(workdir)
+                try:
+                    results["scheduler"][str(users)] = await bench_scheduler(server, users, args.seed)
+                finally:
+                    os.chdir(cwd)
+            logger.info(f"scheduler ({users} users): {results['scheduler'][str(users)]}")
+        results["server"] = server.stats()
+
+    return {
+        "format": RESULTS_FORMAT,
+        "taken_at": datetime.now().isoformat(),
+        "environment": environment(),
+        "config": {
+            "latency_ms": args.latency,
+            "error_rate": args.error_rate,
+            "throttle_rate": args.throttle_rate,
+            "chunk_size": args.chunk_size,
+            "parse_rounds": args.parse_rounds,
+            "searches": args.searches,
+            "users": args.users,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", default=DEFAULT_USER_COUNTS,
+                        type=lambda value: [int(count) for count in value.split(",")],
+                        help="Comma-separated user counts for the scheduler runs (default: %(default)s)")
+    parser.add_argument("--searches", type=int, default=50, help="scrape_linkedin calls to time")
+    parser.add_argument("--parse-rounds", type=int, default=50, help="Passes over the fixture pages")
+    parser.add_argument("--latency", type=float, default=0.0, help="Injected server latency, in milliseconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with a 429")
+    parser.add_argument("--chunk-size", type=int, default=4096, help="Size of the chunks response bodies arrive in")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Keep the application's INFO logging")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    configure_logging(logging.INFO if args.verbose else logging.WARNING, {logger.name: logging.INFO}, fmt=TEXT)
+
+    document = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+    else:
+        print(json.dumps(document, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print("\n".join(compare(baseline, document)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
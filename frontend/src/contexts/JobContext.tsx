@@ -6,7 +6,9 @@ interface JobContextType {
   applications: JobApplication[];
   loading: boolean;
   error: string | null;
+  hasMoreJobs: boolean;
   fetchJobs: () => Promise<void>;
+  loadMoreJobs: () => Promise<void>;
   applyToJob: (jobId: string) => Promise<void>;
   updateApplication: (applicationId: string, status: string) => Promise<void>;
 }
@@ -14,20 +16,46 @@ interface JobContextType {
 const JobContext = createContext<JobContextType | undefined>(undefined);
 
 const TEST_USER_ID = 'test123';
+const JOBS_PAGE_SIZE = 20;
 
 export const JobProvider: React.FC<{ children: React.ReactNode }> = ({ children }) => {
   const [jobs, setJobs] = useState<Job[]>([]);
   const [applications, setApplications] = useState<JobApplication[]>([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [feedCursor, setFeedCursor] = useState<number | null>(null);
+
+  const fetchJobsPage = async (cursor: string | null) => {
+    const params = new URLSearchParams({ limit: String(JOBS_PAGE_SIZE) });
+    if (cursor) params.set('cursor', cursor);
+    const response = await fetch(`/jobs/${TEST_USER_ID}?${params}`);
+    if (!response.ok) throw new Error('Failed to fetch jobs');
+    return response.json(); // backend returns {timestamp, jobs, next_cursor, feed_cursor}
+  };
 
   const fetchJobs = async () => {
     try {
       setLoading(true);
-      const response = await fetch(`/jobs/${TEST_USER_ID}`);
-      if (!response.ok) throw new Error('Failed to fetch jobs');
-      const data = await response.json();
-      setJobs(data.jobs || []); // backend returns {timestamp, jobs}
+      const data = await fetchJobsPage(null);
+      setJobs(data.jobs || []);
+      setNextCursor(data.next_cursor);
+      setFeedCursor(data.feed_cursor ?? 0);
+      setError(null);
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'An error occurred');
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  const loadMoreJobs = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoading(true);
+      const data = await fetchJobsPage(nextCursor);
+      setJobs(prev => [...prev, ...(data.jobs || [])]);
+      setNextCursor(data.next_cursor);
       setError(null);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'An error occurred');
@@ -88,6 +116,19 @@ export const JobProvider: React.FC<{ children: React.ReactNode }> = ({ children
     fetchApplications();
   }, []);
 
+  // Once the first page is loaded, follow new deliveries instead of polling.
+  // EventSource reconnects by itself and resumes from the last event ID.
+  useEffect(() => {
+    if (feedCursor === null) return;
+    const events = new EventSource(`/jobs/${TEST_USER_ID}/events?cursor=${feedCursor}`);
+    events.addEventListener('jobs', (event) => {
+      const data = JSON.parse((event as MessageEvent).data);
+      // Deliveries arrive oldest first; the list shows newest first
+      setJobs(prev => [...[...(data.jobs || [])].reverse(), ...prev]);
+    });
+    return () => events.close();
+  }, [feedCursor]);
+
   return (
     <JobContext.Provider
       value={{
@@ -95,7 +136,9 @@ export const JobProvider: React.FC<{ children: React.ReactNode }> = ({ children
         applications,
         loading,
         error,
+        hasMoreJobs: nextCursor !== null,
         fetchJobs,
+        loadMoreJobs,
         applyToJob,
         updateApplication,
       }}
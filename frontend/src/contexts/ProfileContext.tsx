@@ -1,11 +1,11 @@
-import React, { createContext, useContext, useState, useEffect } from 'react';
+import React, { createContext, useContext, useState, useEffect, useRef } from 'react';
 import { UserProfile } from '../types';
 
 interface ProfileContextType {
   profile: UserProfile | null;
   loading: boolean;
   error: string | null;
-  updateProfile: (profile: UserProfile) => Promise<void>;
+  updateProfile: (profile: Partial<UserProfile>) => Promise<void>;
   refreshProfile: () => Promise<void>;
 }
 
@@ -17,6 +17,7 @@ export const ProfileProvider: React.FC<{ children: React.ReactNode }> = ({ child
   const [profile, setProfile] = useState<UserProfile | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const etag = useRef<string | null>(null); // profile version for If-Match
 
   const fetchProfile = async () => {
     try {
@@ -24,6 +25,7 @@ export const ProfileProvider: React.FC<{ children: React.ReactNode }> = ({ child
       console.log("Fetching profile...");
       const response = await fetch(`/profiles/${TEST_USER_ID}`);
       if (!response.ok) throw new Error('Failed to fetch profile');
+      etag.current = response.headers.get('ETag');
       const data = await response.json();
       setProfile(data.profile); // backend returns {status, message, profile}
       setError(null);
@@ -34,15 +36,31 @@ export const ProfileProvider: React.FC<{ children: React.ReactNode }> = ({ child
     }
   };
 
-  const updateProfile = async (updatedProfile: UserProfile) => {
+  const updateProfile = async (updatedProfile: Partial<UserProfile>) => {
     try {
       setLoading(true);
+      // Only send the fields that changed
+      const changes = Object.fromEntries(
+        Object.entries(updatedProfile).filter(
+          ([key, value]) =>
+            key !== 'user_id' &&
+            JSON.stringify(value) !== JSON.stringify(profile?.[key as keyof UserProfile])
+        )
+      );
+      const headers: Record<string, string> = { 'Content-Type': 'application/json' };
+      if (etag.current) headers['If-Match'] = etag.current;
       const response = await fetch(`/profiles/${TEST_USER_ID}`, {
-        method: 'PUT',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(updatedProfile),
+        method: 'PATCH',
+        headers,
+        body: JSON.stringify(changes),
       });
+      if (response.status === 412) {
+        // Someone else changed the profile; reload the latest version
+        await fetchProfile();
+        throw new Error('Profile was changed elsewhere, please review and try again');
+      }
       if (!response.ok) throw new Error('Failed to update profile');
+      etag.current = response.headers.get('ETag');
       const data = await response.json();
       setProfile(data.profile); // backend returns {status, message, profile}
       setError(null);
@@ -0,0 +1,204 @@
+"""
+Compact in-memory representation of user profiles.
+
+Profiles are kept resident by the ProfileAgent, so instead of one pydantic
+model per user (each holding its own copies of "Python", "Software Engineer",
+...) the hot path stores __slots__ records whose list fields are tuples of
+interned vocabulary IDs. Conversion to and from UserProfile only happens at
+the API boundary.
+
+This only saves memory: matching still works on the profile dicts that
+to_dict() returns. The vocabularies count how many profile fields use each
+term. A term no profile uses any more is dropped and its ID reused, so the
+vocabularies are bounded by the terms of the resident profiles. A profile
+that is replaced or dropped must be released.
+
+The vocabularies are module globals, shared by every ProfileAgent in the
+process, so the IDs are only meaningful within one process.
+"""
+
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models.user_profile import UserProfile
+
+
+class Vocabulary:
+    """
+    Bidirectional mapping between interned terms and small integer IDs.
+
+    IDs handed out by encode() are reference counted and freed by release();
+    IDs from id_for() alone are never freed.
+    """
+
+    __slots__ = ("name", "_ids", "_terms", "_counts", "_free")
+
+    def __init__(self, name: str):
+        self.name = name
+        self._ids: Dict[str, int] = {}
+        self._terms: List[Optional[str]] = []
+        self._counts: List[int] = []
+        self._free: List[int] = []  # IDs of released terms, reused before new ones
+
+    def __len__(self) -> int:
+        """Size of the ID space, including freed IDs."""
+        return len(self._terms)
+
+    @property
+    def terms(self) -> int:
+        """Number of terms currently in the vocabulary."""
+        return len(self._ids)
+
+    def id_for(self, term: str) -> int:
+        """Return the ID of a term, adding it to the vocabulary if needed."""
+        term_id = self._ids.get(term)
+        if term_id is None:
+            term = sys.intern(term)
+            if self._free:
+                term_id = self._free.pop()
+                self._terms[term_id] = term
+            else:
+                term_id = len(self._terms)
+                self._terms.append(term)
+                self._counts.append(0)
+            self._ids[term] = term_id
+        return term_id
+
+    def lookup(self, term: str) -> Optional[int]:
+        """Return the ID of a term without adding it, or None if unknown."""
+        return self._ids.get(term)
+
+    def term(self, term_id: int) -> str:
+        """Return the term for an ID."""
+        return self._terms[term_id]
+
+    def encode(self, terms: Iterable[str]) -> Tuple[int, ...]:
+        """Encode a list of terms as a tuple of IDs, holding a reference to each until release()."""
+        term_ids = tuple(self.id_for(term) for term in terms)
+        for term_id in term_ids:
+            self._counts[term_id] += 1
+        return term_ids
+
+    def release(self, term_ids: Iterable[int]):
+        """Drop references taken by encode(), freeing terms nothing refers to any more."""
+        for term_id in term_ids:
+            self._counts[term_id] -= 1
+            if self._counts[term_id] == 0:
+                del self._ids[self._terms[term_id]]
+                self._terms[term_id] = None
+                self._free.append(term_id)
+
+    def decode(self, term_ids: Iterable[int]) -> List[str]:
+        """Decode a tuple of IDs back to a list of terms."""
+        terms = self._terms
+        return [terms[term_id] for term_id in term_ids]
+
+
+# Shared vocabularies for all resident profiles
+SKILLS = Vocabulary("skills")
+ROLES = Vocabulary("roles")
+LOCATIONS = Vocabulary("locations")
+INDUSTRIES = Vocabulary("industries")
+
+# UserProfile list field -> (CompactProfile slot, vocabulary)
+VOCABULARY_FIELDS = {
+    "skills": ("skill_ids", SKILLS),
+    "preferred_roles": ("role_ids", ROLES),
+    "preferred_locations": ("location_ids", LOCATIONS),
+    "preferred_industries": ("industry_ids", INDUSTRIES),
+}
+
+
+class CompactProfile:
+    """
+    Slotted, vocabulary-encoded profile record.
+
+    Field access by UserProfile name goes through get_field/set_field.
+    The *_ids tuples only save memory; matching works on to_dict() output.
+    """
+
+    __slots__ = (
+        "user_id",
+        "name",
+        "email",
+        "skill_ids",
+        "experience_years",
+        "role_ids",
+        "location_ids",
+        "weekly_application_goal",
+        "industry_ids",
+        "remote_preference",
+    )
+
+    def __init__(self, user_id: str, name: str, email: str, skill_ids: Tuple[int, ...],
+                 experience_years: float, role_ids: Tuple[int, ...],
+                 location_ids: Tuple[int, ...], weekly_application_goal: int,
+                 industry_ids: Tuple[int, ...], remote_preference: bool = True):
+        self.user_id = user_id
+        self.name = name
+        self.email = email
+        self.skill_ids = skill_ids
+        self.experience_years = experience_years
+        self.role_ids = role_ids
+        self.location_ids = location_ids
+        self.weekly_application_goal = weekly_application_goal
+        self.industry_ids = industry_ids
+        self.remote_preference = remote_preference
+
+    @classmethod
+    def from_profile(cls, profile: UserProfile) -> "CompactProfile":
+        """Build a compact record from a validated UserProfile."""
+        return cls(
+            user_id=profile.user_id,
+            name=profile.name,
+            email=profile.email,
+            skill_ids=SKILLS.encode(profile.skills),
+            experience_years=profile.experience_years,
+            role_ids=ROLES.encode(profile.preferred_roles),
+            location_ids=LOCATIONS.encode(profile.preferred_locations),
+            weekly_application_goal=profile.weekly_application_goal,
+            industry_ids=INDUSTRIES.encode(profile.preferred_industries),
+            remote_preference=profile.remote_preference
+        )
+
+    def to_dict(self) -> dict:
+        """Return the profile as a plain dict in UserProfile field order."""
+        return {
+            "user_id": self.user_id,
+            "name": self.name,
+            "email": self.email,
+            "skills": SKILLS.decode(self.skill_ids),
+            "experience_years": self.experience_years,
+            "preferred_roles": ROLES.decode(self.role_ids),
+            "preferred_locations": LOCATIONS.decode(self.location_ids),
+            "weekly_application_goal": self.weekly_application_goal,
+            "preferred_industries": INDUSTRIES.decode(self.industry_ids),
+            "remote_preference": self.remote_preference,
+        }
+
+    def to_profile(self) -> UserProfile:
+        """Return the profile as a UserProfile (the data was validated on the way in)."""
+        return UserProfile.construct(**self.to_dict())
+
+    def get_field(self, field: str):
+        """Read a field by its UserProfile name."""
+        if field in VOCABULARY_FIELDS:
+            slot, vocabulary = VOCABULARY_FIELDS[field]
+            return vocabulary.decode(getattr(self, slot))
+        return getattr(self, field)
+
+    def set_field(self, field: str, value):
+        """Write an already validated value to a field by its UserProfile name."""
+        if field in VOCABULARY_FIELDS:
+            slot, vocabulary = VOCABULARY_FIELDS[field]
+            previous = getattr(self, slot)
+            setattr(self, slot, vocabulary.encode(value))
+            vocabulary.release(previous)
+        else:
+            setattr(self, field, value)
+
+    def release(self):
+        """Give back this record's vocabulary references once it is no longer stored."""
+        for slot, vocabulary in VOCABULARY_FIELDS.values():
+            vocabulary.release(getattr(self, slot))
+            setattr(self, slot, ())
@@ -2,6 +2,18 @@ from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel
 
+# Start of each source's posting URLs; the job ID completes them
+JOB_URL_PREFIXES = {
+    "linkedin": "https://www.linkedin.com/jobs/view/",
+}
+
+def job_url(source: str, job_id: Optional[str]) -> Optional[str]:
+    """Return the posting URL a source uses for a job ID, or None if it cannot be derived"""
+    prefix = JOB_URL_PREFIXES.get(source)
+    if prefix is None or not job_id:
+        return None
+    return prefix + job_id
+
 class JobListing(BaseModel):
     """
     Model for job listings scraped from various sources
@@ -20,6 +32,10 @@ class JobListing(BaseModel):
     is_remote: Optional[bool] = None
     num_applicants: Optional[str] = None
 
+    class Config:
+        # Listings are never mutated after scraping, so responses can share them
+        copy_on_model_validation = "none"
+
 class JobScraperRequest(BaseModel):
     source: str
     search_terms: List[str]
@@ -35,6 +51,7 @@ class JobScraperResponse(BaseModel):
 class JobRecommendationRequest(BaseModel):
     user_id: str
     num_recommendations: int = 5
+    radius_km: Optional[float] = None  # Only jobs this close to a preferred location
 
 class JobRecommendationResponse(BaseModel):
     success: bool
@@ -1,13 +1,15 @@
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
+from models.job import JobListing
 
 class BaseMessage(BaseModel):
     message_type: str
     content: dict
 
 class ProfileMessage(BaseModel):
-    action: str  # "create" or "get"
+    action: str  # "create", "update", "patch" or "get"
     profile: dict
+    expected_version: Optional[int] = None
 
 class JobScraperMessage(BaseModel):
     source: str
@@ -15,6 +17,29 @@ class JobScraperMessage(BaseModel):
     location: Optional[str] = None
     remote_only: Optional[bool] = False
     page: Optional[int] = 1
+    max_results: Optional[int] = 25
+    cursor: Optional[int] = None  # Result offset to start from; a previous final chunk's next_cursor
+    request_id: Optional[str] = None  # Echoed in every chunk; generated if missing
+    window: Optional[int] = None  # Unacknowledged chunks the sender may have outstanding
+    encoding: Optional[str] = "json"  # "msgpack" sends the jobs of each chunk packed
+
+class JobChunk(BaseModel):
+    """One part of a streamed JobScraperMessage result"""
+    request_id: str
+    sequence: int  # Starts at 0
+    jobs: List[JobListing] = []
+    packed: Optional[str] = None  # With the msgpack encoding: base64 of services.job_codec.pack_jobs()
+    final: bool = False  # Last chunk of the stream
+    status: str = "success"  # Final chunk: "success" or "error"
+    message: Optional[str] = None
+    next_cursor: Optional[int] = None  # Final chunk: cursor of the next page, None when there is none
+    total: Optional[int] = None  # Final chunk: jobs sent in the whole stream
+
+class JobChunkAck(BaseModel):
+    """Receiver's acknowledgement of every chunk up to and including `sequence`"""
+    request_id: str
+    sequence: int
+    cancel: bool = False  # Stop sending
 
 class RecommendationMessage(BaseModel):
     user_id: str
@@ -24,5 +49,7 @@ class AgentResponse(BaseModel):
     status: str
     message: str
     profile: Optional[Dict[str, Any]] = None
-    jobs: Optional[List[Dict[str, Any]]] = None
-    recommendations: Optional[List[Dict[str, Any]]] = None 
\ No newline at end of file
+    jobs: Optional[List[JobListing]] = None
+    recommendations: Optional[List[JobListing]] = None
+    match_scores: Optional[List[float]] = None
+    version: Optional[int] = None 
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""
+Admission control for expensive operations.
+
+Each limiter allows a fixed number of operations to run at once and queues
+a bounded number more, each for at most a deadline. Anything beyond that is
+rejected straight away with an Overloaded error carrying a Retry-After
+estimate, so a burst costs a cheap rejection instead of an unbounded pile of
+waiting coroutines. An optional per-client quota stops one client from
+taking every slot.
+"""
+
+import asyncio
+import math
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Hashable, Optional
+
+from services import metrics, tracing
+
+# Weight of the newest sample in the moving average of service time
+SERVICE_TIME_SMOOTHING = 0.2
+
+# Shed reasons
+QUEUE_FULL = "queue_full"
+QUEUE_TIMEOUT = "queue_timeout"
+CLIENT_QUOTA = "client_quota"
+
+QUEUE_WAIT_SECONDS = metrics.histogram(
+    "lume_admission_wait_seconds", "Time operations queued for an admission slot, admitted or shed", ["limiter"])
+
+
+class Overloaded(Exception):
+    """Raised when an operation is not admitted."""
+
+    def __init__(self, message: str, retry_after: int, reason: str):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionLimiter:
+    """Concurrency limit with a bounded, deadline-limited FIFO wait queue."""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float,
+                 per_client: Optional[int] = None):
+        """
+        Args:
+            name: Name used in errors and stats
+            max_concurrent: Operations allowed to run at once
+            max_queue: Operations allowed to wait for a slot
+            queue_timeout: Seconds an operation may wait before it is shed
+            per_client: Running plus waiting operations allowed per client, or None for no quota
+        """
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.per_client = per_client
+        self.running = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.clients: Counter = Counter()
+        self.admitted = 0
+        self.shed: Counter = Counter()
+        self.service_time = 1.0  # Moving average, seconds
+        self._wait_seconds = QUEUE_WAIT_SECONDS.labels(name)
+
+    @asynccontextmanager
+    async def admit(self, client: Optional[Hashable] = None) -> AsyncIterator[None]:
+        """
+        Hold a slot for the duration of the with-block
+
+        Args:
+            client: Identifies the caller for the per-client quota
+
+        Raises:
+            Overloaded: If the queue is full, the wait times out or the client is over quota
+        """
+        if client is not None and self.per_client is not None and self.clients[client] >= self.per_client:
+            self._reject(CLIENT_QUOTA, f"Too many concurrent {self.name} requests from this client")
+
+        if self.running < self.max_concurrent and not self.waiters:
+            self.running += 1
+        elif len(self.waiters) >= self.max_queue:
+            self._reject(QUEUE_FULL, f"{self.name} is overloaded")
+        else:
+            await self._wait(client)
+
+        self.admitted += 1
+        if client is not None:
+            self.clients[client] += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            self.service_time += SERVICE_TIME_SMOOTHING * (elapsed - self.service_time)
+            if client is not None:
+                self.clients[client] -= 1
+                if not self.clients[client]:
+                    del self.clients[client]
+            self._release()
+
+    def retry_after(self) -> int:
+        """Estimate the seconds until a slot frees up for a new caller."""
+        backlog = (len(self.waiters) + 1) / self.max_concurrent
+        return max(1, math.ceil(backlog * self.service_time))
+
+    def stats(self) -> Dict:
+        """Return the current load and counters."""
+        return {
+            "running": self.running,
+            "queued": len(self.waiters),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "service_time_seconds": round(self.service_time, 3),
+        }
+
+    async def _wait(self, client: Optional[Hashable]):
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        if client is not None:
+            # Waiting counts against the client's quota too
+            self.clients[client] += 1
+        started = time.monotonic()
+        wait_span = tracing.start_span("admission_wait", limiter=self.name)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject(QUEUE_TIMEOUT, f"Timed out waiting for {self.name}")
+        except asyncio.CancelledError:
+            # A slot handed over just before cancellation must be passed on
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+        finally:
+            self._wait_seconds.observe(time.monotonic() - started)
+            if wait_span is not None:
+                wait_span.end()
+            if client is not None:
+                self.clients[client] -= 1
+                if not self.clients[client]:
+                    del self.clients[client]
+            try:
+                self.waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def _release(self):
+        # Hand the slot straight to the oldest live waiter so it cannot be overtaken
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.running -= 1
+
+    def _reject(self, reason: str, message: str):
+        self.shed[reason] += 1
+        raise Overloaded(message, self.retry_after(), reason)
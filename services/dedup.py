@@ -0,0 +1,132 @@
+"""
+Near-duplicate job posting detection with MinHash and LSH banding.
+
+The same role is often posted under several LinkedIn job IDs (reposts, one
+listing per city). Each posting gets a MinHash signature over word shingles
+of its title, company and description; signatures are split into bands and
+bucketed, so a lookup only compares against postings that collide in at
+least one band. Location is deliberately left out of the shingles so that
+per-city copies of a role collapse onto one canonical posting.
+
+Postings with fewer than MIN_SHINGLES shingles (a one-word title with no
+company or description, or text the tokenizer keeps nothing of, such as a
+title in a non-Latin script) carry no evidence of similarity; each is its
+own canonical posting and is never put in the LSH buckets.
+"""
+
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from models.job import JobListing
+from services.recommender import job_key, tokenize
+
+NUM_PERMUTATIONS = 64
+NUM_BANDS = 16
+# Estimated Jaccard similarity at or above which postings are duplicates
+DUPLICATE_THRESHOLD = 0.8
+# Postings with fewer shingles are never matched
+MIN_SHINGLES = 2
+
+# Universal hashing (a * x + b) mod p with a Mersenne prime; shingle hashes are
+# 32-bit and a, b < p, so a * x + b never overflows 64 bits
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240521)
+_A = _rng.integers(1, _PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def job_shingles(job: JobListing) -> Set[str]:
+    """Return the word bigram shingles of a posting's title, company and description."""
+    tokens = tokenize(job.title) + ["@" + token for token in tokenize(job.company)]
+    tokens += tokenize(job.description)
+    if len(tokens) < 2:
+        return set(tokens)
+    return {f"{first} {second}" for first, second in zip(tokens, tokens[1:])}
+
+
+def minhash_signature(shingles: Set[str]) -> np.ndarray:
+    """Compute the MinHash signature of a set of shingles."""
+    if not shingles:
+        return np.full(NUM_PERMUTATIONS, _PRIME, dtype=np.uint64)
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode()) for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+    return ((np.outer(_A, hashes) + _B[:, None]) % _PRIME).min(axis=1)
+
+
+class NearDuplicateDetector:
+    """Maps each posting to a canonical posting, in sub-linear time per lookup."""
+
+    def __init__(self, num_bands: int = NUM_BANDS, threshold: float = DUPLICATE_THRESHOLD):
+        """
+        Args:
+            num_bands: Number of LSH bands the signature is split into
+            threshold: Minimum estimated similarity to treat postings as duplicates
+        """
+        if NUM_PERMUTATIONS % num_bands:
+            raise ValueError(f"num_bands must divide {NUM_PERMUTATIONS}")
+        self.rows_per_band = NUM_PERMUTATIONS // num_bands
+        self.threshold = threshold
+        self.buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(num_bands)]
+        self.signatures: List[np.ndarray] = []
+        self.canonical_keys: List[Tuple[str, str]] = []
+        self.canonical_of: Dict[Tuple[str, str], Tuple[str, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def _bands(self, signature: np.ndarray):
+        rows = self.rows_per_band
+        for band, buckets in enumerate(self.buckets):
+            yield buckets, signature[band * rows:(band + 1) * rows].tobytes()
+
+    def find(self, job: JobListing) -> Optional[Tuple[str, str]]:
+        """Return the key of a known posting this job duplicates, without registering it."""
+        key = job_key(job)
+        if key in self.canonical_of:
+            return self.canonical_of[key]
+        shingles = job_shingles(job)
+        if len(shingles) < MIN_SHINGLES:
+            return None
+        match, _ = self._match(minhash_signature(shingles))
+        return match
+
+    def canonical_key(self, job: JobListing) -> Tuple[str, str]:
+        """Return the key of the canonical posting for a job, registering it as canonical if new."""
+        key = job_key(job)
+        canonical = self.canonical_of.get(key)
+        if canonical is not None:
+            return canonical
+
+        shingles = job_shingles(job)
+        if len(shingles) < MIN_SHINGLES:
+            self.canonical_of[key] = key
+            return key
+        signature = minhash_signature(shingles)
+        canonical, bands = self._match(signature)
+        if canonical is None:
+            canonical = key
+            row = len(self.signatures)
+            self.signatures.append(signature)
+            self.canonical_keys.append(key)
+            for buckets, band in bands:
+                buckets.setdefault(band, []).append(row)
+        self.canonical_of[key] = canonical
+        return canonical
+
+    def _match(self, signature: np.ndarray):
+        bands = list(self._bands(signature))
+        candidates = set()
+        for buckets, band in bands:
+            candidates.update(buckets.get(band, ()))
+
+        best, best_similarity = None, self.threshold
+        for row in candidates:
+            similarity = float(np.mean(self.signatures[row] == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = row, similarity
+        return (self.canonical_keys[best] if best is not None else None), bands
@@ -0,0 +1,297 @@
+"""
+Offline location gazetteer and spatial index for job and profile locations.
+
+Free-text locations ("Toronto, Ontario, Canada", "Greater Toronto Area",
+"Remote") are resolved against a bundled table of places to canonical place
+IDs with coordinates; no network lookups are made. Resolution is memoized,
+since the same handful of location strings repeat across the corpus.
+
+GeoIndex buckets documents into a lat/lon grid so radius queries only
+visit nearby cells before an exact haversine check.
+"""
+
+import math
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+REMOTE_PLACE_ID = "remote"
+EARTH_RADIUS_KM = 6371.0
+# Grid cell size in degrees (~111 km of latitude)
+GRID_CELL_DEGREES = 1.0
+
+# place_id, city, region code, region name, country code, country name, lat, lon, aliases
+# Within a city name, more populous places come first and win when no region is given
+_PLACES = [
+    ("toronto-on-ca", "Toronto", "ON", "Ontario", "CA", "Canada", 43.6532, -79.3832,
+     ["greater toronto area", "gta", "toronto metropolitan area", "north york", "scarborough", "etobicoke"]),
+    ("mississauga-on-ca", "Mississauga", "ON", "Ontario", "CA", "Canada", 43.5890, -79.6441, []),
+    ("markham-on-ca", "Markham", "ON", "Ontario", "CA", "Canada", 43.8561, -79.3370, []),
+    ("brampton-on-ca", "Brampton", "ON", "Ontario", "CA", "Canada", 43.7315, -79.7624, []),
+    ("vaughan-on-ca", "Vaughan", "ON", "Ontario", "CA", "Canada", 43.8361, -79.4983, []),
+    ("oakville-on-ca", "Oakville", "ON", "Ontario", "CA", "Canada", 43.4675, -79.6877, []),
+    ("hamilton-on-ca", "Hamilton", "ON", "Ontario", "CA", "Canada", 43.2557, -79.8711, []),
+    ("ottawa-on-ca", "Ottawa", "ON", "Ontario", "CA", "Canada", 45.4215, -75.6972,
+     ["ottawa-gatineau", "national capital region"]),
+    ("waterloo-on-ca", "Waterloo", "ON", "Ontario", "CA", "Canada", 43.4643, -80.5204,
+     ["kitchener-waterloo", "kitchener waterloo", "waterloo region"]),
+    ("kitchener-on-ca", "Kitchener", "ON", "Ontario", "CA", "Canada", 43.4516, -80.4925, []),
+    ("montreal-qc-ca", "Montreal", "QC", "Quebec", "CA", "Canada", 45.5019, -73.5674,
+     ["montréal", "greater montreal", "greater montreal metropolitan area"]),
+    ("quebec-city-qc-ca", "Quebec City", "QC", "Quebec", "CA", "Canada", 46.8139, -71.2080, ["québec"]),
+    ("vancouver-bc-ca", "Vancouver", "BC", "British Columbia", "CA", "Canada", 49.2827, -123.1207,
+     ["greater vancouver", "greater vancouver metropolitan area", "metro vancouver"]),
+    ("burnaby-bc-ca", "Burnaby", "BC", "British Columbia", "CA", "Canada", 49.2488, -122.9805, []),
+    ("surrey-bc-ca", "Surrey", "BC", "British Columbia", "CA", "Canada", 49.1913, -122.8490, []),
+    ("victoria-bc-ca", "Victoria", "BC", "British Columbia", "CA", "Canada", 48.4284, -123.3656, []),
+    ("calgary-ab-ca", "Calgary", "AB", "Alberta", "CA", "Canada", 51.0447, -114.0719,
+     ["calgary metropolitan area"]),
+    ("edmonton-ab-ca", "Edmonton", "AB", "Alberta", "CA", "Canada", 53.5461, -113.4938,
+     ["edmonton metropolitan area"]),
+    ("winnipeg-mb-ca", "Winnipeg", "MB", "Manitoba", "CA", "Canada", 49.8951, -97.1384, []),
+    ("saskatoon-sk-ca", "Saskatoon", "SK", "Saskatchewan", "CA", "Canada", 52.1579, -106.6702, []),
+    ("regina-sk-ca", "Regina", "SK", "Saskatchewan", "CA", "Canada", 50.4452, -104.6189, []),
+    ("halifax-ns-ca", "Halifax", "NS", "Nova Scotia", "CA", "Canada", 44.6488, -63.5752, []),
+    ("new-york-ny-us", "New York", "NY", "New York", "US", "United States", 40.7128, -74.0060,
+     ["new york city", "nyc", "new york city metropolitan area", "manhattan", "brooklyn"]),
+    ("jersey-city-nj-us", "Jersey City", "NJ", "New Jersey", "US", "United States", 40.7178, -74.0431, []),
+    ("boston-ma-us", "Boston", "MA", "Massachusetts", "US", "United States", 42.3601, -71.0589,
+     ["greater boston"]),
+    ("cambridge-ma-us", "Cambridge", "MA", "Massachusetts", "US", "United States", 42.3736, -71.1097, []),
+    ("washington-dc-us", "Washington", "DC", "District of Columbia", "US", "United States", 38.9072, -77.0369,
+     ["washington dc", "washington d.c", "washington dc-baltimore area"]),
+    ("philadelphia-pa-us", "Philadelphia", "PA", "Pennsylvania", "US", "United States", 39.9526, -75.1652, []),
+    ("pittsburgh-pa-us", "Pittsburgh", "PA", "Pennsylvania", "US", "United States", 40.4406, -79.9959, []),
+    ("atlanta-ga-us", "Atlanta", "GA", "Georgia", "US", "United States", 33.7490, -84.3880,
+     ["atlanta metropolitan area"]),
+    ("miami-fl-us", "Miami", "FL", "Florida", "US", "United States", 25.7617, -80.1918, []),
+    ("chicago-il-us", "Chicago", "IL", "Illinois", "US", "United States", 41.8781, -87.6298,
+     ["greater chicago area"]),
+    ("detroit-mi-us", "Detroit", "MI", "Michigan", "US", "United States", 42.3314, -83.0458, []),
+    ("minneapolis-mn-us", "Minneapolis", "MN", "Minnesota", "US", "United States", 44.9778, -93.2650, []),
+    ("dallas-tx-us", "Dallas", "TX", "Texas", "US", "United States", 32.7767, -96.7970,
+     ["dallas-fort worth metroplex", "dfw"]),
+    ("houston-tx-us", "Houston", "TX", "Texas", "US", "United States", 29.7604, -95.3698, []),
+    ("austin-tx-us", "Austin", "TX", "Texas", "US", "United States", 30.2672, -97.7431,
+     ["austin, texas metropolitan area"]),
+    ("denver-co-us", "Denver", "CO", "Colorado", "US", "United States", 39.7392, -104.9903,
+     ["denver metropolitan area"]),
+    ("phoenix-az-us", "Phoenix", "AZ", "Arizona", "US", "United States", 33.4484, -112.0740, []),
+    ("salt-lake-city-ut-us", "Salt Lake City", "UT", "Utah", "US", "United States", 40.7608, -111.8910, []),
+    ("seattle-wa-us", "Seattle", "WA", "Washington", "US", "United States", 47.6062, -122.3321,
+     ["greater seattle area"]),
+    ("bellevue-wa-us", "Bellevue", "WA", "Washington", "US", "United States", 47.6101, -122.2015, []),
+    ("redmond-wa-us", "Redmond", "WA", "Washington", "US", "United States", 47.6740, -122.1215, []),
+    ("portland-or-us", "Portland", "OR", "Oregon", "US", "United States", 45.5152, -122.6784, []),
+    ("san-francisco-ca-us", "San Francisco", "CA", "California", "US", "United States", 37.7749, -122.4194,
+     ["san francisco bay area", "bay area", "sf", "sf bay area"]),
+    ("oakland-ca-us", "Oakland", "CA", "California", "US", "United States", 37.8044, -122.2712, []),
+    ("san-jose-ca-us", "San Jose", "CA", "California", "US", "United States", 37.3382, -121.8863, []),
+    ("palo-alto-ca-us", "Palo Alto", "CA", "California", "US", "United States", 37.4419, -122.1430, []),
+    ("mountain-view-ca-us", "Mountain View", "CA", "California", "US", "United States", 37.3861, -122.0839, []),
+    ("sunnyvale-ca-us", "Sunnyvale", "CA", "California", "US", "United States", 37.3688, -122.0363, []),
+    ("los-angeles-ca-us", "Los Angeles", "CA", "California", "US", "United States", 34.0522, -118.2437,
+     ["greater los angeles", "los angeles metropolitan area", "la"]),
+    ("san-diego-ca-us", "San Diego", "CA", "California", "US", "United States", 32.7157, -117.1611,
+     ["san diego metropolitan area"]),
+    ("london-eng-gb", "London", "ENG", "England", "GB", "United Kingdom", 51.5074, -0.1278,
+     ["greater london", "london area"]),
+    ("manchester-eng-gb", "Manchester", "ENG", "England", "GB", "United Kingdom", 53.4808, -2.2426, []),
+    ("edinburgh-sct-gb", "Edinburgh", "SCT", "Scotland", "GB", "United Kingdom", 55.9533, -3.1883, []),
+    ("dublin-d-ie", "Dublin", "D", "County Dublin", "IE", "Ireland", 53.3498, -6.2603, []),
+    ("berlin-be-de", "Berlin", "BE", "Berlin", "DE", "Germany", 52.5200, 13.4050, []),
+    ("amsterdam-nh-nl", "Amsterdam", "NH", "North Holland", "NL", "Netherlands", 52.3676, 4.9041, []),
+    ("paris-idf-fr", "Paris", "IDF", "Ile-de-France", "FR", "France", 48.8566, 2.3522, []),
+    ("bangalore-ka-in", "Bangalore", "KA", "Karnataka", "IN", "India", 12.9716, 77.5946, ["bengaluru"]),
+    ("singapore-sg", "Singapore", "SG", "Singapore", "SG", "Singapore", 1.3521, 103.8198, []),
+    ("sydney-nsw-au", "Sydney", "NSW", "New South Wales", "AU", "Australia", -33.8688, 151.2093, []),
+    ("london-on-ca", "London", "ON", "Ontario", "CA", "Canada", 42.9849, -81.2453, []),
+]
+
+_REMOTE_WORDS = {"remote", "anywhere", "work from home", "wfh"}
+_SUFFIXES = (" metropolitan area", " metro area", " area", " region")
+
+
+class Place:
+    """A canonical place with coordinates."""
+
+    __slots__ = ("place_id", "name", "region", "country", "lat", "lon")
+
+    def __init__(self, place_id: str, name: str, region: str, country: str,
+                 lat: Optional[float], lon: Optional[float]):
+        self.place_id = place_id
+        self.name = name
+        self.region = region
+        self.country = country
+        self.lat = lat
+        self.lon = lon
+
+    @property
+    def is_remote(self) -> bool:
+        return self.place_id == REMOTE_PLACE_ID
+
+    def __repr__(self) -> str:
+        return f"Place({self.place_id!r})"
+
+
+REMOTE = Place(REMOTE_PLACE_ID, "Remote", "", "", None, None)
+
+# Normalized city name or alias -> candidate places, most populous first
+_BY_NAME: Dict[str, List[Place]] = {}
+# Place ID -> normalized region and country names/codes used to disambiguate
+_QUALIFIERS: Dict[str, Set[str]] = {}
+PLACES: Dict[str, Place] = {REMOTE_PLACE_ID: REMOTE}
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s,.-]", " ", text.lower())).strip(" .")
+
+
+for _place_id, _city, _region_code, _region, _country_code, _country, _lat, _lon, _aliases in _PLACES:
+    _place = Place(_place_id, _city, _region, _country, _lat, _lon)
+    PLACES[_place_id] = _place
+    for _name in [_city] + _aliases:
+        _BY_NAME.setdefault(_normalize(_name), []).append(_place)
+    _QUALIFIERS[_place_id] = {
+        _normalize(_region_code), _normalize(_region), _normalize(_country_code), _normalize(_country)
+    }
+    if _country_code == "US":
+        _QUALIFIERS[_place_id].update({"usa", "us", "united states of america"})
+    if _country_code == "GB":
+        _QUALIFIERS[_place_id].update({"uk", "great britain"})
+
+
+def _pick(candidates: List[Place], qualifiers: List[str]) -> Place:
+    """Choose among same-named places using region/country qualifiers."""
+    for candidate in candidates:
+        if any(qualifier in _QUALIFIERS[candidate.place_id] for qualifier in qualifiers):
+            return candidate
+    return candidates[0]
+
+
+@lru_cache(maxsize=65536)
+def resolve(location: Optional[str]) -> Optional[Place]:
+    """
+    Resolve a free-text location to a canonical place
+
+    Args:
+        location: Location text as found on a posting or profile
+
+    Returns:
+        Place, REMOTE for remote locations, or None if the location is unknown
+    """
+    if not location:
+        return None
+    text = _normalize(location)
+    if text in _REMOTE_WORDS or re.search(r"\bremote\b", text):
+        return REMOTE
+
+    if text in _BY_NAME:
+        return _BY_NAME[text][0]
+
+    parts = [part.strip() for part in text.split(",") if part.strip()]
+    if not parts:
+        return None
+    head, qualifiers = parts[0], parts[1:]
+    for name in (head, re.sub(r"^greater ", "", head)):
+        for suffix in ("",) + _SUFFIXES:
+            if suffix and not name.endswith(suffix):
+                continue
+            candidates = _BY_NAME.get(name[:len(name) - len(suffix)] if suffix else name)
+            if candidates:
+                return _pick(candidates, qualifiers)
+    return None
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; accepts scalars or NumPy arrays."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class _GeoCell:
+    """Documents in one grid cell, as NumPy arrays grown in amortized chunks."""
+
+    __slots__ = ("ids", "lats", "lons", "size")
+
+    def __init__(self):
+        self.ids = np.empty(4, dtype=np.int64)
+        self.lats = np.empty(4)
+        self.lons = np.empty(4)
+        self.size = 0
+
+    def append(self, doc_id: int, lat: float, lon: float):
+        if self.size == len(self.ids):
+            capacity = 2 * self.size
+            self.ids = np.resize(self.ids, capacity)
+            self.lats = np.resize(self.lats, capacity)
+            self.lons = np.resize(self.lons, capacity)
+        self.ids[self.size], self.lats[self.size], self.lons[self.size] = doc_id, lat, lon
+        self.size += 1
+
+
+class GeoIndex:
+    """Grid index of documents by resolved location; a document may be indexed at several places."""
+
+    def __init__(self, cell_degrees: float = GRID_CELL_DEGREES):
+        """
+        Args:
+            cell_degrees: Size of a grid cell in degrees
+        """
+        self.cell_degrees = cell_degrees
+        self.cells: Dict[Tuple[int, int], _GeoCell] = {}
+        self.remote: Set[int] = set()
+        self.lon_cells = math.ceil(360 / cell_degrees)
+        self._indexed: Set[Tuple[int, str]] = set()
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_degrees), math.floor((lon + 180) / self.cell_degrees) % self.lon_cells)
+
+    def add(self, doc_id: int, place: Optional[Place]):
+        """Index a document at a place; unknown places, and places it is already indexed at, are skipped."""
+        if place is None or (doc_id, place.place_id) in self._indexed:
+            return
+        self._indexed.add((doc_id, place.place_id))
+        if place.is_remote:
+            self.remote.add(doc_id)
+            return
+        cell = self._cell(place.lat, place.lon)
+        if cell not in self.cells:
+            self.cells[cell] = _GeoCell()
+        self.cells[cell].append(doc_id, place.lat, place.lon)
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[int]:
+        """Return IDs of documents within radius_km of a point, once per place they are indexed at."""
+        lat_span = radius_km / 111.0
+        lon_span = radius_km / (111.0 * max(math.cos(math.radians(lat)), 0.01))
+        min_lat = math.floor((lat - lat_span) / self.cell_degrees)
+        max_lat = math.floor((lat + lat_span) / self.cell_degrees)
+        first_lon = math.floor((lon - lon_span + 180) / self.cell_degrees)
+        # Cell columns wrap around at the antimeridian
+        lon_cells = [column % self.lon_cells for column in
+                     range(first_lon, min(math.floor((lon + lon_span + 180) / self.cell_degrees),
+                                          first_lon + self.lon_cells - 1) + 1)]
+
+        found = []
+        for cell_lat in range(min_lat, max_lat + 1):
+            for cell_lon in lon_cells:
+                cell = self.cells.get((cell_lat, cell_lon))
+                if cell is None:
+                    continue
+                size = cell.size
+                distances = haversine_km(lat, lon, cell.lats[:size], cell.lons[:size])
+                found.extend(cell.ids[:size][distances <= radius_km].tolist())
+        return found
+
+    def near_any(self, places: Iterable[Place], radius_km: float) -> Set[int]:
+        """Return IDs of documents within radius_km of any of the places (remote places match remote documents)."""
+        found: Set[int] = set()
+        for place in places:
+            if place.is_remote:
+                found.update(self.remote)
+            else:
+                found.update(self.within(place.lat, place.lon, radius_km))
+        return found
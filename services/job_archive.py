@@ -0,0 +1,329 @@
+"""
+Append-only columnar archive of every job observation.
+
+Each time the scheduler scrapes a listing, one row is appended: when it was
+observed, when it was posted, and its company, title, location, source and
+remote flag. The same posting scraped on several days (or for several users)
+is several observations, which is what posting-volume analysis counts.
+
+Layout, under the archive directory:
+
+    dict_company.msgpack ...   One dictionary per string column: the distinct
+                               values, msgpack-packed back to back; a value's
+                               code is its position
+    2024-05/observed.i8 ...    One partition per month of observation, with one
+                               file of fixed-width values per column
+
+String columns hold dictionary codes, matched case-insensitively, so rows
+are a few dozen bytes and filters and group-bys compare integers. Scans
+memory-map the column files and walk them in blocks of SCAN_BLOCK_ROWS,
+skipping partitions outside the time window, so memory use does not grow
+with the archive.
+
+Writers serialize through a file lock and write dictionary values before
+the rows that use them. A partition's row count is its shortest column; a
+writer truncates columns left longer by an interrupted append before adding
+rows. Readers may run in other threads or processes while rows are appended.
+"""
+
+import calendar
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import msgpack
+import numpy as np
+
+from models.job import JobListing
+from services.recommender import job_is_remote
+from services.shared_state import FileLock, PackedJournalFollower
+
+# Column name -> on-disk dtype
+COLUMNS = {
+    "observed": np.dtype("<i8"),  # Unix seconds
+    "posted": np.dtype("<i8"),  # Unix seconds, NO_TIME when unknown
+    "company": np.dtype("<u4"),
+    "title": np.dtype("<u4"),
+    "location": np.dtype("<u4"),
+    "source": np.dtype("<u4"),
+    "remote": np.dtype("i1"),
+}
+DICTIONARY_COLUMNS = ("company", "title", "location", "source")
+TIME_COLUMNS = ("observed", "posted")
+NO_TIME = -1
+# Bin widths of timeline(); weeks start on Monday
+INTERVALS = {"day": 86400, "week": 7 * 86400}
+# Rows read per column per step of a scan
+SCAN_BLOCK_ROWS = 1 << 20
+
+_EPOCH_MONDAY_OFFSET = 3 * 86400  # 1970-01-01 was a Thursday
+
+
+class InvalidArchiveQuery(ValueError):
+    """Raised for unknown columns, intervals or filters."""
+
+
+def _epoch(moment: datetime) -> int:
+    """Unix seconds of a datetime; naive datetimes are taken as UTC."""
+    return calendar.timegm(moment.utctimetuple())
+
+
+def _partition_name(seconds: int) -> str:
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m")
+
+
+def _dictionary_key(value: str) -> str:
+    return value.strip().casefold()
+
+
+class _Dictionary:
+    """The distinct values of one string column, following its file; safe to share between threads."""
+
+    def __init__(self, path: str):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+        self._follower = PackedJournalFollower(path)
+        # Scans run in executor threads while the scheduler appends
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Pick up values appended by any writer since the last refresh."""
+        with self._lock:
+            self._refresh()
+
+    def code(self, value: str) -> Optional[int]:
+        return self.codes.get(_dictionary_key(value))
+
+    def decode(self, codes: Iterable[int]) -> List[str]:
+        """Values of codes read by an earlier refresh."""
+        with self._lock:
+            return [self.values[code] for code in codes]
+
+    def add(self, value: str) -> int:
+        """Append a value to the file and return its code (file lock held, dictionary refreshed)."""
+        with self._lock:
+            with open(self._follower.path, "ab") as f:
+                f.write(msgpack.packb(value))
+            self._refresh()
+            return self.code(value)
+
+    def _refresh(self):
+        for value in self._follower.read_new():
+            self.codes.setdefault(_dictionary_key(value), len(self.values))
+            self.values.append(value)
+
+
+class JobArchive:
+    """Appends job observations and answers counting queries over them."""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Archive directory; created on the first append
+        """
+        self.path = path
+        self.lock = FileLock(os.path.join(path, "archive.lock"))
+        self.dictionaries = {
+            column: _Dictionary(os.path.join(path, f"dict_{column}.msgpack")) for column in DICTIONARY_COLUMNS
+        }
+
+    def append(self, jobs: Iterable[JobListing], observed_at: Optional[datetime] = None) -> int:
+        """
+        Record one observation of each job
+
+        Args:
+            jobs: Jobs just scraped
+            observed_at: Time of the observation; defaults to now
+
+        Returns:
+            Number of rows appended
+        """
+        jobs = list(jobs)
+        if not jobs:
+            return 0
+        observed = _epoch(observed_at) if observed_at is not None else int(datetime.now(timezone.utc).timestamp())
+        os.makedirs(self.path, exist_ok=True)
+        with self.lock:
+            self._refresh_dictionaries()
+            columns = {
+                "observed": np.full(len(jobs), observed, dtype=COLUMNS["observed"]),
+                "posted": np.fromiter((_epoch(job.posted_date) if job.posted_date else NO_TIME for job in jobs),
+                                      dtype=COLUMNS["posted"], count=len(jobs)),
+                "remote": np.fromiter((job_is_remote(job) for job in jobs), dtype=COLUMNS["remote"], count=len(jobs)),
+            }
+            for column in DICTIONARY_COLUMNS:
+                columns[column] = np.fromiter((self._assign(column, getattr(job, column)) for job in jobs),
+                                              dtype=COLUMNS[column], count=len(jobs))
+            partition = os.path.join(self.path, _partition_name(observed))
+            os.makedirs(partition, exist_ok=True)
+            self._repair(partition)
+            for column, values in columns.items():
+                with open(self._column_path(partition, column), "ab") as f:
+                    f.write(values.tobytes())
+        return len(jobs)
+
+    def count_by(self, group_by: str, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 time_column: str = "observed", filters: Optional[Dict[str, str]] = None,
+                 remote: Optional[bool] = None, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        Count observations per value of a string column
+
+        Args:
+            group_by: One of DICTIONARY_COLUMNS
+            since: Only rows whose time_column is at or after this time
+            until: Only rows whose time_column is before this time
+            time_column: "observed" or "posted"
+            filters: Column -> value the rows must have (case-insensitive)
+            remote: Only remote (True) or only on-site (False) rows
+            limit: Most groups to return
+
+        Returns:
+            (value, count) pairs, largest count first
+        """
+        if group_by not in DICTIONARY_COLUMNS:
+            raise InvalidArchiveQuery(f"Cannot group by {group_by}; choose from {', '.join(DICTIONARY_COLUMNS)}")
+        totals = np.zeros(0, dtype=np.int64)
+        for block in self._scan(group_by, since, until, time_column, filters, remote):
+            counts = np.bincount(block, minlength=len(totals))
+            counts[:len(totals)] += totals
+            totals = counts
+        # Codes in scanned rows were written to the dictionary file before the rows
+        self._refresh_dictionaries()
+        order = np.argsort(-totals, kind="stable")
+        order = order[totals[order] > 0][:limit].tolist()
+        values = self.dictionaries[group_by].decode(order)
+        return [(value, int(totals[code])) for value, code in zip(values, order)]
+
+    def timeline(self, interval: str = "day", since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 time_column: str = "observed", filters: Optional[Dict[str, str]] = None,
+                 remote: Optional[bool] = None) -> List[Tuple[str, int]]:
+        """
+        Count observations per day or week of time_column
+
+        Args:
+            interval: "day" or "week"
+            since, until, time_column, filters, remote: As for count_by()
+
+        Returns:
+            (ISO date of the bin's first day, count) pairs for non-empty bins, oldest first
+        """
+        width = INTERVALS.get(interval)
+        if width is None:
+            raise InvalidArchiveQuery(f"Unknown interval {interval}; choose from {', '.join(INTERVALS)}")
+        offset = _EPOCH_MONDAY_OFFSET if interval == "week" else 0
+        totals: Dict[int, int] = {}
+        for block in self._scan(time_column, since, until, time_column, filters, remote):
+            bins, counts = np.unique((block + offset) // width, return_counts=True)
+            for bin_, count in zip(bins.tolist(), counts.tolist()):
+                totals[bin_] = totals.get(bin_, 0) + count
+        return [
+            (datetime.fromtimestamp(bin_ * width - offset, timezone.utc).date().isoformat(), count)
+            for bin_, count in sorted(totals.items())
+        ]
+
+    def stats(self) -> Dict:
+        """Rows, partitions, disk bytes and dictionary sizes of the archive."""
+        self._refresh_dictionaries()
+        partitions = self._partitions()
+        rows = sum(self._rows(partition) for partition in partitions)
+        files = self._files(self.path) + [path for partition in partitions for path in self._files(partition)]
+        return {
+            "rows": rows,
+            "partitions": len(partitions),
+            "bytes": sum(map(os.path.getsize, files)),
+            "dictionaries": {column: len(d.values) for column, d in self.dictionaries.items()},
+        }
+
+    def _scan(self, column: str, since: Optional[datetime], until: Optional[datetime], time_column: str,
+              filters: Optional[Dict[str, str]], remote: Optional[bool]) -> Iterator[np.ndarray]:
+        """Yield blocks of `column` from the rows matching the time window and filters."""
+        if time_column not in TIME_COLUMNS:
+            raise InvalidArchiveQuery(f"Unknown time column {time_column}; choose from {', '.join(TIME_COLUMNS)}")
+        self._refresh_dictionaries()
+        wanted = {}
+        for name, value in (filters or {}).items():
+            if name not in DICTIONARY_COLUMNS:
+                raise InvalidArchiveQuery(f"Cannot filter on {name}; choose from {', '.join(DICTIONARY_COLUMNS)}")
+            code = self.dictionaries[name].code(value)
+            if code is None:
+                return  # Never observed, so nothing matches
+            wanted[name] = code
+        start = _epoch(since) if since is not None else None
+        end = _epoch(until) if until is not None else None
+
+        partitions = self._partitions()
+        if time_column == "observed":
+            # Partitions are months of observation, so the window rules most of them out
+            first = _partition_name(start) if start is not None else ""
+            last = _partition_name(end - 1) if end is not None else "~"
+            partitions = [p for p in partitions if first <= os.path.basename(p) <= last]
+
+        needed = {column, time_column, *wanted}
+        if remote is not None:
+            needed.add("remote")
+        for partition in partitions:
+            rows = self._rows(partition)
+            if rows == 0:
+                continue
+            arrays = {name: np.memmap(self._column_path(partition, name), dtype=COLUMNS[name], mode="r",
+                                      shape=(rows,)) for name in needed}
+            for offset in range(0, rows, SCAN_BLOCK_ROWS):
+                block = slice(offset, offset + SCAN_BLOCK_ROWS)
+                conditions = []
+                if time_column == "posted":
+                    conditions.append(arrays["posted"][block] != NO_TIME)
+                if start is not None:
+                    conditions.append(arrays[time_column][block] >= start)
+                if end is not None:
+                    conditions.append(arrays[time_column][block] < end)
+                for name, code in wanted.items():
+                    conditions.append(arrays[name][block] == code)
+                if remote is not None:
+                    conditions.append(arrays["remote"][block] == int(remote))
+                values = arrays[column][block]
+                yield np.asarray(values[np.logical_and.reduce(conditions)] if conditions else values)
+            del arrays
+
+    def _assign(self, column: str, value: str) -> int:
+        """Code of a value, appending it to the column's dictionary if new (lock held)."""
+        dictionary = self.dictionaries[column]
+        code = dictionary.code(value)
+        return code if code is not None else dictionary.add(value)
+
+    def _refresh_dictionaries(self):
+        for dictionary in self.dictionaries.values():
+            dictionary.refresh()
+
+    def _partitions(self) -> List[str]:
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(entry.path for entry in os.scandir(self.path) if entry.is_dir())
+
+    def _files(self, directory: str) -> List[str]:
+        if not os.path.isdir(directory):
+            return []
+        return [entry.path for entry in os.scandir(directory) if entry.is_file()]
+
+    def _column_path(self, partition: str, column: str) -> str:
+        return os.path.join(partition, f"{column}.{COLUMNS[column].str[1:]}")
+
+    def _rows(self, partition: str) -> int:
+        """Complete rows of a partition: the row count of its shortest column."""
+        rows = None
+        for column, dtype in COLUMNS.items():
+            try:
+                count = os.path.getsize(self._column_path(partition, column)) // dtype.itemsize
+            except FileNotFoundError:
+                count = 0
+            rows = count if rows is None else min(rows, count)
+        return rows
+
+    def _repair(self, partition: str):
+        """Cut every column back to the partition's complete rows (lock held)."""
+        rows = self._rows(partition)
+        for column, dtype in COLUMNS.items():
+            path = self._column_path(partition, column)
+            if os.path.exists(path) and os.path.getsize(path) > rows * dtype.itemsize:
+                os.truncate(path, rows * dtype.itemsize)
+
@@ -0,0 +1,97 @@
+"""
+Compact binary encoding of job listings.
+
+Used wherever listings are stored or passed between processes; the JSON
+API keeps its JSON. Each job is a msgpack array of its field values in
+FIELDS order instead of a map, so field names are not repeated per job, and:
+1. Trailing unset fields are dropped
+2. The URL is left out (nil) when it is the one derived from source and job ID
+3. Well-known sources are written as small integers
+
+Decoding skips pydantic validation: only encode_jobs() produces this data.
+Packed buffers start with FORMAT_VERSION so the layout can change later;
+FIELDS and SOURCES may only be appended to within a version.
+"""
+
+import operator
+from datetime import datetime
+from typing import Iterable, List
+
+import msgpack
+
+from models.job import JOB_URL_PREFIXES, JobListing, job_url
+
+FORMAT_VERSION = 1
+FIELDS = ("title", "company", "location", "url", "source", "job_id", "description",
+          "requirements", "salary_range", "posted_date", "is_remote", "num_applicants")
+SOURCES = ("linkedin",)
+
+_SOURCE_CODES = {source: code for code, source in enumerate(SOURCES)}
+_field_values = operator.itemgetter(*FIELDS)
+_DEFAULTS = {name: field.get_default() for name, field in JobListing.__fields__.items() if not field.required}
+_URL = FIELDS.index("url")
+_SOURCE = FIELDS.index("source")
+_JOB_ID = FIELDS.index("job_id")
+_POSTED_DATE = FIELDS.index("posted_date")
+
+
+def encode_job(job: JobListing) -> list:
+    """Return the compact row of one job."""
+    row = list(_field_values(job.__dict__))
+    source = row[_SOURCE]
+    prefix = JOB_URL_PREFIXES.get(source)
+    if prefix is not None and row[_JOB_ID] and row[_URL] == prefix + row[_JOB_ID]:
+        row[_URL] = None
+    row[_SOURCE] = _SOURCE_CODES.get(source, source)
+    if row[_POSTED_DATE] is not None:
+        row[_POSTED_DATE] = row[_POSTED_DATE].isoformat()
+    while row[-1] is None:
+        row.pop()
+    return row
+
+
+def decode_job(row: list) -> JobListing:
+    """Rebuild a job from its compact row."""
+    values = dict(zip(FIELDS, row))
+    source = values["source"]
+    if type(source) is int:
+        source = values["source"] = SOURCES[source]
+    if values["url"] is None:
+        values["url"] = job_url(source, values.get("job_id"))
+    if values.get("posted_date") is not None:
+        values["posted_date"] = datetime.fromisoformat(values["posted_date"])
+    # What JobListing.construct() does, without its per-field loop
+    job = JobListing.__new__(JobListing)
+    object.__setattr__(job, "__fields_set__", set(values))
+    object.__setattr__(job, "__dict__", {**_DEFAULTS, **values})
+    return job
+
+
+def encode_jobs(jobs: Iterable[JobListing]) -> List[list]:
+    """Return compact rows, to embed in a larger msgpack structure."""
+    return [encode_job(job) for job in jobs]
+
+
+def decode_jobs(rows: Iterable[list]) -> List[JobListing]:
+    return [decode_job(row) for row in rows]
+
+
+def pack_jobs(jobs: Iterable[JobListing]) -> bytes:
+    """Serialize jobs to a self-contained msgpack buffer."""
+    return msgpack.packb([FORMAT_VERSION, encode_jobs(jobs)])
+
+
+def unpack_jobs(data: bytes) -> List[JobListing]:
+    """
+    Deserialize a buffer written by pack_jobs()
+
+    Raises:
+        ValueError: The buffer is malformed or has an unknown format version
+    """
+    try:
+        version, rows = msgpack.unpackb(data)
+    except (msgpack.UnpackException, ValueError, TypeError) as e:
+        raise ValueError(f"Malformed packed jobs: {e}") from e
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported packed jobs format {version}")
+    return decode_jobs(rows)
@@ -0,0 +1,151 @@
+"""
+Inverted index over scraped job listings.
+Used to retrieve a small candidate set before full recommendation scoring.
+
+Terms share the namespaces of the recommendation feature space
+(title:, text:, loc:, place:, remote) plus company:<normalized name>, so a
+profile's feature map can be used directly as a weighted query.
+Postings are appended as jobs arrive; document IDs only ever grow,
+so every posting list stays sorted without a rebuild.
+"""
+
+import math
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from models.job import JobListing
+from services.gazetteer import resolve
+from services.recommender import job_is_remote, tokenize
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def job_terms(job: JobListing) -> Counter:
+    """Return the term frequencies indexed for a job listing."""
+    terms = Counter()
+    terms.update("title:" + token for token in tokenize(job.title))
+    terms.update("text:" + token for token in tokenize(job.description))
+    for requirement in job.requirements or []:
+        terms.update("text:" + token for token in tokenize(requirement))
+    terms.update("loc:" + token for token in tokenize(job.location))
+    place = resolve(job.location)
+    if place is not None and not place.is_remote:
+        terms["place:" + place.place_id] += 1
+    company = " ".join(tokenize(job.company))
+    if company:
+        terms["company:" + company] += 1
+    if job_is_remote(job):
+        terms["remote"] += 1
+    return terms
+
+
+class Posting:
+    """Sorted document IDs containing a term, with per-document term frequencies."""
+
+    __slots__ = ("docs", "tfs")
+
+    def __init__(self):
+        self.docs = array("i")
+        self.tfs = array("f")
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def __contains__(self, doc_id: int) -> bool:
+        i = bisect_left(self.docs, doc_id)
+        return i < len(self.docs) and self.docs[i] == doc_id
+
+
+class JobIndex:
+    """Incrementally updated inverted index with BM25 pre-scoring."""
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self.postings: Dict[str, Posting] = {}
+        self.doc_lengths = array("f")
+        self.total_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, doc_id: int, job: JobListing):
+        """
+        Index a job under the given document ID
+
+        Args:
+            doc_id: Row of the job in the recommendation corpus; must be the next ID
+            job: JobListing to index
+        """
+        if doc_id != len(self.doc_lengths):
+            raise ValueError(f"Expected document ID {len(self.doc_lengths)}, got {doc_id}")
+
+        terms = job_terms(job)
+        for term, tf in terms.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = Posting()
+            posting.docs.append(doc_id)
+            posting.tfs.append(tf)
+
+        length = float(sum(terms.values()))
+        self.doc_lengths.append(length)
+        self.total_length += length
+
+    def intersect(self, terms: Iterable[str]) -> List[int]:
+        """Return the sorted IDs of documents containing every given term."""
+        postings = [self.postings.get(term) for term in terms]
+        if not postings or any(posting is None for posting in postings):
+            return []
+
+        # Walk the shortest list and probe the others
+        postings.sort(key=len)
+        shortest, others = postings[0], postings[1:]
+        return [doc_id for doc_id in shortest.docs if all(doc_id in other for other in others)]
+
+    def search(self, query: Dict[str, float], limit: int,
+               required: Optional[Iterable[str]] = None) -> np.ndarray:
+        """
+        Retrieve the best candidate documents for a weighted query using BM25
+
+        Args:
+            query: Mapping of term to query weight (e.g. a profile feature map)
+            limit: Maximum number of candidates to return
+            required: Terms every candidate must contain
+
+        Returns:
+            Array of document IDs, best first
+        """
+        n_docs = len(self.doc_lengths)
+        if n_docs == 0 or limit <= 0:
+            return np.empty(0, dtype=np.int32)
+
+        doc_lengths = np.frombuffer(self.doc_lengths, dtype=np.float32)
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths / (self.total_length / n_docs))
+        scores = np.zeros(n_docs, dtype=np.float32)
+
+        for term, weight in query.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            df = len(posting)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            docs = np.frombuffer(posting.docs, dtype=np.int32)
+            tfs = np.frombuffer(posting.tfs, dtype=np.float32)
+            scores[docs] += weight * idf * tfs * (BM25_K1 + 1) / (tfs + length_norm[docs])
+
+        if required:
+            allowed = np.asarray(self.intersect(required), dtype=np.int32)
+            mask = np.zeros(n_docs, dtype=bool)
+            mask[allowed] = True
+            scores[~mask] = 0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        return candidates[np.argsort(-scores[candidates], kind="stable")].astype(np.int32)
@@ -0,0 +1,223 @@
+"""
+Process-wide logging setup.
+
+configure_logging() is called once by each entry point (the API, the
+standalone agents, the benchmarks); library modules only create loggers.
+Records are put on a bounded queue by the thread that logs them and written
+by a background listener thread, so a slow stderr never stalls the event
+loop. When the queue is full, new records are dropped and counted rather
+than waited for.
+
+Records are written as one JSON object per line: the message, fields passed
+in `extra`, and the trace ID of the request being served, if any. Levels can
+be set per subsystem by logger name prefix.
+
+Hot paths do not log per event. They count events and log a summary (one
+record per scraped page), and errors that can repeat many times a second go
+through RateLimitedLog.
+"""
+
+import atexit
+import copy
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Union
+
+from services import metrics, tracing
+from services.serialization import dumps
+
+JSON = "json"
+TEXT = "text"
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+DEFAULT_QUEUE_SIZE = 10000
+# Seconds between two records of the same rate-limited event
+DEFAULT_RATE_LIMIT_INTERVAL = 60.0
+
+# Attributes every LogRecord has; any other attribute was passed in `extra`
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+DROPPED = metrics.counter("lume_log_records_dropped", "Log records dropped because the log queue was full")
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[QueueHandler] = None
+_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a single-line JSON object."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        try:
+            return dumps(entry).decode()
+        except TypeError:
+            # An `extra` value the encoder does not know; fall back to its repr
+            return dumps({key: value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)
+                          for key, value in entry.items()}).decode()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener thread, dropping them when the queue is full."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Runs in the logging thread: the arguments may change once the call
+        # returns, and only this thread knows which request is being served
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        span = tracing.current_span()
+        if span is not None:
+            record.trace_id = span.trace.trace_id
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED.inc()
+
+
+class _DrainingQueueListener(QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room instead of failing on a full queue, so stop() flushes everything
+        self.queue.put(self._sentinel)
+
+
+class StderrHandler(logging.StreamHandler):
+    """Writes to whatever sys.stderr is when the record is written."""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+
+class RateLimitedLog:
+    """Logs an event at most once per interval per key, counting the ones suppressed in between."""
+
+    def __init__(self, logger: logging.Logger, interval: float = DEFAULT_RATE_LIMIT_INTERVAL):
+        """
+        Args:
+            logger: Logger the records go to
+            interval: Minimum seconds between two records with the same key
+        """
+        self.logger = logger
+        self.interval = interval
+        self._last: Dict[object, float] = {}
+        self._suppressed: Counter = Counter()
+
+    def log(self, level: int, key, msg: str, *args, **extra):
+        """
+        Log `msg % args` unless an event with this key was logged less than `interval` ago
+
+        The record carries the number of events suppressed since the last one
+        as its `suppressed` field.
+        """
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        last = self._last.get(key)
+        if last is not None and now - last < self.interval:
+            self._suppressed[key] += 1
+            return
+        self._last[key] = now
+        extra["suppressed"] = self._suppressed.pop(key, 0)
+        self.logger.log(level, msg, *args, extra=extra, stacklevel=2)
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """Parse per-logger levels written as "name=LEVEL,name=LEVEL"."""
+    levels = {}
+    for item in spec.split(","):
+        if item.strip():
+            name, _, level = item.partition("=")
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level: Union[int, str, None] = None, levels: Optional[Dict[str, Union[int, str]]] = None,
+                      fmt: Optional[str] = None, queue_size: Optional[int] = None) -> QueueListener:
+    """
+    Route all logging through a queue to a background writer thread
+
+    Only the first call in a process takes effect; later calls return the
+    running listener.
+
+    Args:
+        level: Root level; defaults to LUME_LOG_LEVEL, then INFO
+        levels: Levels by logger name, e.g. {"agents.job_scraper_agent": "WARNING"};
+            defaults to LUME_LOG_LEVELS ("name=LEVEL,...")
+        fmt: "json" or "text"; defaults to LUME_LOG_FORMAT, then json
+        queue_size: Records waiting to be written before new ones are dropped;
+            defaults to LUME_LOG_QUEUE_SIZE
+
+    Returns:
+        The listener writing the records
+    """
+    global _listener, _handler
+    with _lock:
+        if _listener is not None:
+            return _listener
+
+        level = level or os.getenv("LUME_LOG_LEVEL", "INFO").upper()
+        levels = parse_levels(os.getenv("LUME_LOG_LEVELS", "")) if levels is None else levels
+        fmt = fmt or os.getenv("LUME_LOG_FORMAT", JSON)
+        queue_size = queue_size or int(os.getenv("LUME_LOG_QUEUE_SIZE", str(DEFAULT_QUEUE_SIZE)))
+
+        writer = StderrHandler()
+        writer.setFormatter(JsonFormatter() if fmt == JSON else logging.Formatter(TEXT_FORMAT))
+        records = queue.Queue(queue_size)
+        _handler = NonBlockingQueueHandler(records)
+        root = logging.getLogger()
+        # Replace the direct stderr handler logging.basicConfig installs (uagents
+        # calls it on import); other handlers, such as pytest's, stay
+        for handler in root.handlers[:]:
+            if type(handler) is logging.StreamHandler:
+                root.removeHandler(handler)
+        root.addHandler(_handler)
+        root.setLevel(level)
+        for name, logger_level in levels.items():
+            logging.getLogger(name).setLevel(logger_level)
+
+        _listener = _DrainingQueueListener(records, writer)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _listener
+
+
+def shutdown_logging():
+    """Write out the queued records and detach the queue handler."""
+    global _listener, _handler
+    with _lock:
+        if _listener is None:
+            return
+        logging.getLogger().removeHandler(_handler)
+        _listener.stop()
+        _listener = _handler = None
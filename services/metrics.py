@@ -0,0 +1,237 @@
+"""
+In-process metrics, exposed in the Prometheus text format.
+
+Recording is kept as cheap as possible: counters and histograms are plain
+numbers updated in place (a histogram observation is one bisect), and label
+sets are bound once, at import time, wherever the label values are known.
+Nothing is formatted until the registry is rendered, so metrics cost almost
+nothing while nobody scrapes /metrics. State that other components already
+track (cache hit counts, queue lengths) is read by collectors at render time
+rather than counted twice.
+"""
+
+import asyncio
+import functools
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds, in seconds, suited to request and I/O latencies
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Upper bounds, in seconds, suited to batch runs
+RUN_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+# A collected sample: metric name suffix, labels, value
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class _Metric:
+    """A metric family: one child per combination of label values."""
+
+    kind = ""
+    suffix = ""  # Appended to the name in the exposition
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children: Dict[Tuple[str, ...], object] = {}
+        # Unlabelled metrics are recorded on directly
+        self._default = self.labels() if not self.labelnames else None
+
+    def labels(self, *values: str):
+        """Return the child for these label values, creating it on first use."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+        key = tuple(str(value) for value in values)
+        child = self.children.get(key)
+        if child is None:
+            child = self.children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+    suffix = "_total"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def samples(self) -> Iterable[Sample]:
+        for key, child in self.children.items():
+            yield "", dict(zip(self.labelnames, key)), child.value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def samples(self) -> Iterable[Sample]:
+        for key, child in self.children.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), child.counts):
+                cumulative += count
+                yield "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield "_count", labels, cumulative
+            yield "_sum", labels, child.sum
+
+
+class Registry:
+    """Metrics and collectors rendered together on /metrics."""
+
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+        # name -> (kind, documentation, function returning (labels, value) pairs)
+        self.collectors: Dict[str, Tuple[str, str, Callable[[], Iterable[Tuple[Dict[str, str], float]]]]] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Return the counter with this name, creating it if needed. `name` excludes the _total suffix."""
+        return self._get_or_add(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        """Return the histogram with this name, creating it if needed."""
+        return self._get_or_add(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def collector(self, name: str, kind: str, documentation: str,
+                  collect: Callable[[], Iterable[Tuple[Dict[str, str], float]]]):
+        """
+        Register a metric whose values are read when the registry is rendered
+
+        Args:
+            name: Full metric name (counters include the _total suffix)
+            kind: "counter" or "gauge"
+            documentation: HELP text
+            collect: Returns (labels, value) pairs
+        """
+        self.collectors[name] = (kind, documentation, collect)
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in self.metrics.values():
+            family = metric.name + metric.suffix
+            lines.append(f"# HELP {family} {metric.documentation}")
+            lines.append(f"# TYPE {family} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{family}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        for name, (kind, documentation, collect) in self.collectors.items():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in collect():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _get_or_add(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = cls(name, documentation, labelnames, **kwargs)
+        elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+            raise ValueError(f"Metric {name} is already registered with a different type or labels")
+        return metric
+
+
+# Process-wide registry served on /metrics
+REGISTRY = Registry()
+counter = REGISTRY.counter
+histogram = REGISTRY.histogram
+collector = REGISTRY.collector
+
+
+def timed(histogram):
+    """Decorate a function or coroutine function to observe its duration on a histogram (or histogram child)."""
+    def decorate(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - started)
+            return async_wrapper
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+def hit_ratio_samples(caches: Dict[str, Tuple[int, int]]) -> Iterable[Tuple[Dict[str, str], float]]:
+    """Turn {cache: (hits, misses)} into hit-ratio gauge samples, skipping unused caches."""
+    for name, (hits, misses) in caches.items():
+        if hits + misses:
+            yield {"cache": name}, hits / (hits + misses)
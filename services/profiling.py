@@ -0,0 +1,284 @@
+"""
+Profiling that can be switched on in a running process.
+
+A capture is armed through the admin API and records one of:
+1. The next N requests, with the deterministic profiler (cProfile)
+2. The next daily scraping run, with the deterministic profiler
+3. A time window, with a sampling profiler only
+
+While a capture records, a sampler thread also reads every thread's stack
+at a fixed interval and counts identical stacks, so each capture can be
+downloaded as collapsed stacks (the input format of flamegraph.pl and
+speedscope). Deterministic captures can also be downloaded as pstats.
+
+cProfile sees only the thread that enabled it, and it sees everything that
+thread runs: a profiled request's profile includes whatever else the event
+loop did meanwhile, and work handed to executor threads (such as batch
+re-ranking) shows up only in the sampled stacks. Nothing is recorded while
+no capture is armed; the request path then costs one attribute check.
+"""
+
+import cProfile
+import functools
+import itertools
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+REQUESTS = "requests"
+SCHEDULER_RUN = "scheduler_run"
+SAMPLING = "sampling"
+
+ARMED = "armed"
+RUNNING = "running"
+DONE = "done"
+
+DEFAULT_SAMPLE_INTERVAL = 0.01
+MAX_SAMPLE_SECONDS = 600
+MAX_PROFILED_REQUESTS = 1000
+# Finished captures kept for download; older ones are dropped
+MAX_CAPTURES = 8
+
+
+class ProfilerBusy(Exception):
+    """Raised when a capture is requested while another one is armed or running."""
+
+
+class Capture:
+    """One profiling session and its results."""
+
+    def __init__(self, capture_id: int, kind: str, target: int = 0):
+        self.capture_id = capture_id
+        self.kind = kind
+        self.status = ARMED
+        self.target = target  # Requests to profile, for request captures
+        self.completed = 0
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.profile = cProfile.Profile() if kind != SAMPLING else None
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+    def summary(self) -> Dict:
+        return {
+            "capture_id": self.capture_id,
+            "kind": self.kind,
+            "status": self.status,
+            "target": self.target,
+            "completed": self.completed,
+            "samples": self.samples,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "formats": ["collapsed"] + (["pstats"] if self.profile is not None else []),
+        }
+
+    def pstats_bytes(self) -> bytes:
+        """Return the deterministic profile in the file format pstats.Stats loads (finished captures only)."""
+        stats = pstats.Stats(self.profile)
+        return marshal.dumps(stats.stats)
+
+    def collapsed(self) -> str:
+        """Return the sampled stacks as collapsed-stack lines: frame;frame;frame count (finished captures only)"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class _Sampler(threading.Thread):
+    """Counts the stacks of every other thread at a fixed interval."""
+
+    def __init__(self, capture: Capture, interval: float, deadline: Optional[float]):
+        super().__init__(name="profiling-sampler", daemon=True)
+        self.capture = capture
+        self.interval = interval
+        self.deadline = deadline
+        self.paused = False
+        self.stopped = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        names: Dict[int, str] = {}
+        while not self.stopped.is_set():
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                break
+            if not self.paused:
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    if ident not in names:
+                        names = {thread.ident: thread.name for thread in threading.enumerate()}
+                    self.capture.stacks[_collapse(names.get(ident, str(ident)), frame)] += 1
+                self.capture.samples += 1
+            self.stopped.wait(self.interval)
+
+
+def _collapse(thread_name: str, frame) -> str:
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    frames.append(thread_name)
+    # Collapsed stacks end with " count", so frames cannot contain spaces
+    return ";".join(reversed(frames)).replace(" ", "_")
+
+
+class ProfilingHooks:
+    """Arms captures and records them around requests and scheduler runs."""
+
+    def __init__(self, sample_interval: float = DEFAULT_SAMPLE_INTERVAL):
+        """
+        Args:
+            sample_interval: Seconds between stack samples
+        """
+        self.sample_interval = sample_interval
+        self.captures: Dict[int, Capture] = {}
+        self.current: Optional[Capture] = None  # Armed or running capture
+        self.requests_armed = False  # Checked on every request, so kept as a plain flag
+        self._ids = itertools.count(1)
+        self._in_flight = 0  # Profiled requests currently running
+        self._sampler: Optional[_Sampler] = None
+        self._lock = threading.Lock()
+
+    def arm_requests(self, count: int) -> Capture:
+        """Profile the next `count` requests."""
+        if not 1 <= count <= MAX_PROFILED_REQUESTS:
+            raise ValueError(f"count must be between 1 and {MAX_PROFILED_REQUESTS}")
+        capture = self._arm(REQUESTS, count)
+        self.requests_armed = True
+        return capture
+
+    def arm_scheduler_run(self) -> Capture:
+        """Profile the next daily scraping run."""
+        return self._arm(SCHEDULER_RUN)
+
+    def start_sampling(self, seconds: float, interval: Optional[float] = None) -> Capture:
+        """Sample every thread's stack for the next `seconds`, without the deterministic profiler."""
+        if not 0 < seconds <= MAX_SAMPLE_SECONDS:
+            raise ValueError(f"seconds must be between 0 and {MAX_SAMPLE_SECONDS}")
+        capture = self._arm(SAMPLING)
+        capture.status, capture.started = RUNNING, time.time()
+        self._sampler = _Sampler(capture, interval or self.sample_interval, time.monotonic() + seconds)
+        self._sampler.start()
+        threading.Thread(target=self._finish_sampling, args=(capture, self._sampler), daemon=True).start()
+        return capture
+
+    def stop(self) -> Optional[Capture]:
+        """Finish the current capture early. Returns it, or None if there was none."""
+        with self._lock:
+            capture = self.current
+            if capture is None:
+                return None
+            if capture.kind == SAMPLING:
+                self._sampler.stopped.set()
+            else:
+                self._finish(capture)
+            return capture
+
+    def get(self, capture_id: int) -> Optional[Capture]:
+        return self.captures.get(capture_id)
+
+    @contextmanager
+    def request(self) -> Iterator[None]:
+        """Profile the enclosed request if request profiling is armed."""
+        capture = self.current
+        if not self.requests_armed or capture is None or capture.kind != REQUESTS:
+            yield
+            return
+        with self._lock:
+            # Every remaining slot may already be taken by requests still running
+            profiled = capture.status != DONE and capture.completed + self._in_flight < capture.target
+            if profiled:
+                self._enter(capture)
+        if not profiled:
+            yield
+            return
+        try:
+            yield
+        finally:
+            with self._lock:
+                if capture.status != DONE:  # Not stopped meanwhile
+                    capture.completed += 1
+                    self._exit(capture)
+                    if capture.completed >= capture.target:
+                        self._finish(capture)
+
+    def scheduler_run(self, func):
+        """Decorate the daily scraping coroutine so an armed run is profiled."""
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            capture = self.current
+            if capture is None or capture.kind != SCHEDULER_RUN or capture.status != ARMED:
+                return await func(*args, **kwargs)
+            with self._lock:
+                self._enter(capture)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    if capture.status != DONE:
+                        capture.completed = 1
+                        self._exit(capture)
+                        self._finish(capture)
+        return wrapper
+
+    def _arm(self, kind: str, target: int = 0) -> Capture:
+        with self._lock:
+            if self.current is not None:
+                raise ProfilerBusy(f"Capture {self.current.capture_id} is {self.current.status}")
+            capture = Capture(next(self._ids), kind, target)
+            self.captures[capture.capture_id] = capture
+            self.current = capture
+            finished = [c for c in self.captures.values() if c.status == DONE]
+            for old in finished[:max(0, len(finished) - MAX_CAPTURES + 1)]:
+                del self.captures[old.capture_id]
+            return capture
+
+    def _enter(self, capture: Capture):
+        if capture.status == ARMED:
+            capture.status, capture.started = RUNNING, time.time()
+            self._sampler = _Sampler(capture, self.sample_interval, None)
+            self._sampler.start()
+        if self._in_flight == 0:
+            self._sampler.paused = False
+            capture.profile.enable()
+        self._in_flight += 1
+
+    def _exit(self, capture: Capture):
+        self._in_flight -= 1
+        if self._in_flight == 0:
+            capture.profile.disable()
+            self._sampler.paused = True
+
+    def _finish(self, capture: Capture):
+        if capture.status == DONE:
+            return
+        if self._in_flight:
+            capture.profile.disable()
+            self._in_flight = 0
+        if self._sampler is not None:
+            self._sampler.stopped.set()
+            self._sampler = None
+        capture.status, capture.finished = DONE, time.time()
+        self.requests_armed = False
+        if self.current is capture:
+            self.current = None
+
+    def _finish_sampling(self, capture: Capture, sampler: _Sampler):
+        sampler.join()
+        with self._lock:
+            capture.status, capture.finished = DONE, time.time()
+            if self.current is capture:
+                self.current = None
+            if self._sampler is sampler:
+                self._sampler = None
+
+
+# Process-wide hooks driven by the admin API
+PROFILER = ProfilingHooks()
@@ -0,0 +1,132 @@
+"""
+Materialized per-user recommendations with precise invalidation.
+
+Each entry holds a user's top-N ranked jobs plus the feature map they were
+scored with. A reverse index from feature terms to users lets new jobs be
+offered only to the users whose terms they share; a new job is merged into
+an entry directly when it beats the entry's lowest score, so no re-rank is
+needed. Profile changes that affect ranking drop the entry and mark the
+user dirty for background recomputation.
+"""
+
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from models.job import JobListing
+from services.recommender import job_features, profile_features
+
+# Profile fields that feed the recommendation feature space
+RECOMMENDATION_FIELDS = frozenset({
+    "skills",
+    "preferred_roles",
+    "preferred_locations",
+    "remote_preference",
+})
+
+
+class CacheEntry:
+    """Top-N ranked jobs for one user, best first."""
+
+    __slots__ = ("timestamp", "features", "jobs", "scores")
+
+    def __init__(self, features: Dict[str, float], ranked: List[Tuple[JobListing, float]]):
+        self.timestamp = datetime.now().isoformat()
+        self.features = features
+        self.jobs = [job for job, _ in ranked]
+        self.scores = [score for _, score in ranked]
+
+    def offer(self, job: JobListing, score: float, size: int) -> bool:
+        """Merge a newly seen job into the ranking if it makes the top-N. Returns whether it did."""
+        if score <= 0 or (len(self.scores) >= size and score <= self.scores[-1]):
+            return False
+        # Scores are descending; search on negated scores to find the slot
+        position = bisect_right([-s for s in self.scores], -score)
+        self.jobs.insert(position, job)
+        self.scores.insert(position, score)
+        del self.jobs[size:], self.scores[size:]
+        self.timestamp = datetime.now().isoformat()
+        return True
+
+
+class RecommendationCache:
+    """Per-user top-N recommendations kept up to date incrementally."""
+
+    def __init__(self, size: int):
+        """
+        Args:
+            size: Number of recommendations materialized per user
+        """
+        self.size = size
+        self.entries: Dict[str, CacheEntry] = {}
+        self.term_users: Dict[str, Set[str]] = {}
+        self.dirty: Set[str] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, user_id: str) -> Optional[CacheEntry]:
+        """Return the cached entry for a user, or None if missing or invalidated."""
+        entry = self.entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def store(self, user_id: str, profile: dict, ranked: List[Tuple[JobListing, float]]) -> CacheEntry:
+        """Store a freshly computed ranking for a user."""
+        self._drop(user_id)
+        entry = CacheEntry(profile_features(profile), ranked[:self.size])
+        self.entries[user_id] = entry
+        for term in entry.features:
+            self.term_users.setdefault(term, set()).add(user_id)
+        self.dirty.discard(user_id)
+        return entry
+
+    def invalidate(self, user_id: str, changed_fields: Optional[Iterable[str]] = None):
+        """
+        Invalidate a user's entry after a profile change
+
+        Args:
+            user_id: User whose profile changed
+            changed_fields: Fields that changed, or None if unknown (always invalidates)
+        """
+        if changed_fields is not None and RECOMMENDATION_FIELDS.isdisjoint(changed_fields):
+            return
+        self._drop(user_id)
+        self.dirty.add(user_id)
+
+    def add_jobs(self, jobs: Iterable[JobListing]) -> int:
+        """Offer new jobs to every cached user sharing a term with them. Returns the number of entries changed."""
+        changed = 0
+        for job in jobs:
+            features = job_features(job)
+            users = set()
+            for term in features:
+                users.update(self.term_users.get(term, ()))
+            for user_id in users:
+                entry = self.entries[user_id]
+                score = sum(weight * entry.features.get(term, 0.0) for term, weight in features.items())
+                if entry.offer(job, score, self.size):
+                    changed += 1
+        return changed
+
+    def pop_dirty(self) -> List[str]:
+        """Return and clear the users waiting for recomputation."""
+        dirty = list(self.dirty)
+        self.dirty.clear()
+        return dirty
+
+    def _drop(self, user_id: str):
+        entry = self.entries.pop(user_id, None)
+        if entry is None:
+            return
+        for term in entry.features:
+            users = self.term_users.get(term)
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    del self.term_users[term]
@@ -0,0 +1,334 @@
+"""
+Job recommendation engine for the Lume application.
+Scores JobListings against user profiles using sparse feature vectors.
+
+Jobs and profiles are projected into a shared, namespaced feature space:
+- title:<token>  job title tokens / user role and skill tokens
+- text:<token>   job description and requirement tokens / user skill tokens
+- loc:<token>    job location tokens / user preferred location tokens
+- place:<id>     gazetteer place of the job / user preferred places
+- remote         remote job / user prefers remote
+
+The job corpus is kept as a CSR matrix so scoring a user is a single
+sparse matrix-vector product followed by a partial sort. Scoring many users
+at once multiplies blocks of a sparse user-feature matrix against the
+transposed job matrix, optionally across worker processes.
+
+The corpus itself is only changed on the event loop. Batch scoring that
+runs elsewhere works on a CorpusSnapshot taken there.
+"""
+
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from models.compact_profile import Vocabulary
+from models.job import JobListing
+from services.gazetteer import resolve
+
+# Weights applied to user features; job features are unit-normalized per namespace
+ROLE_WEIGHT = 3.0
+SKILL_TITLE_WEIGHT = 1.5
+SKILL_TEXT_WEIGHT = 1.0
+LOCATION_WEIGHT = 2.0
+PLACE_WEIGHT = 2.0
+REMOTE_WEIGHT = 1.0
+
+# Users scored per sparse matrix product in batch mode. Peak memory per block
+# is roughly BATCH_BLOCK_SIZE * number of jobs * 8 bytes in the worst case.
+BATCH_BLOCK_SIZE = 256
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "at", "for", "in", "of", "on", "or", "the", "to", "with",
+})
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#]+(?:\.[a-z0-9]+)*")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split free text into lowercase tokens, dropping stopwords."""
+    if not text:
+        return []
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def job_key(job: JobListing) -> Tuple[str, str]:
+    """Return the identity of a job posting across scrapes."""
+    return (job.source, job.job_id or job.url)
+
+
+def job_is_remote(job: JobListing) -> bool:
+    """Whether a job is remote, falling back to its location text."""
+    if job.is_remote is not None:
+        return job.is_remote
+    place = resolve(job.location)
+    return place is not None and place.is_remote
+
+
+def job_features(job: JobListing) -> Dict[str, float]:
+    """Build the sparse feature map for a job listing."""
+    features: Dict[str, float] = {}
+
+    def add_namespace(prefix: str, tokens: List[str]):
+        unique = set(tokens)
+        if not unique:
+            return
+        weight = 1.0 / np.sqrt(len(unique))
+        for token in unique:
+            features[prefix + token] = weight
+
+    add_namespace("title:", tokenize(job.title))
+    text_tokens = tokenize(job.description)
+    for requirement in job.requirements or []:
+        text_tokens.extend(tokenize(requirement))
+    add_namespace("text:", text_tokens)
+    add_namespace("loc:", tokenize(job.location))
+    place = resolve(job.location)
+    if place is not None and not place.is_remote:
+        features["place:" + place.place_id] = 1.0
+    if job_is_remote(job):
+        features["remote"] = 1.0
+    return features
+
+
+def profile_features(profile: dict) -> Dict[str, float]:
+    """Build the sparse feature map for a user profile dict."""
+    features: Dict[str, float] = {}
+
+    def add(name: str, weight: float):
+        features[name] = features.get(name, 0.0) + weight
+
+    for role in profile.get("preferred_roles", []):
+        for token in tokenize(role):
+            add("title:" + token, ROLE_WEIGHT)
+    for skill in profile.get("skills", []):
+        for token in tokenize(skill):
+            add("title:" + token, SKILL_TITLE_WEIGHT)
+            add("text:" + token, SKILL_TEXT_WEIGHT)
+    for location in profile.get("preferred_locations", []):
+        for token in tokenize(location):
+            add("loc:" + token, LOCATION_WEIGHT)
+        place = resolve(location)
+        if place is not None and not place.is_remote:
+            features["place:" + place.place_id] = PLACE_WEIGHT
+    if profile.get("remote_preference"):
+        add("remote", REMOTE_WEIGHT)
+        add("loc:remote", LOCATION_WEIGHT)
+    return features
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Return indices of the k highest positive scores, best first."""
+    positive = np.flatnonzero(scores > 0)
+    if len(positive) > k:
+        positive = positive[np.argpartition(-scores[positive], k - 1)[:k]]
+    return positive[np.argsort(-scores[positive], kind="stable")]
+
+
+def _score_block(users: sparse.csr_matrix, jobs_t: sparse.csr_matrix,
+                 k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Score a block of users against all jobs, returning (job rows, scores) per user."""
+    scores = users @ jobs_t
+    results = []
+    for i in range(scores.shape[0]):
+        start, end = scores.indptr[i], scores.indptr[i + 1]
+        data = scores.data[start:end]
+        best = top_k(data, k)
+        results.append((scores.indices[start:end][best], data[best]))
+    return results
+
+
+# Transposed job matrix held by each batch worker process
+_worker_jobs_t = None
+
+
+def _init_batch_worker(jobs_t: sparse.csr_matrix):
+    global _worker_jobs_t
+    _worker_jobs_t = jobs_t
+
+
+def _score_block_in_worker(args: Tuple[sparse.csr_matrix, int]) -> List[Tuple[np.ndarray, np.ndarray]]:
+    users, k = args
+    return _score_block(users, _worker_jobs_t, k)
+
+
+class CorpusSnapshot:
+    """
+    The job matrix and jobs as of one moment, for scoring on another thread.
+
+    The matrix and job list are never modified in place, so later additions
+    to the corpus do not affect a snapshot; the feature vocabulary only
+    grows, and features added after the snapshot are ignored.
+    """
+
+    def __init__(self, matrix: sparse.csr_matrix, jobs: Tuple[JobListing, ...], features: Vocabulary):
+        self.matrix = matrix
+        self.jobs = jobs
+        self.features = features
+        self.n_features = matrix.shape[1]
+
+    def profile_matrix(self, profiles: List[dict]) -> sparse.csr_matrix:
+        """Project many profiles into the snapshot's feature space as a sparse user-feature matrix."""
+        indptr = [0]
+        indices = []
+        data = []
+        for profile in profiles:
+            for name, weight in profile_features(profile).items():
+                feature_id = self.features.lookup(name)
+                if feature_id is not None and feature_id < self.n_features:
+                    indices.append(feature_id)
+                    data.append(weight)
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), indptr),
+            shape=(len(profiles), self.n_features)
+        )
+
+    def recommend_batch(self, profiles: List[dict], k: int, block_size: int = BATCH_BLOCK_SIZE,
+                        workers: int = 1) -> List[List[Tuple[JobListing, float]]]:
+        """
+        Return the top-k jobs for many profiles at once
+
+        Args:
+            profiles: Profile dicts to score
+            k: Number of jobs to return per profile
+            block_size: Number of profiles per sparse matrix product
+            workers: Number of processes to spread blocks over
+
+        Returns:
+            One list of (job, score) pairs per profile, in input order
+        """
+        if k <= 0 or not self.jobs or not profiles:
+            return [[] for _ in profiles]
+
+        jobs_t = self.matrix.T.tocsr()
+        users = self.profile_matrix(profiles)
+        blocks = [users[start:start + block_size] for start in range(0, users.shape[0], block_size)]
+
+        if workers > 1 and len(blocks) > 1:
+            # Forking a process that runs other threads can leave the children
+            # holding locks nobody will release, so workers come from a fork server
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+                initializer=_init_batch_worker,
+                initargs=(jobs_t,)
+            ) as pool:
+                block_results = list(pool.map(_score_block_in_worker, [(block, k) for block in blocks]))
+        else:
+            block_results = [_score_block(block, jobs_t, k) for block in blocks]
+
+        jobs = self.jobs
+        return [
+            [(jobs[row], float(score)) for row, score in zip(rows, scores)]
+            for results in block_results
+            for rows, scores in results
+        ]
+
+
+class JobRecommender:
+    """
+    Incrementally built job corpus with vectorized scoring.
+
+    New jobs are buffered and appended to the CSR matrix lazily on the
+    next scoring call, so ingest stays cheap.
+    """
+
+    def __init__(self):
+        """Initialize an empty corpus."""
+        self.features = Vocabulary("features")
+        self.jobs: List[JobListing] = []
+        self.job_rows: Dict[Tuple[str, str], int] = {}
+        self._matrix = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._pending: List[Dict[str, float]] = []
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    def add_jobs(self, jobs: Iterable[JobListing]) -> int:
+        """Add jobs to the corpus, skipping ones already known. Returns the number added."""
+        added = 0
+        for job in jobs:
+            key = job_key(job)
+            if key in self.job_rows:
+                continue
+            self.job_rows[key] = len(self.jobs)
+            self.jobs.append(job)
+            self._pending.append(job_features(job))
+            added += 1
+        return added
+
+    @property
+    def matrix(self) -> sparse.csr_matrix:
+        """The job-feature matrix, including any buffered jobs."""
+        if self._pending:
+            indptr = [0]
+            indices = []
+            data = []
+            for features in self._pending:
+                for name, weight in features.items():
+                    indices.append(self.features.id_for(name))
+                    data.append(weight)
+                indptr.append(len(indices))
+            n_features = len(self.features)
+            block = sparse.csr_matrix(
+                (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), indptr),
+                shape=(len(self._pending), n_features)
+            )
+            # A new matrix rather than resize(), which would change snapshots sharing the old one
+            matrix = self._matrix
+            matrix = sparse.csr_matrix((matrix.data, matrix.indices, matrix.indptr),
+                                       shape=(matrix.shape[0], n_features))
+            self._matrix = sparse.vstack([matrix, block], format="csr")
+            self._pending = []
+        return self._matrix
+
+    def profile_vector(self, profile: dict) -> np.ndarray:
+        """Project a profile into the corpus feature space as a dense vector."""
+        vector = np.zeros(len(self.features), dtype=np.float32)
+        for name, weight in profile_features(profile).items():
+            feature_id = self.features.lookup(name)
+            if feature_id is not None:
+                vector[feature_id] = weight
+        return vector
+
+    def score(self, profile: dict, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Score every job (or only the given rows) against a profile."""
+        matrix = self.matrix
+        if rows is not None:
+            matrix = matrix[rows]
+        return matrix @ self.profile_vector(profile)
+
+    def recommend(self, profile: dict, k: int,
+                  rows: Optional[np.ndarray] = None) -> List[Tuple[JobListing, float]]:
+        """Return the top-k jobs for a profile with their scores."""
+        if k <= 0 or not self.jobs:
+            return []
+        scores = self.score(profile, rows)
+        best = top_k(scores, k)
+        if rows is not None:
+            return [(self.jobs[rows[i]], float(scores[i])) for i in best]
+        return [(self.jobs[i], float(scores[i])) for i in best]
+
+    def snapshot(self) -> CorpusSnapshot:
+        """Capture the corpus, including buffered jobs, for scoring on another thread."""
+        return CorpusSnapshot(self.matrix, tuple(self.jobs), self.features)
+
+    def recommend_batch(self, profiles: List[dict], k: int, block_size: int = BATCH_BLOCK_SIZE,
+                        workers: int = 1) -> List[List[Tuple[JobListing, float]]]:
+        """Return the top-k jobs for many profiles at once; see CorpusSnapshot.recommend_batch."""
+        return self.snapshot().recommend_batch(profiles, k, block_size=block_size, workers=workers)
+
+    def rank(self, profile: dict, jobs: List[JobListing]) -> List[Tuple[JobListing, float]]:
+        """Rank an arbitrary list of jobs (not necessarily in the corpus) for a profile."""
+        user = profile_features(profile)
+        scored = [
+            (job, float(sum(weight * user.get(name, 0.0) for name, weight in job_features(job).items())))
+            for job in jobs
+        ]
+        scored.sort(key=lambda pair: pair[1], reverse=True)
+        return scored
@@ -0,0 +1,164 @@
+"""
+Chunked result streaming between agents.
+
+A large result set is sent as a series of JobChunk messages instead of one
+AgentResponse. Each chunk is bounded in job count and encoded size, and
+carries a sequence number; the last one is marked final and says where the
+next page starts. The receiver acknowledges chunks with JobChunkAck once it
+has processed them, and the sender keeps at most `window` unacknowledged
+chunks outstanding, so a slow receiver holds the sender back instead of
+being flooded. An ack can also cancel the stream.
+
+Jobs travel as JSON objects by default. With the msgpack encoding, a
+chunk's jobs are packed with services.job_codec instead, which is several
+times smaller even after base64.
+
+The sender side is chunk_jobs(), chunk_payload() and CreditWindow;
+ChunkAssembler is the receiver side.
+"""
+
+import asyncio
+import base64
+from typing import AsyncIterator, Dict, List, Optional
+
+from models.job import JobListing
+from models.messages import JobChunk, JobChunkAck
+from services.job_codec import pack_jobs, unpack_jobs
+from services.serialization import dumps
+
+JSON_ENCODING = "json"
+PACKED_ENCODING = "msgpack"
+ENCODINGS = (JSON_ENCODING, PACKED_ENCODING)
+
+# Upper bounds for one chunk; a single job larger than MAX_CHUNK_BYTES is sent on its own
+MAX_CHUNK_JOBS = 50
+MAX_CHUNK_BYTES = 64 * 1024
+# Unacknowledged chunks a sender may have outstanding, unless the request asks for fewer
+DEFAULT_WINDOW = 4
+MAX_WINDOW = 32
+# Seconds a sender waits for an ack before abandoning the stream
+ACK_TIMEOUT = 30
+
+
+class StreamCancelled(Exception):
+    """Raised to the sender when the receiver cancelled the stream or stopped acknowledging."""
+
+
+async def chunk_jobs(jobs: AsyncIterator[JobListing], max_jobs: int = MAX_CHUNK_JOBS,
+                     max_bytes: int = MAX_CHUNK_BYTES) -> AsyncIterator[List[JobListing]]:
+    """
+    Group jobs into chunks of at most `max_jobs` jobs and about `max_bytes` encoded bytes
+
+    Args:
+        jobs: Jobs in the order they should be delivered
+        max_jobs: Most jobs per chunk
+        max_bytes: Most encoded bytes of job data per chunk
+
+    Yields:
+        Non-empty lists of jobs
+    """
+    chunk: List[JobListing] = []
+    size = 0
+    async for job in jobs:
+        job_size = len(dumps(job))
+        if chunk and (len(chunk) >= max_jobs or size + job_size > max_bytes):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(job)
+        size += job_size
+    if chunk:
+        yield chunk
+
+
+def chunk_payload(jobs: List[JobListing], encoding: str = JSON_ENCODING) -> Dict:
+    """Return the JobChunk fields carrying jobs in the requested encoding."""
+    if encoding == PACKED_ENCODING:
+        return {"packed": base64.b64encode(pack_jobs(jobs)).decode("ascii")}
+    return {"jobs": jobs}
+
+
+def chunk_listings(chunk: JobChunk) -> List[JobListing]:
+    """Return the jobs of a chunk, whichever encoding carried them."""
+    if chunk.packed is not None:
+        return unpack_jobs(base64.b64decode(chunk.packed))
+    return chunk.jobs
+
+
+class CreditWindow:
+    """Sender-side flow control: how many chunks may be sent before the receiver acknowledges them."""
+
+    def __init__(self, window: int = DEFAULT_WINDOW, timeout: float = ACK_TIMEOUT):
+        """
+        Args:
+            window: Chunks that may be outstanding at once
+            timeout: Seconds to wait for an ack that would free a slot
+        """
+        self.window = max(1, min(window, MAX_WINDOW))
+        self.timeout = timeout
+        self.acked = -1  # Highest sequence number acknowledged
+        self.cancelled = False
+        self._changed = asyncio.Event()
+
+    def ack(self, sequence: int, cancel: bool = False):
+        """Record that the receiver processed every chunk up to `sequence`, or wants no more."""
+        self.acked = max(self.acked, sequence)
+        self.cancelled = self.cancelled or cancel
+        self._changed.set()
+
+    async def wait_to_send(self, sequence: int):
+        """
+        Wait until chunk `sequence` may be sent
+
+        Raises:
+            StreamCancelled: The receiver cancelled, or sent no ack within the timeout
+        """
+        while not self.cancelled and sequence > self.acked + self.window:
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), self.timeout)
+            except asyncio.TimeoutError:
+                raise StreamCancelled(f"No ack for chunk {self.acked + 1} within {self.timeout}s")
+        if self.cancelled:
+            raise StreamCancelled("Cancelled by the receiver")
+
+
+class ChunkAssembler:
+    """Receiver side: puts chunks back in order and decides what to acknowledge."""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.jobs: List[JobListing] = []
+        self.next_sequence = 0
+        self.final: Optional[JobChunk] = None
+        self._pending: Dict[int, JobChunk] = {}
+
+    @property
+    def complete(self) -> bool:
+        """Whether the final chunk and everything before it have arrived."""
+        return self.final is not None
+
+    def add(self, chunk: JobChunk) -> List[JobListing]:
+        """
+        Accept a chunk, in any order; duplicates are ignored
+
+        Returns:
+            Jobs that became available in order because of this chunk
+        """
+        if chunk.request_id != self.request_id or chunk.sequence < self.next_sequence:
+            return []
+        self._pending[chunk.sequence] = chunk
+        ready: List[JobListing] = []
+        while self.next_sequence in self._pending:
+            current = self._pending.pop(self.next_sequence)
+            ready.extend(chunk_listings(current))
+            self.next_sequence += 1
+            if current.final:
+                self.final = current
+        self.jobs.extend(ready)
+        return ready
+
+    def ack(self, cancel: bool = False) -> Optional[JobChunkAck]:
+        """The ack for everything received in order so far; send it once those jobs are processed."""
+        if self.next_sequence == 0 and not cancel:
+            return None
+        return JobChunkAck(request_id=self.request_id, sequence=self.next_sequence - 1, cancel=cancel)
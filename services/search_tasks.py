@@ -0,0 +1,203 @@
+"""
+Background job searches addressed by ticket ID.
+
+A search is submitted as a factory for an async iterator of job listings
+(e.g. the scraper's iter_linkedin) and runs in a bounded pool of asyncio
+tasks, so a slow upstream never holds an API worker. Results accumulate on
+the task as they are scraped; clients poll them by ID or subscribe to an
+event stream that replays what was already found and then follows the
+search to completion. Finished searches are kept for a TTL and then dropped.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from models.job import JobListing
+from services.admission import QUEUE_FULL, Overloaded
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENT_SEARCHES = 4
+# Searches allowed to wait for a slot; further submissions are rejected
+MAX_PENDING_SEARCHES = 32
+RESULT_TTL_SECONDS = 600
+# Suggested wait before resubmitting a rejected search
+RETRY_AFTER_SECONDS = 5
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+CANCELLED = "cancelled"
+FINISHED_STATES = frozenset({DONE, ERROR, CANCELLED})
+
+
+class SearchTask:
+    """State and results of one background search."""
+
+    __slots__ = ("search_id", "status", "jobs", "error", "created", "started", "finished",
+                 "changed", "task")
+
+    def __init__(self, search_id: str):
+        self.search_id = search_id
+        self.status = PENDING
+        self.jobs: List[JobListing] = []
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.changed = asyncio.Event()  # Replaced after every change; set to wake subscribers
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def summary(self) -> Dict:
+        """Return the task's status fields, without results."""
+        return {
+            "search_id": self.search_id,
+            "status": self.status,
+            "count": len(self.jobs),
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+    def _notify(self):
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class SearchTaskManager:
+    """Runs searches in the background and keeps their results for a TTL."""
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_SEARCHES, ttl: float = RESULT_TTL_SECONDS,
+                 max_pending: int = MAX_PENDING_SEARCHES):
+        """
+        Args:
+            max_concurrent: Maximum number of searches running at once; others wait as pending
+            ttl: Seconds finished searches are kept
+            max_pending: Maximum number of searches waiting for a slot
+        """
+        self.ttl = ttl
+        self.tasks: Dict[str, SearchTask] = {}
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        self.slots = asyncio.Semaphore(max_concurrent)
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def submit(self, search: Callable[[], AsyncIterator[JobListing]],
+               on_done: Optional[Callable[[List[JobListing]], None]] = None) -> SearchTask:
+        """
+        Start a search in the background
+
+        Args:
+            search: Returns the async iterator that performs the search
+            on_done: Called with the results when the search completes successfully
+
+        Returns:
+            The new task; its search_id is the ticket
+            
+        Raises:
+            Overloaded: If max_pending searches are already waiting
+        """
+        self.purge()
+        unfinished = sum(1 for task in self.tasks.values() if not task.is_finished)
+        if unfinished >= self.max_concurrent + self.max_pending:
+            self.rejected += 1
+            raise Overloaded("Too many searches in progress", RETRY_AFTER_SECONDS, QUEUE_FULL)
+        task = SearchTask(uuid.uuid4().hex)
+        self.tasks[task.search_id] = task
+        task.task = asyncio.create_task(self._run(task, search, on_done))
+        return task
+
+    def get(self, search_id: str) -> Optional[SearchTask]:
+        """Return a search by ticket, or None if unknown or expired."""
+        self.purge()
+        return self.tasks.get(search_id)
+
+    def cancel(self, search_id: str) -> bool:
+        """Cancel a pending or running search. Returns False if it is unknown."""
+        task = self.get(search_id)
+        if task is None:
+            return False
+        if not task.is_finished and task.task is not None:
+            task.task.cancel()
+        return True
+
+    async def events(self, task: SearchTask) -> AsyncIterator[Tuple[str, object]]:
+        """
+        Follow a search: yields ("job", listing) for every result, including
+        those found before subscribing, then ("summary", fields) when it finishes
+        """
+        sent = 0
+        while True:
+            while sent < len(task.jobs):
+                yield "job", task.jobs[sent]
+                sent += 1
+            if task.is_finished:
+                yield "summary", task.summary()
+                return
+            await task.changed.wait()
+
+    def stats(self) -> Dict:
+        """Return the number of searches in each state and the rejection count."""
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, ERROR: 0, CANCELLED: 0}
+        for task in self.tasks.values():
+            counts[task.status] += 1
+        return {**counts, "rejected": self.rejected}
+
+    def purge(self):
+        """Drop finished searches older than the TTL."""
+        cutoff = time.time() - self.ttl
+        expired = [
+            search_id for search_id, task in self.tasks.items()
+            if task.finished is not None and task.finished <= cutoff
+        ]
+        for search_id in expired:
+            del self.tasks[search_id]
+
+    async def shutdown(self):
+        """Cancel every unfinished search and wait for them to stop."""
+        running = [task.task for task in self.tasks.values() if task.task is not None and not task.is_finished]
+        for running_task in running:
+            running_task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+    async def _run(self, task: SearchTask, search: Callable[[], AsyncIterator[JobListing]],
+                   on_done: Optional[Callable[[List[JobListing]], None]]):
+        try:
+            async with self.slots:
+                task.status = RUNNING
+                task.started = time.time()
+                task._notify()
+                results = search()
+                try:
+                    async for job in results:
+                        task.jobs.append(job)
+                        task._notify()
+                finally:
+                    await results.aclose()
+            task.status = DONE
+        except asyncio.CancelledError:
+            task.status = CANCELLED
+        except Exception as e:
+            logger.error(f"Search {task.search_id} failed: {e}")
+            task.status, task.error = ERROR, str(e)
+        finally:
+            task.finished = time.time()
+            task._notify()
+
+        if task.status == DONE and on_done is not None and task.jobs:
+            try:
+                on_done(task.jobs)
+            except Exception as e:
+                logger.error(f"Error handling results of search {task.search_id}: {e}")
@@ -0,0 +1,45 @@
+"""
+JSON serialization for API and agent responses.
+
+Records are encoded straight to bytes with orjson. Pydantic models are handed
+to the encoder as their own field dict instead of a .dict() copy, and
+compact profiles are expanded only at encoding time, so a response is built
+in a single pass with no intermediate copies of the job list.
+"""
+
+from typing import Any, Dict, Iterable
+
+import orjson
+from pydantic import BaseModel
+
+from models.compact_profile import CompactProfile
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj: Any) -> Any:
+    """Encode the types orjson does not know natively."""
+    if isinstance(obj, BaseModel):
+        # pydantic v1 keeps exactly the field values in __dict__
+        return obj.__dict__
+    if isinstance(obj, CompactProfile):
+        return obj.to_dict()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize a response payload to JSON bytes."""
+    return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+
+def loads(data: bytes) -> Any:
+    """Parse JSON bytes or text."""
+    return orjson.loads(data)
+
+
+def select_fields(model: BaseModel, fields: Iterable[str]) -> Dict[str, Any]:
+    """Return a subset of a model's fields without copying the values."""
+    values = model.__dict__
+    return {name: values[name] for name in fields}
@@ -0,0 +1,223 @@
+"""
+Primitives for sharing state between API worker processes through files.
+
+Every worker keeps its own in-memory copy of the stores and follows the
+append-only journals the other workers write; writers serialize through an
+advisory file lock. One worker at a time holds the leader lease and runs
+the scraping scheduler. The lease is an flock held for the life of the
+leader, so the OS releases it when the leader exits or crashes and a
+standby worker takes over on its next attempt.
+
+Locks are POSIX advisory locks: replicas on different hosts need a shared
+filesystem with working flock support.
+"""
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import threading
+from typing import List, Optional, Tuple
+
+import msgpack
+
+logger = logging.getLogger(__name__)
+
+
+class FileLock:
+    """
+    Exclusive advisory lock on a file, reentrant within a thread.
+
+    `with lock` blocks the calling thread while another process holds the
+    lock. Coroutines use `async with lock` instead, which waits on a worker
+    thread; the lock is still held by the event loop thread, so it does not
+    exclude other coroutines, and the locked section must not await.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Lock file; created if missing
+        """
+        self.path = path
+        self._fd: Optional[int] = None
+        self._depth = 0
+        self._thread_lock = threading.RLock()
+
+    def __enter__(self) -> "FileLock":
+        self._thread_lock.acquire()
+        try:
+            if self._depth == 0:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                except OSError:
+                    os.close(fd)
+                    raise
+                self._fd = fd
+            self._depth += 1
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        return self
+
+    async def __aenter__(self) -> "FileLock":
+        while not self._try_enter():
+            await asyncio.to_thread(self._wait_until_free)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.__exit__(exc_type, exc, tb)
+
+    def _try_enter(self) -> bool:
+        """Take the lock if nobody else holds it, without waiting."""
+        if not self._thread_lock.acquire(blocking=False):
+            return False
+        try:
+            if self._depth == 0:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    self._thread_lock.release()
+                    return False
+                except OSError:
+                    os.close(fd)
+                    raise
+                self._fd = fd
+            self._depth += 1
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        return True
+
+    def _wait_until_free(self):
+        """Block until the current holder, in any process or thread, lets go."""
+        # A separate open file conflicts with every other holder, including this process
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        finally:
+            os.close(fd)
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._depth -= 1
+            if self._depth == 0:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+                os.close(self._fd)
+                self._fd = None
+        finally:
+            self._thread_lock.release()
+
+
+class LeaderLease:
+    """Non-blocking lease held by at most one process at a time."""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Lease file; the holder writes its PID into it
+        """
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """Take the lease if it is free. Returns whether this process holds it."""
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        logger.info(f"Process {os.getpid()} acquired leader lease {self.path}")
+        return True
+
+    def release(self):
+        """Give up the lease so another process can take it."""
+        if self._fd is None:
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+
+class JournalFollower:
+    """Reads the records appended to a JSON-lines file since the previous read."""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Journal file; it may not exist yet
+        """
+        self.path = path
+        self.offset = 0
+        self._identity: Optional[Tuple[int, int]] = None
+
+    def read_new(self) -> List[dict]:
+        """
+        Return the complete records written since the last call
+
+        A journal that was removed, replaced or truncated is read again from
+        the start; a trailing partial line is left for the next call.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self.offset, self._identity = 0, None
+            return []
+
+        identity = (stat.st_dev, stat.st_ino)
+        if identity != self._identity or stat.st_size < self.offset:
+            self.offset, self._identity = 0, identity
+        if stat.st_size == self.offset:
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read()
+        records, consumed = self._decode(data)
+        self.offset += consumed
+        return records
+
+    def _decode(self, data: bytes) -> Tuple[List[dict], int]:
+        """Parse the complete records at the start of data; returns them and the bytes they took."""
+        complete = data[:data.rfind(b"\n") + 1]
+        records = []
+        for line in complete.splitlines():
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"Ignoring corrupt record in {self.path}")
+        return records, len(complete)
+
+
+class PackedJournalFollower(JournalFollower):
+    """Follows a journal of msgpack records written back to back."""
+
+    def _decode(self, data: bytes) -> Tuple[List[dict], int]:
+        unpacker = msgpack.Unpacker()
+        unpacker.feed(data)
+        records = []
+        consumed = 0
+        try:
+            for record in unpacker:
+                records.append(record)
+                consumed = unpacker.tell()
+        except (msgpack.UnpackException, ValueError):
+            # Records have no delimiters to resynchronize on, so skip the rest
+            logger.warning(f"Ignoring corrupt data at offset {self.offset + consumed} of {self.path}")
+            consumed = len(data)
+        # A trailing partial record stays for the next read
+        return records, consumed
@@ -0,0 +1,340 @@
+"""
+Lightweight request tracing.
+
+A trace is started for every API request and spans are opened around the
+stages worth separating (admission wait, DNS and connection setup, the
+LinkedIn fetch, card parsing, validation, profile storage). The active span
+lives in a context variable, so it follows the request through awaits and
+into any asyncio task it creates. Outside a trace, span() costs a context
+variable lookup.
+
+Every traced response gets a Server-Timing header summing the time spent in
+each stage. A sampled fraction of traces (plus any request whose W3C
+traceparent header asks for it) is queued for a background thread that writes it to a local file, so the
+event loop never waits on disk; when the queue is full, spans are dropped
+and counted. Spans that finish after their request (background work it
+started) are exported on their own, under the same trace ID.
+"""
+
+import asyncio
+import atexit
+import contextvars
+import functools
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import aiohttp
+
+from services import metrics
+from services.serialization import dumps
+
+DEFAULT_SAMPLE_RATE = 0.01
+# traceparent: version-trace_id-parent_id-flags
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+SAMPLED_FLAG = 0x01
+# Server-Timing metric names are HTTP tokens
+SERVER_TIMING_NAME = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")
+DEFAULT_EXPORT_QUEUE_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+SPANS_DROPPED = metrics.counter("lume_trace_spans_dropped", "Spans dropped because the trace export queue was full")
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+def _new_id(nbytes: int) -> str:
+    return random.getrandbits(nbytes * 8).to_bytes(nbytes, "big").hex()
+
+
+def _otlp_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Span:
+    """One timed stage of a trace."""
+
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "_started")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Optional[Dict] = None):
+        self.trace = trace
+        self.name = name
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self._started = time.perf_counter()
+
+    @property
+    def duration(self) -> float:
+        """Seconds from start to end (or to now, while running)."""
+        if self.end_ns is None:
+            return time.perf_counter() - self._started
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def end(self):
+        if self.end_ns is not None:
+            return
+        # Wall-clock start plus monotonic duration, so clock adjustments cannot make spans negative
+        self.end_ns = self.start_ns + int((time.perf_counter() - self._started) * 1e9)
+        self.trace._finish(self)
+
+    def to_dict(self) -> Dict:
+        """Return the span in the field layout of an OTLP/JSON span."""
+        return {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+        }
+
+
+class Trace:
+    """The spans of one request."""
+
+    __slots__ = ("trace_id", "sampled", "exporter", "spans", "root", "exported")
+
+    def __init__(self, name: str, exporter: Optional["JsonLinesExporter"], sampled: bool,
+                 trace_id: Optional[str] = None, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict] = None):
+        self.trace_id = trace_id or _new_id(16)
+        self.sampled = sampled
+        self.exporter = exporter
+        self.spans: List[Span] = []
+        self.exported = False
+        self.root = Span(self, name, parent_id, attributes)
+
+    def server_timing(self) -> str:
+        """Return a Server-Timing header value: time per stage finished so far, then the total."""
+        stages: Dict[str, List[float]] = {}
+        for span in self.spans:
+            stage = stages.setdefault(span.name, [0.0, 0])
+            stage[0] += span.duration
+            stage[1] += 1
+        entries = []
+        for name, (duration, count) in stages.items():
+            desc = f';desc="{count} calls"' if count > 1 else ""
+            entries.append(f"{SERVER_TIMING_NAME.sub('_', name)}{desc};dur={duration * 1000:.1f}")
+        entries.append(f"total;dur={self.root.duration * 1000:.1f}")
+        return ", ".join(entries)
+
+    def finish(self):
+        """End the root span and export the trace if it is sampled."""
+        self.root.end()
+        if self.sampled and self.exporter is not None:
+            self.exporter.export([self.root, *self.spans])
+        self.exported = True
+
+    def _finish(self, span: Span):
+        if span is self.root:
+            return
+        if self.exported:
+            # Background work outliving its request
+            if self.sampled and self.exporter is not None:
+                self.exporter.export([span])
+            return
+        self.spans.append(span)
+
+
+class JsonLinesExporter:
+    """Appends finished spans to a file, one JSON object per line, from a background thread."""
+
+    def __init__(self, path: str, queue_size: int = DEFAULT_EXPORT_QUEUE_SIZE):
+        """
+        Args:
+            path: File to append to; O_APPEND keeps lines from several workers intact
+            queue_size: Span batches waiting to be written before new ones are dropped
+        """
+        self.path = path
+        self._batches: queue.Queue = queue.Queue(queue_size)
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        """Queue spans for writing; drops them, counted, when the queue is full."""
+        if self._writer is None:
+            self._start()
+        try:
+            self._batches.put_nowait(spans)
+        except queue.Full:
+            SPANS_DROPPED.inc(len(spans))
+
+    def flush(self):
+        """Wait until every span queued so far is written."""
+        if self._writer is not None:
+            self._batches.join()
+
+    def close(self):
+        """Write out the queued spans and stop the writer thread."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+            if writer is None:
+                return
+            # Wait for room instead of failing on a full queue, so everything queued is written
+            self._batches.put(None)
+        writer.join()
+
+    def _start(self):
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write, name="trace-exporter", daemon=True)
+                self._writer.start()
+                atexit.register(self.close)
+
+    def _write(self):
+        with open(self.path, "ab") as f:
+            while True:
+                batches = [self._batches.get()]
+                # Whatever else is already waiting goes out in the same write
+                while True:
+                    try:
+                        batches.append(self._batches.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    f.write(b"".join(dumps(span.to_dict()) + b"\n"
+                                     for spans in batches if spans is not None for span in spans))
+                    f.flush()
+                except Exception:
+                    logger.exception("Could not write %d span batches to %s", len(batches), self.path)
+                finally:
+                    for _ in batches:
+                        self._batches.task_done()
+                if None in batches:
+                    return
+
+
+class Tracer:
+    """Starts request traces and decides which are exported."""
+
+    def __init__(self, exporter: Optional[JsonLinesExporter] = None, sample_rate: float = DEFAULT_SAMPLE_RATE):
+        """
+        Args:
+            exporter: Where sampled traces go; None exports nothing
+            sample_rate: Fraction of traces exported when the caller has not decided
+        """
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    def start_trace(self, name: str, traceparent: Optional[str] = None,
+                    attributes: Optional[Dict] = None) -> Trace:
+        """
+        Start a trace; activate() its root span to trace the work done for it
+
+        Args:
+            name: Root span name
+            traceparent: Incoming W3C traceparent header; continues the caller's trace and sampling decision
+            attributes: Root span attributes
+        """
+        trace_id = parent_id = None
+        sampled = random.random() < self.sample_rate
+        match = TRACEPARENT.match(traceparent.strip().lower()) if traceparent else None
+        if match:
+            trace_id, parent_id = match.group(1), match.group(2)
+            sampled = bool(int(match.group(3), 16) & SAMPLED_FLAG)
+        return Trace(name, self.exporter, sampled, trace_id, parent_id, attributes)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def activate(active: Span) -> Iterator[Span]:
+    """Make a span current for the duration of the with-block."""
+    token = _current_span.set(active)
+    try:
+        yield active
+    finally:
+        _current_span.reset(token)
+
+
+def start_span(name: str, **attributes) -> Optional[Span]:
+    """
+    Start a child of the current span without making it current
+
+    For stages that begin and end in different callbacks or across the yields
+    of a generator. Returns None outside a trace; end the span with end().
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    return Span(parent.trace, name, parent.span_id, attributes)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """Run the with-block in a child span of the current one; a no-op outside a trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    try:
+        with activate(child):
+            yield child
+    finally:
+        child.end()
+
+
+def traced(name: str):
+    """Decorate a function or coroutine function to run in a span."""
+    def decorate(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def aiohttp_trace_config() -> aiohttp.TraceConfig:
+    """Return client hooks recording DNS resolution and connection setup (TCP and TLS) as spans."""
+    async def start(name, trace_config_ctx):
+        setattr(trace_config_ctx, name, start_span(name))
+
+    async def end(name, trace_config_ctx):
+        started = getattr(trace_config_ctx, name, None)
+        if started is not None:
+            started.end()
+
+    config = aiohttp.TraceConfig()
+    config.on_dns_resolvehost_start.append(lambda session, ctx, params: start("dns", ctx))
+    config.on_dns_resolvehost_end.append(lambda session, ctx, params: end("dns", ctx))
+    config.on_connection_create_start.append(lambda session, ctx, params: start("connect", ctx))
+    config.on_connection_create_end.append(lambda session, ctx, params: end("connect", ctx))
+    return config
+
+
+def tracer_from_env() -> Tracer:
+    """Build a tracer from LUME_TRACE_FILE (exporter path, empty to disable) and LUME_TRACE_SAMPLE_RATE."""
+    path = os.getenv("LUME_TRACE_FILE", "traces.jsonl")
+    sample_rate = float(os.getenv("LUME_TRACE_SAMPLE_RATE", str(DEFAULT_SAMPLE_RATE)))
+    return Tracer(JsonLinesExporter(path) if path else None, sample_rate)
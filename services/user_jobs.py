@@ -0,0 +1,321 @@
+"""
+Per-user job history with secondary indexes for paginated queries.
+
+Every job delivered to a user is kept (deduplicated by posting) with a
+per-user sequence number. Filters are answered from posting sets keyed by
+company, source and remote flag; each sort key has its own sorted index,
+so a page is read by seeking to the cursor position and walking forward
+rather than scanning and sorting the whole history.
+
+Histories keep the newest MAX_JOBS_PER_USER jobs; older ones are forgotten,
+but sequence numbers (and so feed cursors) keep counting from where they were.
+
+With a journal path, every delivery is also appended to a file that other
+API workers follow, so each worker serves the same histories (and a
+restarted worker gets them back). Journal records are msgpack, with the
+jobs in the compact encoding of services.job_codec. Once the journal passes
+JOURNAL_COMPACTION_BYTES (and twice its size after the last compaction), it
+is rewritten as one record per history, so it stays proportional to the
+capped histories rather than to every delivery ever made.
+"""
+
+import asyncio
+import base64
+import binascii
+import json
+import os
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import msgpack
+
+from models.job import JobListing
+from services.job_codec import decode_jobs, encode_jobs
+from services.recommender import job_is_remote, job_key
+from services.shared_state import FileLock, PackedJournalFollower
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# When fewer than 1/SPARSE_FILTER_RATIO of the jobs pass the filters, the
+# matches are sorted on their own instead of skipping through the full order
+SPARSE_FILTER_RATIO = 4
+# Jobs kept per user; older deliveries are dropped from the history
+MAX_JOBS_PER_USER = 1000
+# Journal size that triggers rewriting it as one record per history
+JOURNAL_COMPACTION_BYTES = 64 << 20
+
+
+def posted_key(moment: datetime) -> str:
+    """Comparable form of a posting time: naive UTC in ISO format; naive times are taken as UTC."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.isoformat()
+
+
+# Sort key name -> function building a comparable value from (seq, job)
+SORT_KEYS = {
+    "scraped": lambda seq, job: seq,
+    "posted_date": lambda seq, job: posted_key(job.posted_date) if job.posted_date else "",
+    "company": lambda seq, job: job.company.lower(),
+    "title": lambda seq, job: job.title.lower(),
+}
+# Type of each sort key's values, checked in cursors
+SORT_VALUE_TYPES = {"scraped": int, "posted_date": str, "company": str, "title": str}
+DEFAULT_SORT = "-scraped"
+
+
+class InvalidQuery(ValueError):
+    """Raised for unknown sort keys or malformed cursors."""
+
+
+def encode_cursor(sort: str, value, seq: int) -> str:
+    """Encode the position after (value, seq) in the given sort order."""
+    payload = json.dumps([sort, value, seq], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[object, int]:
+    """Decode a cursor produced by encode_cursor for the same sort order."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, seq = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError, binascii.Error):
+        raise InvalidQuery("Malformed cursor")
+    if cursor_sort != sort:
+        raise InvalidQuery("Cursor does not match sort order")
+    if type(value) is not SORT_VALUE_TYPES[sort.lstrip("-")] or type(seq) is not int:
+        raise InvalidQuery("Malformed cursor")
+    return value, seq
+
+
+class UserJobs:
+    """Job history and indexes for a single user."""
+
+    __slots__ = ("timestamp", "first", "jobs", "keys", "by_company", "by_source", "remote", "orders", "changed")
+
+    def __init__(self):
+        self.timestamp: Optional[str] = None  # Time jobs were last added
+        self.first = 0  # Sequence number of jobs[0]; the jobs before it were trimmed
+        self.jobs: List[JobListing] = []  # Indexed by sequence number - first
+        self.keys: Dict[Tuple[str, str], int] = {}
+        self.by_company: Dict[str, Set[int]] = {}
+        self.by_source: Dict[str, Set[int]] = {}
+        self.remote: Set[int] = set()
+        self.orders: Dict[str, List[Tuple[object, int]]] = {name: [] for name in SORT_KEYS}
+        self.changed = asyncio.Event()  # Replaced whenever jobs are added; set to wake subscribers
+
+    @property
+    def count(self) -> int:
+        """Number of jobs ever added, trimmed ones included; the feed cursor after the newest job."""
+        return self.first + len(self.jobs)
+
+    def since(self, cursor: int) -> List[JobListing]:
+        """Return the jobs added after the first `cursor` jobs and still kept, oldest first."""
+        return self.jobs[max(cursor - self.first, 0):]
+
+    def add(self, job: JobListing) -> bool:
+        """Add a job to the history. Returns False if it was already there."""
+        key = job_key(job)
+        if key in self.keys:
+            return False
+        seq = self.count
+        self.jobs.append(job)
+        self.keys[key] = seq
+        self.by_company.setdefault(job.company.lower(), set()).add(seq)
+        self.by_source.setdefault(job.source.lower(), set()).add(seq)
+        if job_is_remote(job):
+            self.remote.add(seq)
+        for name, sort_value in SORT_KEYS.items():
+            insort(self.orders[name], (sort_value(seq, job), seq))
+        return True
+
+    def trim(self, keep: int):
+        """Forget all but the newest `keep` jobs; the others keep their sequence numbers."""
+        drop = len(self.jobs) - keep
+        if drop <= 0:
+            return
+        for job in self.jobs[:drop]:
+            seq = self.keys.pop(job_key(job))
+            for index, value in ((self.by_company, job.company.lower()), (self.by_source, job.source.lower())):
+                index[value].discard(seq)
+                if not index[value]:
+                    del index[value]
+            self.remote.discard(seq)
+        del self.jobs[:drop]
+        self.first += drop
+        for order in self.orders.values():
+            order[:] = [entry for entry in order if entry[1] >= self.first]
+
+    def query(self, company: Optional[str] = None, source: Optional[str] = None,
+              remote: Optional[bool] = None, posted_since: Optional[datetime] = None,
+              sort: str = DEFAULT_SORT, cursor: Optional[str] = None,
+              limit: int = DEFAULT_PAGE_SIZE) -> Tuple[List[JobListing], Optional[str]]:
+        """
+        Return one page of jobs matching the filters
+
+        Args:
+            company: Only jobs from this company (case-insensitive)
+            source: Only jobs from this source
+            remote: Only remote (True) or only on-site (False) jobs
+            posted_since: Only jobs posted at or after this time
+            sort: Sort key, prefixed with "-" for descending order
+            cursor: Cursor returned with the previous page
+            limit: Page size
+
+        Returns:
+            The page of jobs and the cursor for the next page (None on the last page)
+        """
+        descending = sort.startswith("-")
+        name = sort.lstrip("-")
+        if name not in SORT_KEYS:
+            raise InvalidQuery(f"Unknown sort key: {name}")
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        # Candidate set from the filter indexes; None means every job
+        allowed: Optional[Set[int]] = None
+        filters = []
+        if company is not None:
+            filters.append(self.by_company.get(company.lower(), set()))
+        if source is not None:
+            filters.append(self.by_source.get(source.lower(), set()))
+        if remote is True:
+            filters.append(self.remote)
+        if filters:
+            filters.sort(key=len)
+            allowed = set(filters[0]).intersection(*filters[1:])
+        since = posted_key(posted_since) if posted_since is not None else None
+        if since is not None and name != "posted_date":
+            if allowed is not None:
+                posted = SORT_KEYS["posted_date"]
+                allowed = {seq for seq in allowed if posted(seq, self.jobs[seq - self.first]) >= since}
+            else:
+                dates = self.orders["posted_date"]
+                allowed = {seq for _, seq in dates[bisect_left(dates, (since, -1)):]}
+
+        order = self.orders[name]
+        if allowed is not None and len(allowed) * SPARSE_FILTER_RATIO < len(order):
+            # Few matches: sort just those, so the walk below skips nothing
+            sort_value = SORT_KEYS[name]
+            order = sorted((sort_value(seq, self.jobs[seq - self.first]), seq) for seq in allowed)
+            allowed = None
+        # Sorting by posting time, posted_since is where the walk stops
+        first = bisect_left(order, (since, -1)) if since is not None and name == "posted_date" else 0
+
+        if cursor is not None:
+            position = tuple(decode_cursor(cursor, sort))
+            index = bisect_left(order, position) if descending else bisect_right(order, position)
+        else:
+            index = 0 if not descending else len(order)
+        positions = range(index - 1, first - 1, -1) if descending else range(max(index, first), len(order))
+
+        page: List[Tuple[object, int]] = []
+        for position in positions:
+            value, seq = order[position]
+            if allowed is not None and seq not in allowed:
+                continue
+            if remote is False and seq in self.remote:
+                continue
+            page.append((value, seq))
+            if len(page) > limit:
+                break
+
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = encode_cursor(sort, *page[-1])
+        return [self.jobs[seq - self.first] for _, seq in page], next_cursor
+
+
+class UserJobStore:
+    """Job histories for all users."""
+
+    def __init__(self, journal_path: Optional[str] = None, max_jobs_per_user: int = MAX_JOBS_PER_USER,
+                 compaction_bytes: int = JOURNAL_COMPACTION_BYTES):
+        """
+        Args:
+            journal_path: Journal file shared with other processes, or None to keep histories in memory only
+            max_jobs_per_user: Jobs kept in each history
+            compaction_bytes: Journal size at which it is rewritten as one record per history
+        """
+        self.users: Dict[str, UserJobs] = {}
+        self.created = asyncio.Event()  # Replaced whenever a user's history is created; set to wake waiters
+        self.max_jobs_per_user = max_jobs_per_user
+        self.compaction_bytes = compaction_bytes
+        self.journal_path = journal_path
+        self.journal = PackedJournalFollower(journal_path) if journal_path else None
+        self.lock = FileLock(f"{journal_path}.lock") if journal_path else None
+        self.compacted_size = 0  # Journal size after the last compaction by this process
+        self.unreported: List[JobListing] = []  # Jobs read by a compaction, returned by the next refresh()
+
+    def get(self, user_id: str) -> Optional[UserJobs]:
+        """Return a user's job history, or None if nothing was stored for them."""
+        return self.users.get(user_id)
+
+    def user(self, user_id: str) -> UserJobs:
+        """Return a user's job history, creating an empty one if needed."""
+        user_jobs = self.users.get(user_id)
+        if user_jobs is None:
+            user_jobs = self.users[user_id] = UserJobs()
+            created, self.created = self.created, asyncio.Event()
+            created.set()
+        return user_jobs
+
+    def add_jobs(self, user_id: str, jobs: Iterable[JobListing]) -> List[JobListing]:
+        """Record jobs delivered to a user. Returns the ones not seen before."""
+        added = self._add(user_id, jobs, datetime.now().isoformat())
+        if added and self.journal_path:
+            record = {"user_id": user_id, "timestamp": self.users[user_id].timestamp, "jobs": encode_jobs(added)}
+            with self.lock:
+                # Apply other processes' deliveries first, so that skipping past our own record skips nothing
+                self.unreported.extend(self.refresh())
+                with open(self.journal_path, "ab") as f:
+                    f.write(msgpack.packb(record))
+                # Replaying it would re-add jobs the history has trimmed since
+                self.journal.read_new()
+                if os.path.getsize(self.journal_path) > max(self.compaction_bytes, 2 * self.compacted_size):
+                    self._compact()
+        return added
+
+    def refresh(self) -> List[JobListing]:
+        """
+        Apply deliveries other processes appended to the journal
+
+        Returns:
+            Jobs that were new to this process
+        """
+        if self.journal is None:
+            return []
+        added, self.unreported = self.unreported, []
+        for record in self.journal.read_new():
+            added.extend(self._add(record["user_id"], decode_jobs(record["jobs"]), record["timestamp"],
+                                   record.get("first", 0)))
+        return added
+
+    def _compact(self):
+        """Rewrite the journal as one record per history (lock held, journal read to the end)."""
+        temp_path = f"{self.journal_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            for user_id, user_jobs in self.users.items():
+                f.write(msgpack.packb({"user_id": user_id, "timestamp": user_jobs.timestamp,
+                                       "first": user_jobs.first, "jobs": encode_jobs(user_jobs.jobs)}))
+        # Renamed into place, so followers see either journal whole and re-read the new one from the start
+        os.replace(temp_path, self.journal_path)
+        self.compacted_size = os.path.getsize(self.journal_path)
+        self.journal = PackedJournalFollower(self.journal_path)
+        self.journal.read_new()  # Everything in it is already in memory
+
+    def _add(self, user_id: str, jobs: Iterable[JobListing], timestamp: str, first: int = 0) -> List[JobListing]:
+        user_jobs = self.user(user_id)
+        if not user_jobs.jobs:
+            # A history read from a compacted journal continues its sequence numbers
+            user_jobs.first = max(user_jobs.first, first)
+        added = [job for job in jobs if user_jobs.add(job)]
+        user_jobs.trim(self.max_jobs_per_user)
+        # Only real changes move the timestamp, so cached pages stay valid
+        if added or user_jobs.timestamp is None:
+            user_jobs.timestamp = timestamp
+        if added:
+            changed, user_jobs.changed = user_jobs.changed, asyncio.Event()
+            changed.set()
+        return added
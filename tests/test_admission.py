@@ -0,0 +1,67 @@
+"""
+Test file for admission control.
+"""
+
+import pytest
+import asyncio
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.admission import CLIENT_QUOTA, QUEUE_FULL, QUEUE_TIMEOUT, AdmissionLimiter, Overloaded
+
+async def hold(limiter: AdmissionLimiter, release: asyncio.Event, client=None):
+    """Occupy a limiter slot until released."""
+    async with limiter.admit(client):
+        await release.wait()
+
+@pytest.mark.asyncio
+async def test_queue_and_shedding():
+    """Test that excess callers queue in order and the rest are shed immediately."""
+    limiter = AdmissionLimiter("search", max_concurrent=1, max_queue=1, queue_timeout=1)
+    release = asyncio.Event()
+    running = asyncio.create_task(hold(limiter, release))
+    queued = asyncio.create_task(hold(limiter, release))
+    await asyncio.sleep(0.01)
+    assert limiter.stats()["running"] == 1
+    assert limiter.stats()["queued"] == 1
+
+    with pytest.raises(Overloaded) as exc:
+        async with limiter.admit():
+            pass
+    assert exc.value.reason == QUEUE_FULL
+    assert exc.value.retry_after >= 1
+
+    release.set()
+    await asyncio.gather(running, queued)
+    stats = limiter.stats()
+    assert stats["running"] == 0 and stats["queued"] == 0
+    assert stats["admitted"] == 2
+    assert stats["shed"] == {QUEUE_FULL: 1}
+
+@pytest.mark.asyncio
+async def test_queue_timeout_and_client_quota():
+    """Test that waits past the deadline are shed and per-client quotas apply."""
+    limiter = AdmissionLimiter("search", max_concurrent=1, max_queue=5, queue_timeout=0.02, per_client=1)
+    release = asyncio.Event()
+    running = asyncio.create_task(hold(limiter, release, client="a"))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(Overloaded) as exc:
+        async with limiter.admit("a"):
+            pass
+    assert exc.value.reason == CLIENT_QUOTA
+
+    with pytest.raises(Overloaded) as exc:
+        async with limiter.admit("b"):
+            pass
+    assert exc.value.reason == QUEUE_TIMEOUT
+    assert limiter.stats()["queued"] == 0
+
+    release.set()
+    await running
+    async with limiter.admit("b"):
+        assert limiter.stats()["running"] == 1
+    assert not limiter.clients
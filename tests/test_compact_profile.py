@@ -0,0 +1,71 @@
+"""
+Test file for the compact, vocabulary-encoded profile representation.
+"""
+
+import pytest
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.compact_profile import CompactProfile, SKILLS, Vocabulary
+from models.user_profile import UserProfile
+
+@pytest.fixture
+def sample_profile() -> UserProfile:
+    """Create a sample validated profile."""
+    return UserProfile(
+        user_id="compact123",
+        name="Compact User",
+        email="compact@example.com",
+        skills=["Python", "Machine Learning"],
+        experience_years=3.0,
+        preferred_roles=["Software Engineer"],
+        preferred_locations=["Toronto", "Remote"],
+        weekly_application_goal=7,
+        preferred_industries=["Technology"],
+        remote_preference=False
+    )
+
+def test_vocabulary_interning():
+    """Test that equal terms share one ID and round-trip."""
+    vocabulary = Vocabulary("test")
+    first = vocabulary.id_for("Python")
+    assert vocabulary.id_for("Python") == first
+    assert vocabulary.id_for("Go") != first
+    assert vocabulary.lookup("Rust") is None
+    assert vocabulary.decode(vocabulary.encode(["Go", "Python"])) == ["Go", "Python"]
+
+def test_round_trip(sample_profile):
+    """Test conversion to and from UserProfile."""
+    compact = CompactProfile.from_profile(sample_profile)
+    assert compact.to_dict() == sample_profile.dict()
+    assert compact.to_profile() == sample_profile
+
+def test_shared_ids(sample_profile):
+    """Test that profiles with the same skills store the same IDs."""
+    other = sample_profile.copy(update={"user_id": "compact456"})
+    first = CompactProfile.from_profile(sample_profile)
+    second = CompactProfile.from_profile(other)
+    assert first.skill_ids == second.skill_ids
+    assert SKILLS.lookup("Python") in first.skill_ids
+
+def test_field_access(sample_profile):
+    """Test reading and writing fields by their UserProfile names."""
+    compact = CompactProfile.from_profile(sample_profile)
+    compact.set_field("skills", ["Rust"])
+    compact.set_field("weekly_application_goal", 14)
+    assert compact.get_field("skills") == ["Rust"]
+    assert compact.get_field("weekly_application_goal") == 14
+    assert compact.to_dict()["preferred_locations"] == ["Toronto", "Remote"]
+
+def test_released_terms_are_freed():
+    """Test that terms no record refers to are dropped and their IDs reused."""
+    vocabulary = Vocabulary("test")
+    first = vocabulary.encode(["Python", "Go"])
+    second = vocabulary.encode(["Python"])
+    vocabulary.release(first)
+    assert vocabulary.lookup("Go") is None and vocabulary.lookup("Python") == second[0]
+    assert vocabulary.encode(["Rust"]) == first[1:]
+    assert vocabulary.terms == 2 and len(vocabulary) == 2
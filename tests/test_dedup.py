@@ -0,0 +1,67 @@
+"""
+Test file for near-duplicate job posting detection.
+"""
+
+import pytest
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.job import JobListing
+from services.dedup import NearDuplicateDetector, job_shingles, minhash_signature
+
+DESCRIPTION = (
+    "We are looking for a backend engineer to build data pipelines in Python "
+    "and Go, own our ingestion services and mentor junior engineers on the team"
+)
+
+def make_job(job_id: str, title: str, company: str = "Acme", location: str = "Toronto, Ontario, Canada",
+             description: str = DESCRIPTION) -> JobListing:
+    """Create a LinkedIn-style job listing for testing."""
+    return JobListing(
+        title=title,
+        company=company,
+        location=location,
+        url=f"https://www.linkedin.com/jobs/view/{job_id}",
+        source="linkedin",
+        job_id=job_id,
+        description=description
+    )
+
+def test_signature_similarity():
+    """Test that MinHash agreement tracks shingle overlap."""
+    first = minhash_signature(job_shingles(make_job("1", "Backend Engineer")))
+    same = minhash_signature(job_shingles(make_job("2", "Backend Engineer")))
+    other = minhash_signature(job_shingles(make_job("3", "Accountant", description="Ledgers and audits")))
+    assert (first == same).all()
+    assert (first == other).mean() < 0.2
+
+def test_reposts_collapse():
+    """Test that reposts and per-city copies map to the first posting."""
+    detector = NearDuplicateDetector()
+    original = make_job("1", "Backend Engineer")
+    assert detector.canonical_key(original) == ("linkedin", "1")
+    assert detector.canonical_key(make_job("2", "Backend Engineer", location="Vancouver")) == ("linkedin", "1")
+    assert detector.canonical_key(make_job("3", "Backend Engineer", description=DESCRIPTION + " today")) == ("linkedin", "1")
+    assert len(detector) == 1
+
+def test_distinct_postings_kept():
+    """Test that different roles and companies stay separate."""
+    detector = NearDuplicateDetector()
+    detector.canonical_key(make_job("1", "Backend Engineer"))
+    assert detector.canonical_key(make_job("2", "Backend Engineer", company="Globex",
+                                           description="Design payment systems")) == ("linkedin", "2")
+    assert detector.find(make_job("3", "Accountant", description="Ledgers and audits")) is None
+    assert len(detector) == 2
+
+def test_postings_without_shingles_kept():
+    """Test that postings the tokenizer keeps nothing or one word of are never matched."""
+    detector = NearDuplicateDetector()
+    assert detector.canonical_key(make_job("1", "软件工程师", company="腾讯", description=None)) == ("linkedin", "1")
+    assert detector.canonical_key(make_job("2", "データサイエンティスト", company="楽天",
+                                           description=None)) == ("linkedin", "2")
+    assert detector.canonical_key(make_job("3", "Engineer", company="", description=None)) == ("linkedin", "3")
+    assert detector.find(make_job("4", "Designer", company="", description=None)) is None
+    assert len(detector) == 0
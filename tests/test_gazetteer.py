@@ -0,0 +1,68 @@
+"""
+Test file for location normalization and the geo index.
+"""
+
+import pytest
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.gazetteer import GeoIndex, PLACES, REMOTE, Place, haversine_km, resolve
+
+@pytest.mark.parametrize("location,place_id", [
+    ("Toronto, Ontario, Canada", "toronto-on-ca"),
+    ("Greater Toronto Area", "toronto-on-ca"),
+    ("Toronto, ON", "toronto-on-ca"),
+    ("Greater Vancouver Metropolitan Area", "vancouver-bc-ca"),
+    ("San Francisco Bay Area", "san-francisco-ca-us"),
+    ("London, England, United Kingdom", "london-eng-gb"),
+    ("London, Ontario, Canada", "london-on-ca"),
+    ("London", "london-eng-gb"),
+    ("Montréal, Quebec, Canada", "montreal-qc-ca"),
+])
+def test_resolve(location, place_id):
+    """Test that common location spellings resolve to one canonical place."""
+    assert resolve(location).place_id == place_id
+
+def test_resolve_remote_and_unknown():
+    """Test remote markers and unknown locations."""
+    assert resolve("Remote") is REMOTE
+    assert resolve("United States (Remote)") is REMOTE
+    assert resolve("Atlantis") is None
+    assert resolve(None) is None
+
+def test_haversine():
+    """Test great-circle distances."""
+    toronto, ottawa = PLACES["toronto-on-ca"], PLACES["ottawa-on-ca"]
+    assert haversine_km(toronto.lat, toronto.lon, ottawa.lat, ottawa.lon) == pytest.approx(352, abs=5)
+
+def test_geo_index_radius():
+    """Test radius queries across grid cells."""
+    index = GeoIndex()
+    for doc_id, place_id in enumerate(["toronto-on-ca", "mississauga-on-ca", "hamilton-on-ca",
+                                       "ottawa-on-ca", "vancouver-bc-ca"]):
+        index.add(doc_id, PLACES[place_id])
+    index.add(5, REMOTE)
+    index.add(6, None)
+
+    assert sorted(index.within(43.6532, -79.3832, 30)) == [0, 1]
+    assert sorted(index.near_any([PLACES["toronto-on-ca"]], 60)) == [0, 1, 2]
+    assert sorted(index.near_any([PLACES["vancouver-bc-ca"], REMOTE], 10)) == [4, 5]
+
+def test_geo_index_places_and_antimeridian():
+    """Test documents indexed at several places and radius queries across longitude ±180."""
+    index = GeoIndex()
+    index.add(0, PLACES["toronto-on-ca"])
+    index.add(0, PLACES["vancouver-bc-ca"])
+    index.add(0, PLACES["vancouver-bc-ca"])  # Already indexed there
+    for doc_id in range(1, 20):
+        index.add(doc_id, PLACES["ottawa-on-ca"])
+    assert index.within(49.2827, -123.1207, 10) == [0]
+    assert sorted(index.near_any([PLACES["toronto-on-ca"], PLACES["ottawa-on-ca"]], 10)) == list(range(20))
+
+    index.add(20, Place("east", "East", "", "", -16.5, 179.9))
+    index.add(21, Place("west", "West", "", "", -16.5, -179.9))
+    assert sorted(index.within(-16.5, 179.95, 30)) == [20, 21]
+    assert sorted(index.within(-16.5, -179.95, 30)) == [20, 21]
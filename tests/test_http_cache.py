@@ -0,0 +1,118 @@
+"""
+Test file for the API's conditional GET and compression helpers.
+"""
+
+import pytest
+import sys
+import os
+import gzip
+import json
+import time
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+
+from api.http_cache import (
+    CompressionMiddleware,
+    EncodedBodyCache,
+    accepts_gzip,
+    http_date,
+    is_not_modified,
+    not_modified_response,
+    strong_etag,
+)
+
+def test_etag_depends_on_every_part():
+    """Test that ETags are stable and change with any input."""
+    assert strong_etag("2024-01-01", 20) == strong_etag("2024-01-01", 20)
+    assert strong_etag("2024-01-01", 20) != strong_etag("2024-01-01", 21)
+    assert strong_etag("a").startswith('"')
+
+def test_is_not_modified():
+    """Test If-None-Match and If-Modified-Since evaluation."""
+    etag = strong_etag("v1")
+    modified = time.time() - 60
+    assert is_not_modified(Headers({"if-none-match": etag}), etag)
+    assert is_not_modified(Headers({"if-none-match": f'"other", W/{etag}'}), etag)
+    assert is_not_modified(Headers({"if-none-match": etag[:-1] + '-gzip"'}), etag)
+    assert not is_not_modified(Headers({"if-none-match": '"other"'}), etag, modified)
+    assert is_not_modified(Headers({"if-modified-since": http_date(modified)}), etag, modified)
+    assert not is_not_modified(Headers({"if-modified-since": http_date(modified - 3600)}), etag, modified)
+    assert not is_not_modified(Headers({"if-modified-since": "garbage"}), etag, modified)
+    # If-None-Match wins over If-Modified-Since
+    assert not is_not_modified(
+        Headers({"if-none-match": '"other"', "if-modified-since": http_date(modified)}), etag, modified
+    )
+
+def test_accepts_gzip():
+    """Test Accept-Encoding parsing with q-values and wildcards."""
+    assert accepts_gzip("gzip, deflate, br")
+    assert accepts_gzip("br;q=1.0, GZIP;q=0.5")
+    assert accepts_gzip("*")
+    assert not accepts_gzip("gzip;q=0")
+    assert not accepts_gzip("gzip;q=0, *")
+    assert not accepts_gzip("identity, *;q=0")
+    assert not accepts_gzip("deflate")
+    assert not accepts_gzip(None)
+
+def test_compression_skips_streams():
+    """Test that regular responses are gzipped but NDJSON streams are not buffered."""
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/big")
+    async def big(request: Request):
+        if is_not_modified(request.headers, '"big"'):
+            return not_modified_response('"big"')
+        return JSONResponse({"jobs": ["Software Engineer"] * 100}, headers={"ETag": '"big"'})
+
+    @app.get("/stream")
+    async def stream():
+        async def frames():
+            for i in range(3):
+                yield f'{{"event":"job","data":{i}}}\n'
+        return StreamingResponse(frames(), media_type="application/x-ndjson")
+
+    client = TestClient(app)
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == '"big-gzip"'
+    assert len(response.json()["jobs"]) == 100
+    assert client.get("/big", headers={"Accept-Encoding": "identity"}).headers["etag"] == '"big"'
+    assert "content-encoding" not in client.get("/big", headers={"Accept-Encoding": "gzip;q=0"}).headers
+    response = client.get("/big", headers={"Accept-Encoding": "gzip", "If-None-Match": '"big-gzip"'})
+    assert response.status_code == 304 and response.headers["etag"] == '"big-gzip"'
+
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert len(response.text.splitlines()) == 3
+
+@pytest.mark.asyncio
+async def test_encoded_body_cache():
+    """Test that bodies are encoded once per key and served pre-compressed."""
+    cache = EncodedBodyCache(size=2)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return {"jobs": ["Software Engineer"] * 100}
+
+    gzip_headers = Headers({"accept-encoding": "gzip"})
+    first = await cache.response(gzip_headers, ("jobs", 1), build, headers={"ETag": '"1"'})
+    second = await cache.response(Headers({}), ("jobs", 1), build)
+    assert len(builds) == 1
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["etag"] == '"1-gzip"'
+    assert gzip.decompress(first.body) == second.body
+    assert json.loads(second.body)["jobs"][0] == "Software Engineer"
+
+    await cache.response(gzip_headers, ("jobs", 2), build)
+    await cache.response(gzip_headers, ("jobs", 3), build)
+    assert len(cache) == 2
+    await cache.response(gzip_headers, ("jobs", 1), build)
+    assert len(builds) == 4, "Least recently used body should have been evicted"
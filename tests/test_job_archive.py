@@ -0,0 +1,87 @@
+"""
+Test file for the columnar job observation archive.
+"""
+
+import pytest
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.job import JobListing
+from services import job_archive
+from services.job_archive import InvalidArchiveQuery, JobArchive
+
+def make_job(title: str, company: str, location: str = "Toronto, Ontario, Canada",
+             posted_date: datetime = None) -> JobListing:
+    """Create a LinkedIn-style job listing for testing."""
+    return JobListing(title=title, company=company, location=location, url="https://example.com",
+                      source="linkedin", posted_date=posted_date)
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    """Create an archive with observations over two months, scanned in small blocks."""
+    monkeypatch.setattr(job_archive, "SCAN_BLOCK_ROWS", 2)
+    archive = JobArchive(str(tmp_path / "archive"))
+    archive.append([make_job("Engineer", "Acme"), make_job("Analyst", "Shopify", "Remote")],
+                   observed_at=datetime(2024, 4, 29, 6))
+    archive.append([make_job("Engineer", "ACME ", posted_date=datetime(2024, 4, 30)),
+                    make_job("Engineer", "Shopify")], observed_at=datetime(2024, 4, 30, 6))
+    archive.append([make_job("Designer", "acme", posted_date=datetime(2024, 5, 1))],
+                   observed_at=datetime(2024, 5, 6, 6))
+    return archive
+
+def test_group_by_and_filters(archive):
+    """Test counts with dictionary filters, time windows and partition pruning."""
+    assert archive.count_by("company") == [("Acme", 3), ("Shopify", 2)]
+    assert archive.count_by("title", filters={"company": "acme"}) == [("Engineer", 2), ("Designer", 1)]
+    assert archive.count_by("company", since=datetime(2024, 4, 30), until=datetime(2024, 5, 1)) == [
+        ("Acme", 1), ("Shopify", 1)]
+    assert archive.count_by("company", since=datetime(2024, 5, 1)) == [("Acme", 1)]
+    assert archive.count_by("company", remote=True) == [("Shopify", 1)]
+    assert archive.count_by("company", limit=1) == [("Acme", 3)]
+    assert archive.count_by("company", filters={"company": "Initech"}) == []
+    assert archive.stats()["rows"] == 5 and archive.stats()["partitions"] == 2
+
+    with pytest.raises(InvalidArchiveQuery):
+        archive.count_by("url")
+    with pytest.raises(InvalidArchiveQuery):
+        archive.count_by("company", filters={"posted": "x"})
+
+def test_timeline_and_reopen(archive):
+    """Test day and week bins, posted dates, and reading the files from a new instance."""
+    assert archive.timeline("day") == [("2024-04-29", 2), ("2024-04-30", 2), ("2024-05-06", 1)]
+    assert archive.timeline("week") == [("2024-04-29", 4), ("2024-05-06", 1)]
+    assert archive.timeline("day", time_column="posted") == [("2024-04-30", 1), ("2024-05-01", 1)]
+
+    # A torn append leaves one column longer; it is ignored, then cut back by the next append
+    partition = os.path.join(archive.path, "2024-05")
+    with open(os.path.join(partition, "company.u4"), "ab") as f:
+        f.write(b"\x00\x00\x00\x00")
+    reopened = JobArchive(archive.path)
+    assert reopened.count_by("company", since=datetime(2024, 5, 1)) == [("Acme", 1)]
+    reopened.append([make_job("Engineer", "Initech")], observed_at=datetime(2024, 5, 7))
+    assert archive.count_by("company", since=datetime(2024, 5, 1)) == [("Acme", 1), ("Initech", 1)]
+
+def test_queries_while_appending(tmp_path):
+    """Test that scans in other threads see every dictionary value exactly once while rows are appended."""
+    archive = JobArchive(str(tmp_path / "archive"))
+    observed_at = datetime(2024, 5, 1)
+
+    def query():
+        for _ in range(50):
+            archive.count_by("company")
+
+    with ThreadPoolExecutor(4) as pool:
+        queries = [pool.submit(query) for _ in range(4)]
+        for i in range(50):
+            archive.append([make_job("Engineer", f"Company {i}")], observed_at=observed_at)
+        for future in queries:
+            future.result()
+
+    values = archive.dictionaries["company"].values
+    assert values == [f"Company {i}" for i in range(50)]
+    assert archive.count_by("company", limit=1) == [("Company 0", 1)]
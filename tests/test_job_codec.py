@@ -0,0 +1,51 @@
+import base64
+import pytest
+import sys
+import os
+from datetime import datetime
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import msgpack
+
+from models.job import JobListing, job_url
+from models.messages import JobChunk
+from services.job_codec import FORMAT_VERSION, encode_jobs, pack_jobs, unpack_jobs
+from services.result_stream import PACKED_ENCODING, ChunkAssembler, chunk_payload
+from services.serialization import dumps
+
+def test_round_trip_and_size():
+    """Test that packed jobs decode to equal listings and are smaller than JSON."""
+    jobs = [
+        JobListing(title="Engineer", company="Acme", location="Toronto", url=job_url("linkedin", "1"),
+                   source="linkedin", job_id="1"),
+        JobListing(title="Analyst", company="Initech", location="Remote", url="https://example.com/jobs/2",
+                   source="indeed", job_id="2", description="Numbers", requirements=["SQL", "Excel"],
+                   salary_range="$80k", posted_date=datetime(2024, 5, 1, 9, 30), is_remote=True,
+                   num_applicants="25"),
+        JobListing(title="Designer", company="Acme", location="Toronto", url=job_url("linkedin", "3"),
+                   source="linkedin", is_remote=False),
+    ]
+    data = pack_jobs(jobs)
+    decoded = unpack_jobs(data)
+    assert decoded == jobs
+    assert [job.dict() for job in decoded] == [job.dict() for job in jobs]
+    assert decoded[0].__fields_set__ >= {"title", "url", "source"}
+    assert len(data) < len(dumps(jobs)) / 2
+    # A URL derived from the job ID is not stored
+    assert encode_jobs(jobs[:1]) == [["Engineer", "Acme", "Toronto", None, 0, "1"]]
+
+    # Packed chunks reassemble like JSON ones
+    assembler = ChunkAssembler("r")
+    assembler.add(JobChunk(request_id="r", sequence=0, final=True, **chunk_payload(jobs, PACKED_ENCODING)))
+    assert assembler.complete and assembler.jobs == jobs
+
+def test_rejects_malformed_data():
+    """Test that unknown versions and malformed buffers raise ValueError."""
+    with pytest.raises(ValueError):
+        unpack_jobs(msgpack.packb([FORMAT_VERSION + 1, []]))
+    with pytest.raises(ValueError):
+        unpack_jobs(b"\xc1")
+    with pytest.raises(ValueError):
+        unpack_jobs(base64.b64encode(b"not msgpack"))
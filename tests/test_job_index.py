@@ -0,0 +1,72 @@
+"""
+Test file for the inverted job index.
+"""
+
+import pytest
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.job import JobListing
+from services.job_index import JobIndex, job_terms
+
+def make_job(job_id: str, title: str, company: str = "Acme Corp",
+             location: str = "Toronto, Ontario, Canada", **kwargs) -> JobListing:
+    """Create a LinkedIn-style job listing for testing."""
+    return JobListing(
+        title=title,
+        company=company,
+        location=location,
+        url=f"https://www.linkedin.com/jobs/view/{job_id}",
+        source="linkedin",
+        job_id=job_id,
+        **kwargs
+    )
+
+@pytest.fixture
+def index() -> JobIndex:
+    """Create an index over a small job corpus."""
+    index = JobIndex()
+    jobs = [
+        make_job("1", "Python Developer"),
+        make_job("2", "Senior Python Developer", company="Shopify", location="Remote"),
+        make_job("3", "Accountant", location="Vancouver, British Columbia, Canada"),
+        make_job("4", "Data Engineer", description="Python and SQL pipelines"),
+    ]
+    for doc_id, job in enumerate(jobs):
+        index.add(doc_id, job)
+    return index
+
+def test_job_terms():
+    """Test the terms extracted from a job."""
+    terms = job_terms(make_job("1", "Python Developer", requirements=["Python 3"]))
+    assert terms["title:python"] == 1
+    assert terms["text:python"] == 1
+    assert terms["loc:toronto"] == 1
+    assert terms["company:acme corp"] == 1
+    assert "remote" not in terms
+
+def test_intersect(index):
+    """Test posting list intersection."""
+    assert index.intersect(["title:python", "title:developer"]) == [0, 1]
+    assert index.intersect(["title:python", "loc:toronto"]) == [0]
+    assert index.intersect(["title:python", "title:unknown"]) == []
+
+def test_search(index):
+    """Test BM25 candidate retrieval."""
+    candidates = list(index.search({"title:python": 1.0, "text:python": 1.0}, limit=10))
+    assert set(candidates) == {0, 1, 3}
+    assert 2 not in candidates
+
+    assert list(index.search({"title:python": 1.0}, limit=1)) in ([0], [1])
+    assert list(index.search({"title:python": 1.0}, limit=10, required=["remote"])) == [1]
+
+def test_incremental_add(index):
+    """Test that new jobs are searchable without a rebuild."""
+    index.add(4, make_job("5", "Python Tutor", location="Remote"))
+    assert index.intersect(["title:python", "remote"]) == [1, 4]
+
+    with pytest.raises(ValueError):
+        index.add(10, make_job("6", "Out of order"))
@@ -9,11 +9,14 @@ import sys
 import os
 import logging
 import time
+from aiohttp import web
+from aiohttp.test_utils import TestServer
 
 # Add the parent directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from agents.job_scraper_agent import JobScraperAgent
+from benchmarks.fake_linkedin import FakeLinkedIn
 from models.job import JobListing
 
 # Configure logging
@@ -50,6 +53,10 @@ async def test_construct_linkedin_url(scraper):
     assert "location=New+York" in url
     assert "start=0" in url
 
+    # Without a location, the parameter is left out
+    url = scraper._construct_linkedin_url(search_terms=["data scientist"], location=None, remote_only=False)
+    assert "location=" not in url and "start=0" in url
+
 @pytest.mark.asyncio
 async def test_scrape_linkedin_actual_request(scraper):
     """Test actual LinkedIn scraping with real requests."""
@@ -142,5 +149,72 @@ async def test_scrape_linkedin_rate_limiting(scraper):
     # Verify rate limiting (should be at least 1 second between requests)
     assert time_diff >= 1.0, "Rate limiting not working properly"
 
+def linkedin_card(job_id: str, title: str) -> str:
+    """Render one search result card the way the LinkedIn guest API does."""
+    return (
+        f'<li><div class="base-card" data-entity-urn="urn:li:jobPosting:{job_id}">'
+        f'<h3 class="base-search-card__title">{title}</h3>'
+        f'<h4 class="base-search-card__subtitle">Acme</h4>'
+        f'<ul><li>Benefit</li></ul>'
+        f'<span class="job-search-card__location">Toronto, Ontario, Canada</span>'
+        f'</div></li>\n'
+    )
+
+@pytest.mark.asyncio
+async def test_iter_linkedin_streams_cards(scraper, monkeypatch):
+    """Test that cards are yielded as they arrive, before the page is complete."""
+    release = asyncio.Event()
+    body = linkedin_card("1", "Python Developer") + linkedin_card("2", "Data Engineer")
+
+    async def handler(request):
+        response = web.StreamResponse(headers={"Content-Type": "text/html; charset=utf-8"})
+        await response.prepare(request)
+        # Split the first card mid-tag, then hold the rest of the page back
+        first = body.index("</li>\n") + 3
+        await response.write(body[:first].encode())
+        await response.write(body[first:body.index("<li", first) + 5].encode())
+        await release.wait()
+        await response.write(body[body.index("<li", first) + 5:].encode())
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_get("/search", handler)
+    async with TestServer(app) as server:
+        monkeypatch.setattr(scraper, "_construct_linkedin_url", lambda *args: str(server.make_url("/search")))
+        stream = scraper.iter_linkedin(["Python"], "Toronto", False, max_results=10)
+
+        first = await asyncio.wait_for(stream.__anext__(), timeout=5)
+        assert first.job_id == "1"
+        assert first.title == "Python Developer"
+        assert first.url == "https://www.linkedin.com/jobs/view/1"
+
+        release.set()
+        rest = [job async for job in stream]
+        assert [job.job_id for job in rest] == ["2"]
+
+@pytest.mark.asyncio
+async def test_scrape_linkedin_offline(scraper):
+    """Test scraping the recorded fixture pages from the local stand-in."""
+    async with FakeLinkedIn(chunk_size=512) as server:
+        scraper.base_url = server.url
+        jobs = await scraper.scrape_linkedin(["Python Developer"], "Toronto", False, max_results=25)
+        again = await scraper.scrape_linkedin(["Python Developer"], "Toronto", False, max_results=25)
+
+    assert len(jobs) == server.page_size
+    assert all(job.job_id and job.title and job.company and job.location for job in jobs)
+    # The same query is always answered with the same page
+    assert [job.job_id for job in again] == [job.job_id for job in jobs]
+
+@pytest.mark.asyncio
+async def test_scrape_linkedin_offline_throttled(scraper):
+    """Test that 429s and server errors yield no jobs instead of raising."""
+    async with FakeLinkedIn(throttle_rate=0.5, error_rate=0.5) as server:
+        scraper.base_url = server.url
+        results = [await scraper.scrape_linkedin(["Python"], "Toronto", False, 10) for _ in range(4)]
+
+    assert results == [[], [], [], []]
+    assert server.throttled + server.errors == server.requests == 4
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"]) 
\ No newline at end of file
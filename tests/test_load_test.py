@@ -0,0 +1,46 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.load_test import EndpointStats, Workload, parse_mix, parse_server_timing, regressions
+
+def test_workload_and_measurements():
+    """Test the request mix, created users being reused, and the per-endpoint summary."""
+    workload = Workload(parse_mix("profile_create=1,profile_read=1"), ["bench0"], seed=1)
+    requests = [workload.next_request() for _ in range(200)]
+    assert {name for name, *_ in requests} == {"profile_create", "profile_read"}
+    created = [body["user_id"] for name, method, path, body in requests if name == "profile_create"]
+    assert created[0] == "load1" and len(set(created)) == len(created)
+    assert any(path == f"/profiles/{created[0]}" for name, method, path, body in requests if method == "GET")
+    with pytest.raises(ValueError):
+        Workload({"jobs_delete": 1}, ["bench0"])
+
+    assert parse_server_timing('parse;desc="3 calls";dur=1.5, validate;dur=0.5, total;dur=4.0') == {
+        "parse": 1.5, "validate": 0.5, "total": 4.0
+    }
+    stats = EndpointStats()
+    for i in range(100):
+        stats.record(0.01 if i < 98 else 0.5, 200 if i else 503, "total;dur=2.0")
+    summary = stats.summary(seconds=10)
+    assert summary["throughput_rps"] == 10 and summary["error_rate"] == 0.01
+    assert summary["p50_ms"] == 10 and summary["p99_ms"] == 500
+    assert summary["server_ms"] == {"total": 2.0}
+
+def test_regressions():
+    """Test that only changes beyond the tolerance and noise floor are flagged."""
+    def document(**endpoint):
+        base = {"count": 100, "throughput_rps": 10, "error_rate": 0.0, "p50_ms": 10, "p95_ms": 20, "p99_ms": 40}
+        return {"results": {"endpoints": {"jobs_read": {**base, **endpoint}}}}
+
+    baseline = document()
+    assert regressions(baseline, document(p50_ms=11, p99_ms=41.5, error_rate=0.005), 0.2) == []
+    assert regressions(baseline, document(p95_ms=30, throughput_rps=7, error_rate=0.05), 0.2) == [
+        "jobs_read.p95_ms: 20 -> 30",
+        "jobs_read.throughput_rps: 10 -> 7",
+        "jobs_read.error_rate: 0 -> 0.05",
+    ]
+    # Too few requests for percentiles to mean much
+    assert regressions(baseline, document(count=10, throughput_rps=10, p99_ms=400), 0.2) == []
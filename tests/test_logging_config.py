@@ -0,0 +1,64 @@
+import json
+import logging
+import queue
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import tracing
+from services.logging_config import DROPPED, JsonFormatter, NonBlockingQueueHandler, RateLimitedLog, parse_levels
+
+def make_logger(name, maxsize):
+    """A logger whose records land on a bounded queue."""
+    records = queue.Queue(maxsize)
+    logger = logging.getLogger(name)
+    logger.handlers = [NonBlockingQueueHandler(records)]
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    return logger, records
+
+def test_queued_records_are_structured():
+    """Test that queued records carry their arguments, extra fields and trace ID as JSON, and overflow is dropped."""
+    logger, records = make_logger("test.structured", 2)
+    trace = tracing.Tracer().start_trace("request")
+    args = ["python"]
+    with tracing.activate(trace.root):
+        logger.info("Searched %s", args, extra={"cards": 10})
+    args.append("changed after logging")
+    try:
+        raise ValueError("bad card")
+    except ValueError:
+        logger.exception("Parse failed")
+
+    dropped = DROPPED._default.value
+    logger.info("No room for this one")
+    assert DROPPED._default.value == dropped + 1
+
+    entry = json.loads(JsonFormatter().format(records.get_nowait()))
+    assert entry["msg"] == "Searched ['python']"
+    assert entry["cards"] == 10
+    assert entry["trace_id"] == trace.trace_id
+    assert entry["level"] == "INFO" and entry["logger"] == "test.structured"
+    entry = json.loads(JsonFormatter().format(records.get_nowait()))
+    assert "ValueError: bad card" in entry["exc"]
+    assert "trace_id" not in entry
+
+def test_rate_limited_log():
+    """Test that repeats within the interval are suppressed and counted on the next record."""
+    logger, records = make_logger("test.rate_limited", 10)
+    errors = RateLimitedLog(logger, interval=60)
+    for _ in range(5):
+        errors.log(logging.ERROR, 429, "LinkedIn returned status code: %s", 429)
+    errors.log(logging.ERROR, 500, "LinkedIn returned status code: %s", 500)
+    assert records.qsize() == 2
+
+    errors._last[429] -= 60
+    errors.log(logging.ERROR, 429, "LinkedIn returned status code: %s", 429)
+    records.get_nowait(), records.get_nowait()
+    assert records.get_nowait().suppressed == 4
+
+    assert parse_levels("agents.job_scraper_agent=warning, uvicorn.access=ERROR") == {
+        "agents.job_scraper_agent": "WARNING", "uvicorn.access": "ERROR"
+    }
@@ -0,0 +1,71 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from agents.job_scraper_agent import CARDS_DROPPED, JobScraperAgent
+from services.metrics import Registry, hit_ratio_samples, timed
+
+def test_render_counters_and_histograms():
+    """Test the text exposition of labelled counters and cumulative histogram buckets."""
+    registry = Registry()
+    responses = registry.counter("responses", "Responses by status", ["status"])
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    responses.labels(200).inc()
+    responses.labels(200).inc()
+    responses.labels('say "hi"').inc()
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value)
+    registry.collector("ratio", "gauge", "Hit ratio", lambda: hit_ratio_samples({"a": (3, 1), "unused": (0, 0)}))
+
+    lines = registry.render().splitlines()
+    assert "# TYPE responses_total counter" in lines
+    assert 'responses_total{status="200"} 2' in lines
+    assert 'responses_total{status="say \\"hi\\""} 1' in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_count 4" in lines
+    assert "latency_seconds_sum 4.05" in lines
+    assert 'ratio{cache="a"} 0.75' in lines
+    assert not any("unused" in line for line in lines)
+
+    # Re-registering returns the same metric, but not with different labels
+    assert registry.counter("responses", "Responses by status", ["status"]) is responses
+    with pytest.raises(ValueError):
+        registry.counter("responses", "Responses", ["code"])
+
+@pytest.mark.asyncio
+async def test_timed():
+    """Test that sync and async functions are timed, including when they raise."""
+    registry = Registry()
+    histogram = registry.histogram("op_seconds", "Operation latency", ["kind"])
+
+    @timed(histogram.labels("sync"))
+    def fail():
+        raise RuntimeError("boom")
+
+    @timed(histogram.labels("async"))
+    async def succeed():
+        return 42
+
+    with pytest.raises(RuntimeError):
+        fail()
+    assert await succeed() == 42
+    assert sum(histogram.labels("sync").counts) == 1
+    assert sum(histogram.labels("async").counts) == 1
+
+def test_dropped_cards_counted():
+    """Test that cards missing required elements are counted by reason."""
+    scraper = JobScraperAgent()
+    missing = CARDS_DROPPED.labels("missing_elements")
+    no_card = CARDS_DROPPED.labels("no_base_card")
+    before = missing.value, no_card.value
+
+    card = '<li><div class="base-card" data-entity-urn="urn:li:jobPosting:1"><h3 class="base-search-card__title">Dev</h3></div></li>'
+    assert scraper._parse_linkedin_job(BeautifulSoup(card, "html.parser")) is None
+    assert scraper._parse_linkedin_job(BeautifulSoup("<li>ad</li>", "html.parser")) is None
+    assert (missing.value, no_card.value) == (before[0] + 1, before[1] + 1)
@@ -14,7 +14,7 @@ from typing import Dict
 # Add the parent directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from agents.profile_agent import ProfileAgent
+from agents.profile_agent import ProfileAgent, PROFILES_JOURNAL_FILE, VERSION_MISMATCH
 from models.user_profile import UserProfile
 from models.messages import AgentResponse
 
@@ -29,6 +29,8 @@ def profile_agent():
     # Clean up any existing profiles.json to start fresh
     if os.path.exists("profiles.json"):
         os.remove("profiles.json")
+    if os.path.exists(PROFILES_JOURNAL_FILE):
+        os.remove(PROFILES_JOURNAL_FILE)
     return agent
 
 @pytest.fixture
@@ -185,5 +187,97 @@ async def test_profile_persistence(profile_agent, sample_profile):
     
     logger.info("Profile persistence test passed")
 
+@pytest.mark.asyncio
+async def test_patch_profile(profile_agent, sample_profile):
+    """Test partial profile updates with optimistic concurrency."""
+    logger.info("Testing profile patches...")
+    
+    created = await profile_agent.create_profile(sample_profile)
+    version = created.version
+    assert version is not None
+    
+    # Patch a single field against the current version
+    response = await profile_agent.patch_profile(
+        sample_profile["user_id"],
+        {"weekly_application_goal": 14},
+        expected_version=version
+    )
+    assert response.status == "success", "Profile patch should succeed"
+    assert response.version == version + 1
+    assert response.profile["weekly_application_goal"] == 14
+    assert response.profile["name"] == sample_profile["name"]
+    
+    # A stale version must be rejected without applying the change
+    response = await profile_agent.patch_profile(
+        sample_profile["user_id"],
+        {"name": "Stale Write"},
+        expected_version=version
+    )
+    assert response.status == "error"
+    assert response.message == VERSION_MISMATCH
+    assert response.version == version + 1
+    
+    # Invalid values and immutable fields are rejected
+    response = await profile_agent.patch_profile(
+        sample_profile["user_id"],
+        {"weekly_application_goal": "many"}
+    )
+    assert response.status == "error"
+    assert response.message == "Invalid profile data"
+    
+    response = await profile_agent.patch_profile(
+        sample_profile["user_id"],
+        {"user_id": "someone_else"}
+    )
+    assert response.status == "error"
+    
+    # A no-op patch does not bump the version
+    response = await profile_agent.patch_profile(
+        sample_profile["user_id"],
+        {"weekly_application_goal": 14}
+    )
+    assert response.version == version + 1
+    
+    logger.info("Profile patch test passed")
+
+@pytest.mark.asyncio
+async def test_patch_persistence(profile_agent, sample_profile):
+    """Test that journaled patches survive a reload."""
+    logger.info("Testing patch persistence...")
+    
+    await profile_agent.create_profile(sample_profile)
+    patched = await profile_agent.patch_profile(sample_profile["user_id"], {"skills": ["Rust"]})
+    assert os.path.exists(PROFILES_JOURNAL_FILE), "Patch should be journaled"
+    
+    new_agent = ProfileAgent()
+    response = await new_agent.get_profile(sample_profile["user_id"])
+    assert response.profile["skills"] == ["Rust"]
+    assert response.version == patched.version
+    
+    logger.info("Patch persistence test passed")
+
 if __name__ == "__main__":
-    pytest.main([__file__, "-v"]) 
\ No newline at end of file
+    pytest.main([__file__, "-v"]) 
+@pytest.mark.asyncio
+async def test_agents_share_profile_files(sample_profile, tmp_path, monkeypatch):
+    """Test that two agents (as in two API workers) see each other's changes."""
+    monkeypatch.chdir(tmp_path)
+    worker_a, worker_b = ProfileAgent(), ProfileAgent()
+    notified = []
+    worker_b.add_listener(lambda user_id, fields: notified.append((user_id, fields)))
+
+    created = await worker_a.create_profile(sample_profile)
+    assert (await worker_b.get_profile("test123")).version == created.version
+
+    patched = await worker_a.patch_profile("test123", {"name": "Worker A"})
+    response = await worker_b.get_profile("test123")
+    assert response.profile["name"] == "Worker A"
+    assert response.version == patched.version
+    assert ("test123", ["name"]) in notified
+
+    # Writes from either side continue the same version sequence
+    stale = await worker_b.patch_profile("test123", {"name": "Stale"}, expected_version=created.version)
+    assert stale.message == VERSION_MISMATCH
+    response = await worker_b.patch_profile("test123", {"name": "Worker B"}, expected_version=patched.version)
+    assert response.version == patched.version + 1
+    assert worker_a.get_version("test123")[0] == response.version
@@ -0,0 +1,64 @@
+import asyncio
+import pstats
+import pytest
+import sys
+import os
+import time
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.profiling import DONE, ProfilerBusy, ProfilingHooks
+
+def busy_work():
+    return sum(i * i for i in range(20000))
+
+@pytest.mark.asyncio
+async def test_request_capture(tmp_path):
+    """Test that exactly the armed number of requests is profiled and the result loads in pstats."""
+    hooks = ProfilingHooks(sample_interval=0.001)
+    capture = hooks.arm_requests(2)
+    with pytest.raises(ProfilerBusy):
+        hooks.arm_scheduler_run()
+
+    async def handle():
+        with hooks.request():
+            await asyncio.sleep(0.01)
+            busy_work()
+
+    await asyncio.gather(handle(), handle(), handle())
+    assert capture.status == DONE
+    assert capture.completed == 2
+    assert hooks.current is None and not hooks.requests_armed
+
+    path = tmp_path / "capture.pstats"
+    path.write_bytes(capture.pstats_bytes())
+    stats = pstats.Stats(str(path))
+    assert any(name == "busy_work" for _, _, name in stats.stats)
+
+@pytest.mark.asyncio
+async def test_scheduler_run_and_sampling():
+    """Test the scheduler decorator and a timed sampling capture."""
+    hooks = ProfilingHooks(sample_interval=0.001)
+
+    @hooks.scheduler_run
+    async def run():
+        busy_work()
+        return "ran"
+
+    assert await run() == "ran"  # Unarmed runs are not recorded
+    capture = hooks.arm_scheduler_run()
+    assert await run() == "ran"
+    assert capture.status == DONE and capture.completed == 1
+    assert capture.samples > 0
+
+    capture = hooks.start_sampling(0.2)
+    deadline = time.monotonic() + 0.3
+    while time.monotonic() < deadline:
+        busy_work()
+    await asyncio.sleep(0.05)
+    assert capture.status == DONE and capture.profile is None
+    lines = capture.collapsed().splitlines()
+    assert any("test_profiling.py:busy_work" in line for line in lines)
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0 and " " not in stack
@@ -0,0 +1,77 @@
+"""
+Test file for the materialized recommendation cache.
+"""
+
+import pytest
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.job import JobListing
+from services.recommendation_cache import RecommendationCache
+from services.recommender import JobRecommender
+
+def make_job(job_id: str, title: str, location: str = "Toronto, Ontario, Canada") -> JobListing:
+    """Create a LinkedIn-style job listing for testing."""
+    return JobListing(
+        title=title,
+        company="Acme",
+        location=location,
+        url=f"https://www.linkedin.com/jobs/view/{job_id}",
+        source="linkedin",
+        job_id=job_id
+    )
+
+@pytest.fixture
+def profile() -> dict:
+    """Create a sample profile dict."""
+    return {
+        "skills": ["Python"],
+        "preferred_roles": ["Data Scientist"],
+        "preferred_locations": ["Toronto"],
+        "remote_preference": False
+    }
+
+@pytest.fixture
+def cache(profile) -> RecommendationCache:
+    """Create a cache holding one user's ranking over a small corpus."""
+    recommender = JobRecommender()
+    recommender.add_jobs([
+        make_job("1", "Data Scientist"),
+        make_job("2", "Python Developer", location="Vancouver, British Columbia, Canada"),
+    ])
+    cache = RecommendationCache(size=2)
+    cache.store("user1", profile, recommender.recommend(profile, 2))
+    return cache
+
+def test_store_and_get(cache):
+    """Test that stored rankings are served as-is."""
+    entry = cache.get("user1")
+    assert [job.job_id for job in entry.jobs] == ["1", "2"]
+    assert entry.scores == sorted(entry.scores, reverse=True)
+    assert cache.get("user2") is None
+
+def test_new_job_merged_when_it_ranks(cache):
+    """Test that a better new job is merged without a recompute."""
+    assert cache.add_jobs([make_job("3", "Senior Data Scientist")]) == 1
+    assert [job.job_id for job in cache.get("user1").jobs] == ["1", "3"]
+
+def test_unrelated_job_ignored(cache):
+    """Test that jobs sharing no terms with the user leave the entry alone."""
+    before = cache.get("user1").timestamp
+    assert cache.add_jobs([make_job("4", "Accountant", location="Paris, France")]) == 0
+    assert [job.job_id for job in cache.get("user1").jobs] == ["1", "2"]
+    assert cache.get("user1").timestamp == before
+
+def test_invalidation_by_field(cache):
+    """Test that only ranking-relevant profile changes invalidate the entry."""
+    cache.invalidate("user1", ["name", "email"])
+    assert cache.get("user1") is not None
+    assert cache.pop_dirty() == []
+
+    cache.invalidate("user1", ["skills"])
+    assert cache.get("user1") is None
+    assert cache.pop_dirty() == ["user1"]
+    assert cache.add_jobs([make_job("5", "Data Scientist")]) == 0
@@ -0,0 +1,158 @@
+"""
+Test file for the job recommendation engine and RecommendationAgent.
+"""
+
+import pytest
+import sys
+import os
+import logging
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.recommendation_agent import RecommendationAgent
+from models.job import JobListing
+from services.recommender import JobRecommender, tokenize
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def make_job(job_id: str, title: str, location: str = "Toronto, Ontario, Canada", **kwargs) -> JobListing:
+    """Create a LinkedIn-style job listing for testing."""
+    return JobListing(
+        title=title,
+        company="Acme",
+        location=location,
+        url=f"https://www.linkedin.com/jobs/view/{job_id}",
+        source="linkedin",
+        job_id=job_id,
+        **kwargs
+    )
+
+@pytest.fixture
+def sample_profile() -> dict:
+    """Create a sample profile dict for testing."""
+    return {
+        "user_id": "rec123",
+        "skills": ["Python", "Machine Learning"],
+        "preferred_roles": ["Data Scientist"],
+        "preferred_locations": ["Toronto"],
+        "remote_preference": False
+    }
+
+@pytest.fixture
+def jobs() -> list:
+    """Create a small job corpus."""
+    return [
+        make_job("1", "Accountant", location="Paris, Ile-de-France, France"),
+        make_job("2", "Senior Data Scientist"),
+        make_job("3", "Python Developer", location="Vancouver, British Columbia, Canada"),
+        make_job("4", "Data Scientist", location="London, England, United Kingdom"),
+    ]
+
+def test_tokenize():
+    """Test free text tokenization."""
+    assert tokenize("Senior C++ Developer, Node.js") == ["senior", "c++", "developer", "node.js"]
+    assert tokenize("Head of Engineering") == ["head", "engineering"]
+    assert tokenize(None) == []
+
+def test_recommend_orders_by_match(sample_profile, jobs):
+    """Test that the best matching jobs are returned first."""
+    recommender = JobRecommender()
+    assert recommender.add_jobs(jobs) == 4
+    assert recommender.add_jobs(jobs[:1]) == 0, "Known jobs should not be added twice"
+
+    ranked = recommender.recommend(sample_profile, 3)
+    assert [job.job_id for job, _ in ranked] == ["2", "4", "3"]
+    scores = [score for _, score in ranked]
+    assert scores == sorted(scores, reverse=True)
+    assert all(score > 0 for score in scores)
+
+def test_recommend_incremental(sample_profile, jobs):
+    """Test that jobs added after scoring are picked up."""
+    recommender = JobRecommender()
+    recommender.add_jobs(jobs[:1])
+    assert recommender.recommend(sample_profile, 5) == []
+
+    recommender.add_jobs(jobs[1:])
+    ranked = recommender.recommend(sample_profile, 1)
+    assert ranked[0][0].job_id == "2"
+
+@pytest.mark.asyncio
+async def test_agent_recommend(sample_profile, jobs, tmp_path, monkeypatch):
+    """Test recommendations through the agent."""
+    # Keep the agent's profile store out of the working tree
+    monkeypatch.chdir(tmp_path)
+    agent = RecommendationAgent()
+    await agent.profile_agent.create_profile({
+        **sample_profile,
+        "name": "Rec User",
+        "email": "rec@example.com",
+        "experience_years": 2.0,
+        "weekly_application_goal": 5,
+        "preferred_industries": ["Technology"]
+    })
+    agent.add_jobs(jobs)
+
+    response = await agent.recommend(sample_profile["user_id"], 2)
+    assert response.status == "success"
+    assert [job.job_id for job in response.recommendations] == ["2", "4"]
+    assert len(response.match_scores) == 2
+
+    response = await agent.recommend("missing_user", 2)
+    assert response.status == "error"
+
+def test_radius_finds_local_copies(sample_profile, tmp_path, monkeypatch):
+    """Test that a role collapsed onto a copy in another city is found near its local copy."""
+    monkeypatch.chdir(tmp_path)
+    agent = RecommendationAgent()
+    description = "Build machine learning models in Python for our forecasting team"
+    assert agent.add_jobs([make_job("1", "Data Scientist", location="Vancouver, British Columbia, Canada",
+                                    description=description)]) == 1
+    assert agent.add_jobs([make_job("2", "Data Scientist", description=description)]) == 0
+
+    ranked = agent.rank_profile(sample_profile, 5, radius_km=50)
+    assert [job.job_id for job, _ in ranked] == ["1"]
+    assert agent.rank_profile({**sample_profile, "preferred_locations": ["Ottawa"]}, 5, radius_km=50) == []
+
+def test_recommend_batch_matches_single(sample_profile, jobs):
+    """Test that batch scoring agrees with per-user scoring."""
+    recommender = JobRecommender()
+    recommender.add_jobs(jobs)
+    profiles = [
+        sample_profile,
+        {**sample_profile, "preferred_locations": ["Vancouver"], "preferred_roles": []},
+        {"skills": ["Cooking"], "preferred_roles": [], "preferred_locations": []},
+    ]
+
+    batch = recommender.recommend_batch(profiles, 2, block_size=2)
+    assert len(batch) == len(profiles)
+    for profile, ranked in zip(profiles, batch):
+        expected = recommender.recommend(profile, 2)
+        assert [job.job_id for job, _ in ranked] == [job.job_id for job, _ in expected]
+        assert [score for _, score in ranked] == pytest.approx([score for _, score in expected])
+    assert batch[2] == []
+
+def test_recommend_batch_workers(sample_profile, jobs):
+    """Test that batch scoring across processes keeps input order."""
+    recommender = JobRecommender()
+    recommender.add_jobs(jobs)
+    profiles = [sample_profile, {**sample_profile, "preferred_roles": ["Accountant"]}] * 3
+
+    serial = recommender.recommend_batch(profiles, 3, block_size=1)
+    parallel = recommender.recommend_batch(profiles, 3, block_size=1, workers=2)
+    assert [[job.job_id for job, _ in ranked] for ranked in parallel] == \
+        [[job.job_id for job, _ in ranked] for ranked in serial]
+
+def test_snapshot_unaffected_by_later_jobs(sample_profile, jobs):
+    """Test that jobs added while a snapshot is scored are kept, and the snapshot still maps rows to its jobs."""
+    recommender = JobRecommender()
+    recommender.add_jobs(jobs[:2])
+    snapshot = recommender.snapshot()
+    expected = snapshot.recommend_batch([sample_profile], 5)
+
+    recommender.add_jobs(jobs[2:] + [make_job("new", "Senior Python Machine Learning Scientist")])
+    assert recommender.matrix.shape[0] == len(recommender.jobs) == len(jobs) + 1
+    assert snapshot.recommend_batch([sample_profile], 5) == expected
+    assert expected[0] and {job.job_id for job, _ in expected[0]} <= {job.job_id for job in jobs[:2]}
@@ -0,0 +1,134 @@
+import asyncio
+import functools
+import pytest
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import job_scraper_agent
+from agents.job_scraper_agent import JobScraperAgent
+from benchmarks.fake_linkedin import FakeLinkedIn
+from models.job import JobListing
+from models.messages import JobChunk, JobScraperMessage
+from services.result_stream import ChunkAssembler, CreditWindow, StreamCancelled, chunk_jobs
+
+def make_job(i, description=None):
+    return JobListing(
+        title=f"Engineer {i}", company="Acme", location="Toronto", url=f"https://example.com/{i}",
+        source="linkedin", job_id=str(i), description=description
+    )
+
+async def iterate(items):
+    for item in items:
+        yield item
+
+@pytest.mark.asyncio
+async def test_chunks_window_and_assembly():
+    """Test chunk bounds, the credit window, and reassembly of out-of-order chunks."""
+    jobs = [make_job(i) for i in range(7)] + [make_job(7, "x" * 5000), make_job(8)]
+    chunks = [chunk async for chunk in chunk_jobs(iterate(jobs), max_jobs=3, max_bytes=2000)]
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1, 1, 1]
+    assert [job for chunk in chunks for job in chunk] == jobs
+
+    window = CreditWindow(window=2, timeout=0.05)
+    await window.wait_to_send(1)
+    waiter = asyncio.create_task(window.wait_to_send(2))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    window.ack(0)
+    await waiter
+    with pytest.raises(StreamCancelled):
+        await window.wait_to_send(3)  # Nothing acknowledges chunk 1
+    window.ack(1, cancel=True)
+    with pytest.raises(StreamCancelled):
+        await window.wait_to_send(2)
+
+    assembler = ChunkAssembler("r1")
+    assert assembler.ack() is None
+    final = JobChunk(request_id="r1", sequence=2, final=True, total=3)
+    assert assembler.add(final) == []
+    assert assembler.add(JobChunk(request_id="r1", sequence=1, jobs=jobs[1:3])) == []
+    assert not assembler.complete
+    assert assembler.add(JobChunk(request_id="r1", sequence=0, jobs=jobs[:1])) == jobs[:3]
+    assert assembler.add(JobChunk(request_id="r1", sequence=0, jobs=jobs[:1])) == []  # Duplicate
+    assert assembler.complete and assembler.final is final
+    assert assembler.ack().sequence == 2
+
+@pytest.mark.asyncio
+async def test_agent_streams_with_backpressure(monkeypatch):
+    """Test that the agent streams bounded chunks no further ahead than the receiver's acks."""
+    monkeypatch.setattr(job_scraper_agent, "chunk_jobs", functools.partial(chunk_jobs, max_jobs=3))
+    agent = JobScraperAgent()
+    agent.rate_limit = 0
+    assembler = ChunkAssembler("search-1")
+    outstanding = []
+
+    async def receive(chunk):
+        # Chunks beyond the window must wait for the ack of an earlier one
+        outstanding.append(chunk.sequence)
+        assert len(outstanding) <= 2
+        assembler.add(chunk)
+        asyncio.get_running_loop().call_later(0.01, acknowledge, chunk.sequence)
+
+    def acknowledge(sequence):
+        outstanding.remove(sequence)
+        agent.streams[("receiver", "search-1")].ack(sequence)
+
+    async with FakeLinkedIn() as server:
+        agent.base_url = server.url
+        message = JobScraperMessage(source="linkedin", search_terms=["Python"], location="Toronto",
+                                    max_results=8, request_id="search-1", window=2)
+        sent = await agent.stream_jobs(message, receive, "receiver")
+
+        assert sent == 8 and assembler.complete
+        assert [len(chunk) for chunk in [assembler.jobs[:3], assembler.jobs[3:6], assembler.jobs[6:]]] == [3, 3, 2]
+        assert assembler.final.status == "success" and assembler.final.total == 8
+        # The page was cut at max_results, so the next one starts after it
+        assert assembler.final.next_cursor == 8
+        assert agent.streams == {}
+
+        failed = ChunkAssembler("search-2")
+        async def receive_failure(chunk):
+            failed.add(chunk)
+        message = JobScraperMessage(source="indeed", search_terms=["Python"], request_id="search-2")
+        assert await agent.stream_jobs(message, receive_failure, "receiver") == 0
+        assert failed.complete and failed.final.status == "error"
+
+        # A repeat of a request still streaming leaves the live stream alone
+        live = agent.streams[("receiver", "search-3")] = CreditWindow()
+        repeated = []
+        async def receive_repeat(chunk):
+            repeated.append(chunk)
+        message = JobScraperMessage(source="linkedin", search_terms=["Python"], request_id="search-3")
+        assert await agent.stream_jobs(message, receive_repeat, "receiver") == 0
+        assert repeated == [] and agent.streams == {("receiver", "search-3"): live}
+
+@pytest.mark.asyncio
+async def test_agent_streams_several_pages():
+    """Test that requests for more results than a page hold fetch pages until a short one."""
+    agent = JobScraperAgent()
+    agent.rate_limit = 0
+
+    async def stream(max_results, request_id):
+        assembler = ChunkAssembler(request_id)
+        async def receive(chunk):
+            assembler.add(chunk)
+            agent.streams[("receiver", request_id)].ack(chunk.sequence)
+        message = JobScraperMessage(source="linkedin", search_terms=["Python"], max_results=max_results,
+                                    request_id=request_id)
+        await agent.stream_jobs(message, receive, "receiver")
+        return assembler
+
+    async with FakeLinkedIn() as server:
+        agent.base_url = server.url
+        assembler = await stream(25, "search-1")
+        assert len(assembler.jobs) == 25 and assembler.final.next_cursor == 25
+        assert server.requests == 3
+
+    async with FakeLinkedIn(page_size=4) as server:
+        agent.base_url = server.url
+        assembler = await stream(25, "search-2")
+        assert len(assembler.jobs) == 4 and assembler.final.next_cursor is None
+        assert server.requests == 1
@@ -13,9 +13,8 @@ async def test_scheduler_invokes_real_agents():
     jobs = await scheduler._get_daily_jobs_for_user(user_id)
     # The test passes if no exception is raised and jobs is a list
     assert isinstance(jobs, list)
-    # Optionally, check that jobs_data is updated
-    assert user_id in scheduler.jobs_data
-    assert isinstance(scheduler.jobs_data[user_id]['jobs'], list)
-    assert isinstance(scheduler.jobs_data[user_id]['timestamp'], str)
+    # Optionally, check that delivered jobs were recorded in the job store
+    if jobs:
+        assert scheduler.job_store.get(user_id) is not None
     # Optionally, print jobs for debug
     print(f"Jobs returned for {user_id}: {jobs}") 
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+Test file for background job searches.
+"""
+
+import pytest
+import asyncio
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.job import JobListing
+from services.admission import Overloaded
+from services.search_tasks import CANCELLED, DONE, ERROR, RUNNING, SearchTaskManager
+
+def make_job(job_id: str) -> JobListing:
+    """Create a job listing for testing."""
+    return JobListing(
+        title="Python Developer",
+        company="Acme",
+        location="Toronto, Ontario, Canada",
+        url=f"https://www.linkedin.com/jobs/view/{job_id}",
+        source="linkedin",
+        job_id=job_id
+    )
+
+def slow_search(count: int, release: asyncio.Event = None, fail: bool = False):
+    """Return a search factory that yields jobs, optionally waiting for release after the first."""
+    async def search():
+        for i in range(count):
+            if i == 1 and release is not None:
+                await release.wait()
+            yield make_job(str(i))
+        if fail:
+            raise RuntimeError("LinkedIn returned status code: 429")
+    return search
+
+@pytest.mark.asyncio
+async def test_results_and_events():
+    """Test that partial results are visible and events replay then follow the search."""
+    manager = SearchTaskManager()
+    release = asyncio.Event()
+    done = []
+    task = manager.submit(slow_search(3, release), on_done=done.extend)
+
+    await asyncio.sleep(0.01)
+    assert task.status == RUNNING
+    assert [job.job_id for job in task.jobs] == ["0"]
+
+    events = manager.events(task)
+    assert (await events.__anext__())[1].job_id == "0"
+    release.set()
+    rest = [event async for event in events]
+    assert [data.job_id for event, data in rest[:-1]] == ["1", "2"]
+    assert rest[-1][0] == "summary" and rest[-1][1]["status"] == DONE
+    assert len(done) == 3
+
+@pytest.mark.asyncio
+async def test_errors_cancellation_and_ttl():
+    """Test failed and cancelled searches, and expiry of finished ones."""
+    manager = SearchTaskManager(ttl=0.05)
+    failed = manager.submit(slow_search(1, fail=True))
+    blocked = manager.submit(slow_search(2, asyncio.Event()))
+    await asyncio.sleep(0.01)
+
+    assert failed.status == ERROR
+    assert "429" in failed.error
+    assert len(failed.jobs) == 1
+
+    assert manager.cancel(blocked.search_id)
+    await asyncio.sleep(0.01)
+    assert blocked.status == CANCELLED
+
+    await asyncio.sleep(0.05)
+    assert manager.get(failed.search_id) is None
+    assert not manager.cancel(blocked.search_id)
+
+@pytest.mark.asyncio
+async def test_concurrency_limit():
+    """Test that searches beyond the pool size wait as pending."""
+    manager = SearchTaskManager(max_concurrent=1)
+    release = asyncio.Event()
+    first = manager.submit(slow_search(2, release))
+    second = manager.submit(slow_search(1))
+    await asyncio.sleep(0.01)
+    assert first.status == RUNNING
+    assert second.status == "pending"
+
+    release.set()
+    await asyncio.sleep(0.01)
+    assert first.status == DONE and second.status == DONE
+    await manager.shutdown()
+
+@pytest.mark.asyncio
+async def test_pending_limit():
+    """Test that submissions beyond the pending limit are rejected."""
+    manager = SearchTaskManager(max_concurrent=1, max_pending=1)
+    release = asyncio.Event()
+    manager.submit(slow_search(2, release))
+    manager.submit(slow_search(1))
+    with pytest.raises(Overloaded):
+        manager.submit(slow_search(1))
+    assert manager.stats()["rejected"] == 1
+    await manager.shutdown()
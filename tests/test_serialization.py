@@ -0,0 +1,54 @@
+"""
+Test file for the JSON serialization layer.
+"""
+
+import sys
+import os
+from datetime import datetime
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.compact_profile import CompactProfile
+from models.job import JobListing
+from models.messages import AgentResponse
+from models.user_profile import UserProfile
+from services.serialization import dumps, loads, select_fields
+
+def make_job() -> JobListing:
+    """Create a job listing for testing."""
+    return JobListing(
+        title="Python Developer",
+        company="Acme",
+        location="Toronto, Ontario, Canada",
+        url="https://www.linkedin.com/jobs/view/1",
+        source="linkedin",
+        job_id="1",
+        posted_date=datetime(2024, 1, 2, 3, 4, 5)
+    )
+
+def test_models_encode_like_dict():
+    """Test that models encode to the same JSON as their .dict()."""
+    job = make_job()
+    expected = {**job.dict(), "posted_date": "2024-01-02T03:04:05"}
+    assert loads(dumps(job)) == expected
+
+    response = AgentResponse(status="success", message="ok", jobs=[job])
+    assert response.jobs[0] is job, "Listings should be shared, not copied"
+    assert loads(dumps(response))["jobs"] == [expected]
+
+def test_compact_profile_and_field_selection():
+    """Test compact profile expansion and field subsets."""
+    profile = CompactProfile.from_profile(UserProfile(
+        user_id="user1",
+        name="Test User",
+        email="test@example.com",
+        skills=["Python"],
+        experience_years=3,
+        preferred_roles=["Backend Developer"],
+        preferred_locations=["Toronto"],
+        weekly_application_goal=5,
+        preferred_industries=["Technology"]
+    ))
+    assert loads(dumps({"profile": profile}))["profile"] == profile.to_dict()
+    assert select_fields(make_job(), ["title", "job_id"]) == {"title": "Python Developer", "job_id": "1"}
@@ -0,0 +1,135 @@
+"""
+Test file for the file-based primitives shared by API workers.
+"""
+
+import asyncio
+import fcntl
+import pytest
+import sys
+import os
+
+import msgpack
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.job import JobListing
+from services.shared_state import FileLock, JournalFollower, LeaderLease, PackedJournalFollower
+from services.user_jobs import UserJobStore
+
+def test_leader_lease_is_exclusive(tmp_path):
+    """Test that only one holder gets the lease and another takes over on release."""
+    path = str(tmp_path / "scheduler.lease")
+    leader, standby = LeaderLease(path), LeaderLease(path)
+    assert leader.try_acquire()
+    assert leader.try_acquire(), "Re-acquiring a held lease should succeed"
+    assert not standby.try_acquire()
+
+    leader.release()
+    assert standby.try_acquire()
+    assert standby.is_leader and not leader.is_leader
+    standby.release()
+
+def test_file_lock_is_reentrant(tmp_path):
+    """Test that nested use of the lock in one process does not deadlock."""
+    lock = FileLock(str(tmp_path / "profiles.lock"))
+    with lock:
+        with lock:
+            pass
+    assert lock._fd is None
+
+@pytest.mark.asyncio
+async def test_file_lock_waits_off_the_loop(tmp_path):
+    """Test that a coroutine waiting for the lock leaves the event loop running."""
+    lock = FileLock(str(tmp_path / "profiles.lock"))
+    other = os.open(lock.path, os.O_RDWR | os.O_CREAT)
+    fcntl.flock(other, fcntl.LOCK_EX)  # Held as if by another process
+
+    async def locked():
+        async with lock:
+            return lock._depth
+
+    waiter = asyncio.create_task(locked())
+    await asyncio.sleep(0.05)
+    assert not waiter.done()
+    fcntl.flock(other, fcntl.LOCK_UN)
+    os.close(other)
+    assert await asyncio.wait_for(waiter, 5) == 1
+    assert lock._fd is None
+
+def test_journal_follower(tmp_path):
+    """Test incremental reads, partial lines and replaced journals."""
+    path = tmp_path / "jobs.journal"
+    follower = JournalFollower(str(path))
+    assert follower.read_new() == []
+
+    path.write_text('{"n": 1}\n{"n": 2}\n{"n"')
+    assert follower.read_new() == [{"n": 1}, {"n": 2}]
+    with open(path, "a") as f:
+        f.write(': 3}\n')
+    assert follower.read_new() == [{"n": 3}]
+    assert follower.read_new() == []
+
+    os.remove(path)
+    path.write_text('{"n": 4}\n')
+    assert follower.read_new() == [{"n": 4}]
+
+def test_packed_journal_follower(tmp_path):
+    """Test that msgpack records split across writes are read once complete."""
+    path = tmp_path / "jobs.msgpack"
+    follower = PackedJournalFollower(str(path))
+    data = msgpack.packb({"n": 1}) + msgpack.packb({"n": 2, "text": "x" * 100})
+    path.write_bytes(data[:-10])
+    assert follower.read_new() == [{"n": 1}]
+    with open(path, "ab") as f:
+        f.write(data[-10:])
+    assert follower.read_new() == [{"n": 2, "text": "x" * 100}]
+    assert follower.read_new() == []
+
+def test_job_stores_share_journal(tmp_path):
+    """Test that deliveries recorded by one store show up in another."""
+    path = str(tmp_path / "jobs.journal")
+    leader, follower = UserJobStore(path), UserJobStore(path)
+    jobs = [
+        JobListing(
+            title="Python Developer",
+            company="Acme",
+            location="Toronto, Ontario, Canada",
+            url=f"https://www.linkedin.com/jobs/view/{i}",
+            source="linkedin",
+            job_id=str(i)
+        )
+        for i in range(3)
+    ]
+    leader.add_jobs("user1", jobs[:2])
+    assert leader.refresh() == [], "A store should not re-add its own deliveries"
+
+    assert [job.job_id for job in follower.refresh()] == ["0", "1"]
+    assert follower.get("user1").timestamp == leader.get("user1").timestamp
+    leader.add_jobs("user1", jobs[1:])
+    assert [job.job_id for job in follower.refresh()] == ["2"]
+    assert len(follower.get("user1").jobs) == 3
+
+def test_job_journal_compaction(tmp_path):
+    """Test that a compacted journal holds the capped histories and is picked up by other stores."""
+    path = str(tmp_path / "jobs.journal")
+    leader = UserJobStore(path, max_jobs_per_user=2)
+    follower = UserJobStore(path, max_jobs_per_user=2)
+    jobs = [
+        JobListing(title="Python Developer", company="Acme", location="Toronto, Ontario, Canada",
+                   url=f"https://www.linkedin.com/jobs/view/{i}", source="linkedin", job_id=str(i))
+        for i in range(5)
+    ]
+    leader.add_jobs("user1", jobs[:3])
+    assert [job.job_id for job in follower.refresh()] == ["0", "1", "2"]
+    leader.compaction_bytes = 1
+    leader.add_jobs("user1", jobs[3:])
+    # Only the compacted history is left in the journal
+    assert [record["first"] for record in PackedJournalFollower(path).read_new()] == [3]
+
+    assert [job.job_id for job in follower.refresh()] == ["3", "4"]
+    restarted = UserJobStore(path)
+    restarted.refresh()
+    for store in (follower, restarted):
+        user_jobs = store.get("user1")
+        assert [job.job_id for job in user_jobs.jobs] == ["3", "4"] and user_jobs.count == 5
@@ -0,0 +1,75 @@
+import asyncio
+import json
+import pytest
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from api.server_timing import TracingMiddleware
+from services import tracing
+from services.tracing import JsonLinesExporter, Tracer
+
+@pytest.mark.asyncio
+async def test_spans_follow_tasks(tmp_path):
+    """Test parenting across tasks, Server-Timing aggregation and export of late spans."""
+    exporter = JsonLinesExporter(str(tmp_path / "traces.jsonl"))
+    trace = Tracer(exporter, sample_rate=1.0).start_trace("request")
+
+    async def fetch():
+        with tracing.span("fetch") as span:
+            await asyncio.sleep(0)
+            return span
+
+    with tracing.activate(trace.root):
+        with tracing.span("stage") as stage:
+            fetched = await asyncio.create_task(fetch())
+            for _ in range(3):
+                with tracing.span("parse"):
+                    pass
+        late = tracing.start_span("background")
+    assert tracing.current_span() is None
+
+    assert fetched.parent_id == stage.span_id
+    assert stage.parent_id == trace.root.span_id
+    header = trace.server_timing()
+    assert header.startswith("fetch;dur=")
+    assert 'parse;desc="3 calls";dur=' in header
+    assert header.endswith(f"total;dur={trace.root.duration * 1000:.1f}")
+
+    trace.finish()
+    late.end()
+    exporter.flush()
+    spans = [json.loads(line) for line in open(tmp_path / "traces.jsonl")]
+    assert [span["name"] for span in spans] == ["request", "fetch", "parse", "parse", "parse", "stage", "background"]
+    assert {span["traceId"] for span in spans} == {trace.trace_id}
+
+def test_sampling():
+    """Test the sample rate and that an incoming traceparent decides sampling."""
+    tracer = Tracer(sample_rate=0.0)
+    assert not tracer.start_trace("a").sampled
+    trace = tracer.start_trace("b", "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01")
+    assert trace.sampled
+    assert trace.trace_id == "0af7651916cd43dd8448eb211c80319c"
+    assert trace.root.parent_id == "b7ad6b7169203331"
+    assert not Tracer(sample_rate=1.0).start_trace("c", "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-00").sampled
+    assert tracing.start_span("outside a trace") is None
+
+def test_server_timing_header():
+    """Test that responses carry the stages recorded while handling them."""
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware, tracer=Tracer(sample_rate=0.0))
+
+    @app.get("/work")
+    async def work():
+        with tracing.span("db"):
+            await asyncio.sleep(0.01)
+        return {"ok": True}
+
+    response = TestClient(app).get("/work")
+    stages = dict(entry.split(";dur=") for entry in response.headers["Server-Timing"].split(", "))
+    assert set(stages) == {"db", "total"}
+    assert 10 <= float(stages["db"]) <= float(stages["total"])
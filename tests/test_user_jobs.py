@@ -0,0 +1,137 @@
+"""
+Test file for the per-user job history and its paginated queries.
+"""
+
+import asyncio
+import pytest
+import sys
+import os
+from datetime import datetime, timezone
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.job import JobListing
+from services.user_jobs import InvalidQuery, UserJobStore, encode_cursor
+
+def make_job(job_id: str, company: str, location: str = "Toronto, Ontario, Canada",
+             posted_date: datetime = None) -> JobListing:
+    """Create a LinkedIn-style job listing for testing."""
+    return JobListing(
+        title=f"Engineer {job_id}",
+        company=company,
+        location=location,
+        url=f"https://www.linkedin.com/jobs/view/{job_id}",
+        source="linkedin",
+        job_id=job_id,
+        posted_date=posted_date
+    )
+
+@pytest.fixture
+def user_jobs():
+    """Create a history of seven jobs for one user."""
+    store = UserJobStore()
+    store.add_jobs("user1", [
+        make_job(str(i), "Shopify" if i % 2 else "Acme",
+                 location="Remote" if i % 3 == 0 else "Toronto, Ontario, Canada",
+                 posted_date=datetime(2024, 1, i + 1))
+        for i in range(7)
+    ])
+    return store.get("user1")
+
+def collect(user_jobs, **filters):
+    """Walk every page and return the job IDs in order."""
+    ids, cursor = [], None
+    while True:
+        jobs, cursor = user_jobs.query(cursor=cursor, limit=3, **filters)
+        ids.extend(job.job_id for job in jobs)
+        if cursor is None:
+            return ids
+
+def test_duplicates_ignored():
+    """Test that re-delivered jobs are only stored once."""
+    store = UserJobStore()
+    assert len(store.add_jobs("user1", [make_job("1", "Acme")])) == 1
+    assert store.add_jobs("user1", [make_job("1", "Acme"), make_job("2", "Acme")])[0].job_id == "2"
+    assert len(store.get("user1").jobs) == 2
+
+def test_pagination_default_order(user_jobs):
+    """Test that pages walk newest first without gaps or repeats."""
+    assert collect(user_jobs) == ["6", "5", "4", "3", "2", "1", "0"]
+    assert collect(user_jobs, sort="scraped") == ["0", "1", "2", "3", "4", "5", "6"]
+
+def test_filters(user_jobs):
+    """Test company, remote and posted-since filters."""
+    assert collect(user_jobs, company="shopify") == ["5", "3", "1"]
+    assert collect(user_jobs, remote=True) == ["6", "3", "0"]
+    assert collect(user_jobs, remote=False, company="Acme") == ["4", "2"]
+    assert collect(user_jobs, posted_since=datetime(2024, 1, 5), sort="posted_date") == ["4", "5", "6"]
+    assert collect(user_jobs, source="indeed") == []
+    # Aware times compare in UTC with the stored naive ones
+    assert collect(user_jobs, posted_since=datetime(2024, 1, 6, tzinfo=timezone.utc)) == ["6", "5"]
+    assert collect(user_jobs, company="acme", posted_since=datetime(2024, 1, 3), sort="title") == ["2", "4", "6"]
+
+def test_sparse_filters_page_over_matches():
+    """Test that filters matching few jobs page correctly in every sort order."""
+    store = UserJobStore()
+    store.add_jobs("user1", [make_job(str(i), "Initech" if i in (3, 11, 17) else "Acme",
+                                      posted_date=datetime(2024, 1, 1 + i % 5)) for i in range(20)])
+    user_jobs = store.get("user1")
+    assert collect(user_jobs, company="initech") == ["17", "11", "3"]
+    assert collect(user_jobs, company="initech", sort="posted_date") == ["11", "17", "3"]
+    assert collect(user_jobs, company="initech", sort="-posted_date", posted_since=datetime(2024, 1, 3)) == ["3", "17"]
+    assert collect(user_jobs, posted_since=datetime(2024, 1, 5), sort="-posted_date") == ["19", "14", "9", "4"]
+
+def test_invalid_queries(user_jobs):
+    """Test that bad sort keys and cursors are rejected."""
+    with pytest.raises(InvalidQuery):
+        user_jobs.query(sort="salary")
+    _, cursor = user_jobs.query(limit=2)
+    with pytest.raises(InvalidQuery):
+        user_jobs.query(sort="company", cursor=cursor)
+    with pytest.raises(InvalidQuery):
+        user_jobs.query(cursor="not-a-cursor")
+    with pytest.raises(InvalidQuery):
+        user_jobs.query(cursor=encode_cursor("-scraped", "x", "y"))
+    with pytest.raises(InvalidQuery):
+        user_jobs.query(sort="company", cursor=encode_cursor("company", 1, 2))
+
+@pytest.mark.asyncio
+async def test_changed_wakes_subscribers():
+    """Test that adding jobs wakes waiters and since() returns only the new ones."""
+    store = UserJobStore()
+    user_jobs = store.user("user1")
+    changed = user_jobs.changed
+    store.add_jobs("user1", [make_job("1", "Acme")])
+    await asyncio.wait_for(changed.wait(), 1)
+    assert not user_jobs.changed.is_set()
+    
+    cursor = len(user_jobs.jobs)
+    store.add_jobs("user1", [make_job("1", "Acme")])
+    assert not user_jobs.changed.is_set()  # Duplicates are not news
+    store.add_jobs("user1", [make_job("2", "Acme"), make_job("3", "Acme")])
+    assert [job.job_id for job in user_jobs.since(cursor)] == ["2", "3"]
+
+@pytest.mark.asyncio
+async def test_created_wakes_waiters_for_new_users():
+    """Test that waiting for a user's first delivery leaves no empty history behind."""
+    store = UserJobStore()
+    created = store.created
+    assert store.get("user1") is None and not store.users
+    store.add_jobs("user1", [make_job("1", "Acme")])
+    await asyncio.wait_for(created.wait(), 1)
+    assert not store.created.is_set()
+    assert [job.job_id for job in store.get("user1").jobs] == ["1"]
+
+def test_histories_trimmed():
+    """Test that a capped history forgets its oldest jobs but keeps sequence numbers and cursors."""
+    store = UserJobStore(max_jobs_per_user=3)
+    store.add_jobs("user1", [make_job(str(i), "Acme" if i < 2 else "Shopify") for i in range(5)])
+    user_jobs = store.get("user1")
+    assert [job.job_id for job in user_jobs.jobs] == ["2", "3", "4"]
+    assert user_jobs.count == 5 and user_jobs.first == 2
+    assert [job.job_id for job in user_jobs.since(3)] == ["3", "4"]
+    assert [job.job_id for job in user_jobs.since(0)] == ["2", "3", "4"]
+    assert "acme" not in user_jobs.by_company
+    assert collect(user_jobs, sort="-scraped") == ["4", "3", "2"]
+    assert collect(user_jobs, company="Shopify", sort="title") == ["2", "3", "4"]